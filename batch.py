@@ -0,0 +1,312 @@
+"""Apply a calculator formula to every row of a numeric CSV file.
+
+    python -m batch sales.csv "price × qty − discount" > totals.csv
+    python -m batch sales.csv "price × qty" --output totals.csv --name total
+
+The first line names the columns; the formula uses those names with the
+calculator's syntax (× ÷ − or * / -, parentheses, **). The output is a
+one-column CSV: the name, then one formatted result per row ("Error"
+for rows that divide by zero, overflow, hold a field that is not a
+number or have the wrong number of fields).
+
+The file is memory-mapped and read in chunks of about --chunk-bytes,
+split at line ends. Each chunk is copied out of the map (and once or
+twice more while it is split into fields) and parsed in one pass into a
+flat array.array("d"). With NumPy installed the columns are strided
+views of that array; without it each column the formula uses is copied
+out with a slice. They are evaluated with operations.evaluate_batch()
+and written out before the next chunk is read, so memory stays flat
+whatever the file size. With --workers N, worker processes
+read and evaluate chunks themselves and only the output text comes
+back. Rows/s and MB/s go to stderr.
+"""
+import argparse
+import mmap
+import os
+import sys
+import time
+from array import array
+from functools import partial
+from itertools import repeat
+
+import numeric
+from expression import compile_expression
+from formatting import fixed, number
+from operations import _numpy, evaluate_batch, map_chunks
+from utils import positive_int
+
+DEFAULT_CHUNK_BYTES = 1 << 20
+_NAN = float("nan")
+
+
+# ============================
+#   PARSING
+# ============================
+def parse_header(line):
+    """Column names from the header line (bytes)."""
+    return [name.strip().decode("utf-8") for name in line.split(b",")]
+
+
+def _field(token):
+    try:
+        return float(token)
+    except ValueError:
+        return _NAN
+
+
+def parse_chunk(data, width):
+    """Rows of data (complete lines) as one flat array, row after row.
+
+    The fast path converts every field with a single map(float) over
+    the split buffer; it is taken only when every line has exactly
+    width fields. Otherwise lines are parsed one by one: blank lines
+    are skipped, rows with too few or too many fields become all NaN
+    and fields that are not numbers become NaN (so those rows give
+    "Error").
+    """
+    if b"\r" in data:
+        data = data.replace(b"\r", b"")
+    lines = data.split(b"\n")
+    if lines[-1] == b"":
+        del lines[-1]
+    separators = width - 1
+    if set(map(bytes.count, lines, repeat(b",", len(lines)))) == {
+            separators}:
+        try:
+            return array("d", map(float, b",".join(lines).split(b",")))
+        except ValueError:
+            pass
+    flat = array("d")
+    ragged = [_NAN] * width
+    for line in lines:
+        if not line.strip():
+            continue
+        fields = line.split(b",")
+        flat.extend(map(_field, fields) if len(fields) == width
+                    else ragged)
+    return flat
+
+
+def chunks(mapped, start, size):
+    """(start, end) byte ranges of about size bytes ending at a newline.
+
+    Raises ValueError if size is below 1.
+    """
+    if size < 1:
+        raise ValueError(f"chunk size must be at least 1, not {size}")
+    return _spans(mapped, start, size)
+
+
+def _spans(mapped, start, size):
+    end_of_file = len(mapped)
+    while start < end_of_file:
+        end = mapped.rfind(b"\n", start, start + size) + 1
+        if end <= start:
+            # A line longer than size: take it whole
+            end = mapped.find(b"\n", start + size)
+            end = end_of_file if end < 0 else end + 1
+        yield start, end
+        start = end
+
+
+# ============================
+#   OUTPUT
+# ============================
+def format_column(values, errors, formatter):
+    """Output lines for one chunk of results."""
+    if not any(errors):
+        return "\n".join(map(formatter, values)) + "\n"
+    return "\n".join(["Error" if error else formatter(value)
+                      for value, error in zip(values, errors)]) + "\n"
+
+
+# ============================
+#   BATCH RUN
+# ============================
+class BatchStats:
+    """Rows and bytes processed, for the throughput report."""
+
+    __slots__ = ("rows", "bytes", "errors", "seconds")
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def report(self):
+        seconds = self.seconds or 1e-9
+        return (f"{self.rows:,} rows ({self.errors:,} errors), "
+                f"{self.bytes / 1e6:,.1f} MB in {self.seconds:.2f}s: "
+                f"{self.rows / seconds:,.0f} rows/s, "
+                f"{self.bytes / 1e6 / seconds:,.1f} MB/s")
+
+
+def split_columns(flat, width, used):
+    """The columns named in used (name → position) of a flat chunk.
+
+    With NumPy they are strided views of flat, without a copy; without
+    it each one is an array.array copied out with a slice.
+    """
+    np = _numpy()
+    if np is None:
+        return {name: flat[i::width] for name, i in used.items()}
+    table = np.frombuffer(flat, dtype=np.float64).reshape(-1, width)
+    return {name: table[:, i] for name, i in used.items()}
+
+
+def evaluate_rows(data, width, used, formula, formatter):
+    """(output text, rows, errors) for the complete lines in data.
+
+    used maps the column names formula needs to their positions.
+    """
+    flat = parse_chunk(data, width)
+    rows = len(flat) // width
+    if not rows:
+        return "", 0, 0
+    columns = split_columns(flat, width, used)
+    if not columns:     # constant formula: only the row count matters
+        columns = {"_rows": range(rows)}
+    values, errors = evaluate_batch(formula, **columns)
+    return format_column(values, errors, formatter), rows, int(sum(errors))
+
+
+def _evaluate_span(path, width, used, formula, formatter, span):
+    # Worker side of run(workers > 1): read the byte range itself, so
+    # only offsets and output text cross between processes.
+    start, end = span
+    with open(path, "rb") as f:
+        data = os.pread(f.fileno(), end - start, start)
+    return evaluate_rows(data, width, used, formula, formatter) + (
+        end - start,)
+
+
+def _evaluate_mapped(mapped, width, used, formula, formatter, span):
+    start, end = span
+    result = evaluate_rows(mapped[start:end], width, used, formula,
+                           formatter)
+    # Done with these pages: let the kernel drop them instead of
+    # growing the resident set.
+    if hasattr(mapped, "madvise"):
+        page = start - start % mmap.PAGESIZE
+        mapped.madvise(mmap.MADV_DONTNEED, page, end - page)
+    return result + (end - start,)
+
+
+def run(path, formula, out, name="result", chunk_bytes=DEFAULT_CHUNK_BYTES,
+        shortest=False, workers=1):
+    """Write formula's value for every row of the CSV at path to out.
+
+    Returns a BatchStats. Raises ValueError for a formula that does not
+    parse or names a column the file does not have, or a chunk_bytes
+    below 1. With workers > 1, chunks are evaluated in that many
+    processes (see map_chunks()).
+    """
+    compiled = compile_expression(formula, numeric.FLOAT)
+    formatter = number if shortest else fixed
+    stats = BatchStats()
+    began = time.perf_counter()
+    write = out.write
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"{path} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            header_end = mapped.find(b"\n") + 1 or len(mapped)
+            names = parse_header(mapped[:header_end])
+            missing = compiled.names - set(names)
+            if missing:
+                raise ValueError(
+                    f"no column named {', '.join(sorted(missing))} "
+                    f"(columns: {', '.join(names)})")
+            spans = chunks(mapped, header_end, chunk_bytes)
+            write(name + "\n")
+            width = len(names)
+            used = {column: i for i, column in enumerate(names)
+                    if column in compiled.names}
+
+            if workers > 1:
+                results = map_chunks(
+                    partial(_evaluate_span, path, width, used, formula,
+                            formatter),
+                    spans, workers)
+            else:
+                results = (_evaluate_mapped(mapped, width, used, formula,
+                                            formatter, span)
+                           for span in spans)
+            for text, rows, errors, size in results:
+                write(text)
+                stats.rows += rows
+                stats.errors += errors
+                stats.bytes += size
+    out.flush()
+    stats.bytes += header_end
+    stats.seconds = time.perf_counter() - began
+    return stats
+
+
+# ============================
+#   COMMAND LINE
+# ============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m batch",
+        description="Apply a formula to every row of a numeric CSV file.")
+    parser.add_argument("file", help="CSV file with a header line")
+    parser.add_argument(
+        "formula", help='calculator formula over column names, '
+                        'e.g. "price × qty"')
+    parser.add_argument(
+        "--output", "-o", metavar="PATH",
+        help="write the result column here (default: stdout)")
+    parser.add_argument(
+        "--name", default="result",
+        help="header of the result column (default: result)")
+    parser.add_argument(
+        "--chunk-bytes", type=positive_int, default=DEFAULT_CHUNK_BYTES,
+        help=f"bytes per chunk (default: {DEFAULT_CHUNK_BYTES})")
+    parser.add_argument(
+        "--shortest", action="store_true",
+        help="print the shortest round-trip form of each result instead "
+             "of rounding to 10 decimal places")
+    parser.add_argument(
+        "--workers", type=positive_int, default=1,
+        help="evaluate chunks in N worker processes (default: 1)")
+    parser.add_argument(
+        "--explain", action="store_true",
+        help="print the optimized formula to stderr before running")
+    parser.add_argument(
+        "--quiet", "-q", action="store_true",
+        help="do not print the throughput report")
+    args = parser.parse_args(argv)
+
+    if args.explain:
+        try:
+            plan = compile_expression(args.formula, numeric.FLOAT).explain()
+        except ValueError as exc:
+            print(f"batch: {exc}", file=sys.stderr)
+            return 2
+        print(plan, file=sys.stderr)
+
+    out = (open(args.output, "w", encoding="utf-8", buffering=1 << 20)
+           if args.output else sys.stdout)
+    try:
+        stats = run(args.file, args.formula, out, args.name,
+                    args.chunk_bytes, args.shortest, args.workers)
+    except BrokenPipeError:
+        # Downstream closed early (e.g. `| head`); exit quietly.
+        sys.stderr.close()
+        return 1
+    except (OSError, ValueError) as exc:
+        print(f"batch: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if not args.quiet:
+        print(stats.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
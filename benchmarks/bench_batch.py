@@ -0,0 +1,68 @@
+"""python -m batch against a csv.reader + eval() loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_batch.py --rows 1000000
+
+Writes a temporary CSV with --rows rows of three numeric columns, then
+times the same formula both ways (output to /dev/null) and prints rows/s
+and MB/s for each.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch  # noqa: E402
+from formatting import fixed  # noqa: E402
+
+FORMULA = "price × qty − discount"
+
+
+def write_csv(path, rows, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("price,qty,discount\n")
+        for _ in range(rows):
+            f.write(f"{rng.uniform(1, 500):.2f},{rng.randint(1, 20)},"
+                    f"{rng.uniform(0, 5):.2f}\n")
+
+
+def reader_loop(path, out):
+    """The per-row baseline: csv.reader, a dict per row and eval()."""
+    code = compile("price * qty - discount", "<formula>", "eval")
+    with open(path, newline="") as f:
+        rows = csv.reader(f)
+        names = next(rows)
+        for row in rows:
+            env = dict(zip(names, map(float, row)))
+            out.write(fixed(eval(code, {}, env)) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.csv")
+        write_csv(path, args.rows)
+        megabytes = os.path.getsize(path) / 1e6
+        with open(os.devnull, "w") as out:
+            start = time.perf_counter()
+            reader_loop(path, out)
+            baseline = time.perf_counter() - start
+            stats = batch.run(path, FORMULA, out)
+        for name, seconds in (("csv+eval", baseline),
+                              ("batch", stats.seconds)):
+            print(f"{name:<9}{args.rows / seconds:>12,.0f} rows/s "
+                  f"{megabytes / seconds:>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
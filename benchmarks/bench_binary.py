@@ -0,0 +1,77 @@
+"""apply_binary() vs formatting an expression and evaluating it.
+
+Run from the repository root:  python benchmarks/bench_binary.py
+
+The "string" column is what the engine did before apply_binary():
+calculate_expression(f"{left}{op}{right}") on its stored operands.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numeric  # noqa: E402
+from engine import CalculatorEngine  # noqa: E402
+from operations import apply_binary, calculate_expression  # noqa: E402
+
+OPERATORS = ("+", "−", "×", "÷")
+
+
+def operands(count=200_000, seed=1):
+    """Operands as the engine holds them: typed numbers and results."""
+    rng = random.Random(seed)
+    parse = numeric.to_number
+    return [(rng.choice(OPERATORS), parse(f"{rng.uniform(-1e4, 1e4):.4f}"),
+             parse(str(rng.randint(1, 999)))) for _ in range(count)]
+
+
+def string_path(cases):
+    for op, left, right in cases:
+        calculate_expression(f"{left}{op}{right}")
+
+
+def direct_path(cases):
+    for op, left, right in cases:
+        apply_binary(op, left, right)
+
+
+def keys(count=20_000, seed=1):
+    """Key sequences like "12.5 × 3 = = +" that exercise the operators."""
+    rng = random.Random(seed)
+    sequence = []
+    for _ in range(count):
+        sequence += list(str(rng.randint(1, 9999)))
+        sequence.append(rng.choice(OPERATORS))
+        sequence += list(str(rng.randint(1, 99)))
+        sequence += ["="] * rng.randint(1, 3)
+        sequence.append(rng.choice(OPERATORS))
+    return sequence
+
+
+def timed(func, arg):
+    start = time.perf_counter()
+    func(arg)
+    return time.perf_counter() - start
+
+
+def main():
+    for name in numeric.available_backends():
+        numeric.set_backend(name)
+        cases = operands()
+        before = timed(string_path, cases)
+        after = timed(direct_path, cases)
+        per = 1e9 / len(cases)
+        print(f"{name:<9} string {before * per:7.0f} ns  "
+              f"apply_binary {after * per:6.0f} ns  ({before / after:.1f}x)")
+
+    numeric.set_backend("float")
+    sequence = keys()
+    elapsed = timed(CalculatorEngine().feed, sequence)
+    print(f"engine    {len(sequence) / elapsed:,.0f} key presses/s "
+          f"(float backend)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the compiled expression engine against the old eval() path.
+
+Run from the repository root:  python benchmarks/bench_expression.py
+
+"cached" is the common case: the GUI evaluates the same few shapes
+over and over and compile_expression() reuses their compilations.
+"cold" empties that cache before every call, so each one parses and
+compiles afresh: a first-seen expression is slower than eval(), and
+the ratios (eval time / compiled time) show it.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expression import _compile_normalized  # noqa: E402
+from operations import calculate_expression  # noqa: E402
+
+
+def eval_expression(expr: str):
+    """The original implementation, kept here for comparison."""
+    try:
+        expr = expr.replace("×", "*").replace("÷", "/").replace("−", "-")
+        return eval(expr)
+    except Exception:
+        return "Error"
+
+
+# The shapes make_button builds on every operator and "=" press.
+EXPRESSIONS = [
+    "12.0×3.0",
+    "1234.5+0.5",
+    "99.0÷7.0",
+    "-3.5−-2.25",
+    "(1+2)×3−4÷5",
+]
+
+
+def cold_expression(expr: str):
+    """calculate_expression() without a cached compilation."""
+    _compile_normalized.cache_clear()
+    return calculate_expression(expr)
+
+
+def main(number=100_000):
+    print(f"{'expression':<16}{'eval (us)':>11}{'cached (us)':>13}"
+          f"{'cold (us)':>11}{'cached':>10}{'cold':>8}")
+    for expr in EXPRESSIONS:
+        assert eval_expression(expr) == calculate_expression(expr)
+        assert cold_expression(expr) == calculate_expression(expr)
+        old = timeit.timeit(lambda: eval_expression(expr), number=number)
+        cached = timeit.timeit(lambda: calculate_expression(expr),
+                               number=number)
+        cold = timeit.timeit(lambda: cold_expression(expr), number=number)
+        print(f"{expr:<16}{old / number * 1e6:>11.2f}"
+              f"{cached / number * 1e6:>13.2f}{cold / number * 1e6:>11.2f}"
+              f"{old / cached:>9.1f}x{old / cold:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""1M number formats: the original float round-trip vs formatting.py.
+
+Run from the repository root:  python benchmarks/bench_format.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from operations import format_number, format_result  # noqa: E402
+
+
+def old_format_number(value):
+    try:
+        num = float(value)
+        if num.is_integer():
+            return str(int(num))
+        return str(num)
+    except Exception:
+        return value
+
+
+def old_format_result(value):
+    try:
+        num = float(value)
+        if num.is_integer():
+            return str(int(num))
+        return f"{num:.10f}".rstrip("0").rstrip(".")
+    except Exception:
+        return value
+
+
+def workload(count=1_000_000, seed=1):
+    """What the GUI formats: fresh float results, int-like floats, ints
+    from integer expressions and text already on the display."""
+    rng = random.Random(seed)
+    display = [str(rng.randint(0, 999)) + "." + str(rng.randint(0, 99))
+               for _ in range(200)]
+    values = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            values.append(rng.uniform(-1e6, 1e6))
+        elif kind == 1:
+            values.append(float(rng.randint(-1000, 1000)))
+        elif kind == 2:
+            values.append(rng.randint(-1000, 1000))
+        else:
+            values.append(rng.choice(display))
+    return values
+
+
+def timed(func, values):
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    return time.perf_counter() - start
+
+
+def main():
+    values = workload()
+    for old, new in ((old_format_number, format_number),
+                     (old_format_result, format_result)):
+        before = timed(old, values)
+        after = timed(new, values)
+        print(f"{new.__name__:<14} before {before:6.3f}s  after {after:6.3f}s"
+              f"  ({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Drive the real Tk window with synthetic clicks and report latency.
+
+Needs a display; on a headless machine run it under Xvfb:
+
+    xvfb-run -a python benchmarks/bench_gui_latency.py --presses 5000
+
+Each key press is sent as Enter/ButtonPress-1/ButtonRelease-1 events on
+the button and the event loop is flushed before the next one, so the
+traced "total" covers pointer release to redraw. The per-stage table is
+printed on exit; --max-p99-ms makes the run fail on regressions.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEQUENCES = [
+    ["1", "2", "+", "3", "4", "="],
+    ["7", "×", "8", "÷", "2", "="],
+    ["9", "x²", "+", "1", "=", "=", "="],
+    ["1", "0", "0", "÷", "3", "=", "1/x"],
+    ["2", ".", "5", "×", "4", "=", "+/-"],
+    ["5", "0", "%", "⌫", "CE", "C"],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--presses", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p99-ms", type=float,
+                        help="exit with status 1 if the overall p99 is "
+                             "above this")
+    args = parser.parse_args()
+
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        sys.exit("no display: run under xvfb-run")
+
+    # The calculator reads its own options from the command line
+    os.environ["CALCULATOR_TRACE"] = "1"
+    sys.argv = sys.argv[:1]
+    import gui_calculator as gui
+    from instrumentation import LatencyHistogram
+
+    root = gui.root
+    root.update()
+    buttons = {btn.cget("text"): btn for btn in gui.btn_frame.winfo_children()}
+
+    rng = random.Random(args.seed)
+    pressed = 0
+    while pressed < args.presses:
+        for key in rng.choice(SEQUENCES):
+            btn = buttons[key]
+            btn.event_generate("<Enter>")
+            btn.event_generate("<ButtonPress-1>")
+            btn.event_generate("<ButtonRelease-1>")
+            root.update()
+            pressed += 1
+
+    overall = LatencyHistogram()
+    for (kind, stage), hist in gui.tracer.histograms.items():
+        if stage == "total":
+            overall.merge(hist)
+    p50 = overall.percentile(50) / 1e6
+    p99 = overall.percentile(99) / 1e6
+    print(f"{overall.count} presses  p50 {p50:.3f} ms  p99 {p99:.3f} ms  "
+          f"max {overall.max / 1e6:.3f} ms")
+    root.destroy()
+
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        print(f"p99 {p99:.3f} ms exceeds {args.max_p99_ms} ms",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Search latency over a large history.
+
+Run from the repository root:
+
+    python benchmarks/bench_history_search.py --count 1000000
+
+Fills an IndexedHistory with --count binary records, then prints the
+index build time and, for each query, the match count (a lower bound,
+marked +, for multi-term queries) and the time to search and fetch the
+first page of matches.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import HistoryRecord, HistoryStore, IndexedHistory  # noqa: E402
+from operations import apply_binary  # noqa: E402
+
+QUERIES = [">10000", "1.0825", "×", "5..10", "=42", "<0", "1.0825 >10000",
+           "no-match"]
+PAGE = 20
+
+
+def filled(count, seed=1):
+    rng = random.Random(seed)
+    history = IndexedHistory(HistoryStore(capacity=count))
+    for _ in range(count):
+        left = float(rng.randint(1, 20000))
+        right = rng.choice([1.0825, float(rng.randint(1, 99))])
+        op = rng.choice("+−×÷")
+        history.add(HistoryRecord(left, op, right,
+                                  apply_binary(op, left, right)))
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    history = filled(args.count)
+    start = time.perf_counter()
+    history.build_index()
+    print(f"index build  {time.perf_counter() - start:8.2f} s")
+
+    for query in QUERIES:
+        start = time.perf_counter()
+        results = history.search(query)
+        page = [results[i] for i in range(min(PAGE, len(results)))]
+        elapsed = time.perf_counter() - start
+        # Multi-term counts are lower bounds until scrolled to the end
+        more = " " if results.complete else "+"
+        print(f"{query:<16}{len(results):>10,}{more}matches "
+              f"{elapsed * 1e3:10.2f} ms  ({len(page)} shown)")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        history.add(HistoryRecord(5.0, "+", 1.0825, 6.0825))
+    print(f"indexed add  {time.perf_counter() - start:8.3f} ms each")
+
+
+if __name__ == "__main__":
+    main()
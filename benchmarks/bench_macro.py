@@ -0,0 +1,64 @@
+"""Replaying a recorded macro: engine key by key vs compiled.
+
+Run from the repository root:
+
+    python benchmarks/bench_macro.py --inputs 100000
+
+The macros are a 15-key pricing computation (tax, a flat fee, a
+discount) and a 15-key compounding one made of repeated "=". Each is replayed
+on every input value by feeding its keys to a CalculatorEngine, which
+is what clicking through it does minus the Tk redraws, and by its
+compiled form.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numeric  # noqa: E402
+from macros import Macro, compile_macro, interpret  # noqa: E402
+
+MACROS = [
+    # × 1.0825 = + 4 = − 5 % =
+    Macro("pricing", ["×", "1", ".", "0", "8", "2", "5", "=", "+", "4",
+                      "=", "−", "5", "%", "="]),
+    Macro("compound", ["×", "1", ".", "0", "1", "="] + ["="] * 9),
+]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inputs", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    values = [f"{rng.uniform(1, 5000):.2f}" for _ in range(args.inputs)]
+    for name in numeric.available_backends():
+        numeric.set_backend(name)
+        for macro in MACROS:
+            keys = macro.keys
+            start = time.perf_counter()
+            compiled = compile_macro(keys)
+            build = time.perf_counter() - start
+            assert compiled(values[0]) == interpret(keys, values[0])
+            engine = timed(lambda: [interpret(keys, v) for v in values])
+            fast = timed(lambda: macro.run_many(values))
+            per = 1e6 / len(values)
+            print(f"{name:<9}{macro.name:<10}{len(keys):>3} keys "
+                  f"{compiled.steps:>3} steps  compile {build * 1e3:6.2f} ms"
+                  f"  engine {engine * per:8.2f} us  compiled "
+                  f"{fast * per:7.2f} us  ({engine / fast:.0f}x)")
+    numeric.set_backend("float")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Per-operation cost of each numeric backend.
+
+Run from the repository root:  python benchmarks/bench_numeric.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numeric  # noqa: E402
+from operations import (  # noqa: E402
+    calculate_expression, format_number, sqrt, _safe_number
+)
+
+
+def cases():
+    """(label, callable) pairs, built against the active backend."""
+    a = _safe_number("1234.5678")
+    b = _safe_number("0.1")
+    return [
+        ("parse", lambda: _safe_number("1234.5678")),
+        ("add", lambda: a + b),
+        ("multiply", lambda: a * b),
+        ("divide", lambda: a / b),
+        ("sqrt", lambda: sqrt("1234.5678")),
+        ("format", lambda: format_number(a / b)),
+        ("expression", lambda: calculate_expression("1234.5678÷0.1")),
+    ]
+
+
+def main(number=100_000):
+    names = numeric.available_backends()
+    results = {}
+    for name in names:
+        numeric.set_backend(name)
+        results[name] = [
+            (label, timeit.timeit(func, number=number) / number * 1e9)
+            for label, func in cases()
+        ]
+    numeric.set_backend("float")
+
+    print(f"{'ns/op':<12}" + "".join(f"{name:>12}" for name in names))
+    for row, (label, _) in enumerate(results["float"]):
+        print(f"{label:<12}" + "".join(
+            f"{results[name][row][1]:>12.0f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
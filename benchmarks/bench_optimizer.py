@@ -0,0 +1,48 @@
+"""Evaluation time with and without the expression optimizer.
+
+Run from the repository root:  python benchmarks/bench_optimizer.py
+
+For formulas with redundant structure (identities, constant chains,
+repeated subexpressions), prints the optimized form and the time per
+evaluation of the parse tree as written vs the optimized code.
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numeric  # noqa: E402
+from expression import CompiledExpression, normalize, parse  # noqa: E402
+
+FORMULAS = [
+    "price × 1 + 0 − discount × 1",
+    "price × (60 × 60 × 24) ÷ (1000 × 1000)",
+    "(price × qty) + (price × qty) × 0.0825",
+    "((a − b) × (a − b) + (a − b)) ÷ ((a − b) × (a − b) + 1)",
+    "--price ** 1 − -1 × qty",
+]
+
+
+def main(number=200_000):
+    rng = random.Random(1)
+    env = {name: rng.uniform(1, 100)
+           for name in ("price", "qty", "discount", "a", "b")}
+    print(f"{'formula':<58}{'tree (us)':>10}{'optimized (us)':>16}")
+    for formula in FORMULAS:
+        source = normalize(formula)
+        tree = parse(source, numeric.FLOAT)
+        plain = CompiledExpression(source, tree, numeric.FLOAT,
+                                   optimize=False)
+        fast = CompiledExpression(source, tree, numeric.FLOAT)
+        assert plain.evaluate(env) == fast.evaluate(env)
+        before = timeit.timeit(lambda: plain.evaluate(env), number=number)
+        after = timeit.timeit(lambda: fast.evaluate(env), number=number)
+        print(f"{formula:<58}{before / number * 1e6:>10.2f}"
+              f"{after / number * 1e6:>16.2f}")
+        print("    " + fast.explain().replace("\n", "; "))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Throughput of evaluate_many() as the worker count grows.
+
+Run from the repository root:
+
+    python benchmarks/bench_parallel.py --count 2000000
+
+Prints expressions per second for a plain calculate_expression() loop
+and for evaluate_many() with 1, 2, 4, ... workers up to the CPU count,
+with the speedup over the loop.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from operations import calculate_expression, evaluate_many  # noqa: E402
+
+
+def workload(count, seed=1):
+    """Mostly distinct expressions, so the compile cache rarely hits."""
+    rng = random.Random(seed)
+    ops = ["+", "-", "*", "/"]
+    return [f"{rng.randint(1, 10**6)} {rng.choice(ops)} "
+            f"({rng.randint(1, 999)} {rng.choice(ops)} {rng.random():.6f})"
+            for _ in range(count)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500_000)
+    parser.add_argument("--chunksize", type=int, default=1024)
+    args = parser.parse_args()
+
+    expressions = workload(args.count)
+    baseline = timed(lambda: [calculate_expression(e) for e in expressions])
+    print(f"{'loop':<12}{args.count / baseline:>14,.0f} expr/s")
+
+    workers = 1
+    cpus = os.cpu_count() or 1
+    while True:
+        elapsed = timed(lambda: sum(1 for _ in evaluate_many(
+            expressions, workers=workers, chunksize=args.chunksize)))
+        print(f"{workers:>2} workers  {args.count / elapsed:>14,.0f} expr/s"
+              f"  ({baseline / elapsed:.2f}x)")
+        if workers >= cpus:
+            break
+        workers = min(workers * 2, cpus)
+
+
+if __name__ == "__main__":
+    main()
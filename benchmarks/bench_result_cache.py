@@ -0,0 +1,89 @@
+"""Hit rate and time saved by the result cache on keystroke traces.
+
+Run from the repository root:
+
+    python benchmarks/bench_result_cache.py --sessions 50000
+
+Each session is a short calculator task drawn from a pool where a few
+tasks are much more common than the rest (a price with tax, doubling
+with repeated "=", toggling 1/x, squaring and taking roots of the same
+figures). Every trace is fed to a CalculatorEngine with the cache
+disabled and then enabled, for each numeric backend.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numeric  # noqa: E402
+from engine import CalculatorEngine  # noqa: E402
+from operations import result_cache  # noqa: E402
+
+
+def task(rng):
+    """Key presses for one small calculation."""
+    price = str(rng.choice([19.99, 24.5, 120, 1299, 5, 42, 0.75]))
+    figure = str(rng.randint(2, 30))
+    kind = rng.randrange(6)
+    if kind == 0:      # price with tax, then a discount
+        keys = [*price, "×", *"1.0825", "=", "−", *"10", "%", "="]
+    elif kind == 1:    # powers by repeated equals
+        keys = [*figure, "×", *figure, *["="] * rng.randint(2, 6)]
+    elif kind == 2:    # reciprocal round trip
+        keys = [*figure, "1/x", "1/x", "x²", "²√x"]
+    elif kind == 3:    # split a bill
+        keys = [*price, "÷", *str(rng.randint(2, 6)), "=", "+/-", "+/-"]
+    elif kind == 4:    # running total
+        keys = [*price, "+", *price, "+", *figure, "="]
+    else:              # percentage of a figure
+        keys = [*figure, "x²", "%", "²√x"]
+    return keys + ["C"]
+
+
+def trace(sessions, seed=1):
+    rng = random.Random(seed)
+    pool = [task(rng) for _ in range(200)]
+    weights = [1 / (rank + 1) for rank in range(len(pool))]   # Zipf-like
+    keys = []
+    for chosen in rng.choices(pool, weights, k=sessions):
+        keys += chosen
+    return keys
+
+
+def timed(keys, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        result_cache.clear()
+        engine = CalculatorEngine()
+        start = time.perf_counter()
+        engine.feed(keys)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20_000)
+    args = parser.parse_args()
+
+    keys = trace(args.sessions)
+    print(f"{len(keys):,} key presses in {args.sessions:,} sessions")
+    for name in numeric.available_backends():
+        numeric.set_backend(name)
+        result_cache.disable()
+        off = timed(keys)
+        result_cache.enable()
+        on = timed(keys)
+        info = result_cache.info()
+        lookups = info.hits + info.misses
+        print(f"{name:<9} off {off * 1e3:8.1f} ms  on {on * 1e3:8.1f} ms  "
+              f"saved {(off - on) * 1e3:7.1f} ms ({1 - on / off:5.1%})  "
+              f"hit rate {info.hits / lookups:.1%} of {lookups:,}")
+    numeric.set_backend("float")
+
+
+if __name__ == "__main__":
+    main()
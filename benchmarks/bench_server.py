@@ -0,0 +1,124 @@
+"""Load-test the calculation service: requests/sec and tail latency.
+
+Run from the repository root against a running server:
+
+    python -m server --unix /tmp/calc.sock &
+    python benchmarks/bench_server.py --unix /tmp/calc.sock
+
+or let it start one for the duration of the run:
+
+    python benchmarks/bench_server.py --spawn --connections 32 --pipeline 64
+
+Every connection keeps up to --pipeline requests in flight; the latency
+of a request runs from writing it to reading its response.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from instrumentation import LatencyHistogram  # noqa: E402
+from server import (  # noqa: E402
+    DEFAULT_HOST, DEFAULT_PORT, FRAMINGS, encode, read_message
+)
+
+REQUESTS = ["12+34", "7*8/2", "2**0.5", "(1+2)*(3+4)", "1/0", "MS 5", "MR",
+            "M+ 2.5", "100-3.75", "MC"]
+
+
+async def connection(open_connection, count, depth, framing, hist, seed):
+    reader, writer = await open_connection()
+    rng = random.Random(seed)
+    clock = time.perf_counter_ns
+    in_flight = asyncio.Semaphore(depth)
+    sent = asyncio.Queue()
+
+    async def send():
+        for _ in range(count):
+            await in_flight.acquire()
+            writer.write(encode(rng.choice(REQUESTS), framing))
+            sent.put_nowait(clock())
+            await writer.drain()
+
+    async def receive():
+        for _ in range(count):
+            if await read_message(reader, framing) is None:
+                raise ConnectionError("server closed the connection")
+            hist.record(clock() - await sent.get())
+            in_flight.release()
+
+    await asyncio.gather(send(), receive())
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(args):
+    if args.unix:
+        def open_connection():
+            return asyncio.open_unix_connection(args.unix)
+    else:
+        def open_connection():
+            return asyncio.open_connection(args.host, args.port)
+
+    hist = LatencyHistogram()
+    per_connection = args.requests // args.connections
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        connection(open_connection, per_connection, args.pipeline,
+                   args.framing, hist, seed)
+        for seed in range(args.connections)))
+    return hist, time.perf_counter() - start
+
+
+def spawn_server(args):
+    """Start python -m server on a temporary Unix socket."""
+    args.unix = os.path.join(tempfile.mkdtemp(), "calc.sock")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "server", "--unix", args.unix,
+         "--framing", args.framing],
+        cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    proc.stderr.readline()    # "listening on ..."
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH")
+    parser.add_argument("--framing", choices=FRAMINGS, default="line")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a server on a temporary Unix socket")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--pipeline", type=int, default=32,
+                        help="requests in flight per connection")
+    parser.add_argument("--requests", type=int, default=200_000,
+                        help="total requests over all connections")
+    args = parser.parse_args()
+
+    proc = spawn_server(args) if args.spawn else None
+    try:
+        hist, elapsed = asyncio.run(load(args))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    ms = 1e6
+    print(f"{hist.count} requests in {elapsed:.2f}s: "
+          f"{hist.count / elapsed:,.0f} req/s")
+    print(f"latency ms  p50 {hist.percentile(50) / ms:.3f}  "
+          f"p99 {hist.percentile(99) / ms:.3f}  "
+          f"p99.9 {hist.percentile(99.9) / ms:.3f}  "
+          f"max {hist.max / ms:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Streaming command-line calculator.
+
+Reads one expression per line from files (or stdin) and writes one
+formatted result per line to stdout:
+
+    python -m calculator expressions.txt > results.txt
+    cat log.txt | python -m calculator --chunk-size 8192 --workers 8
+
+Lines are processed in fixed-size chunks, so memory stays flat no matter
+how large the input is.
+
+With --macro, every line is instead an input value for a recorded macro
+(see macros.py) and the output is the display after replaying it:
+
+    python -m calculator --macro pricing --macro-file macros.json prices.txt
+"""
+import argparse
+import os
+import sys
+from functools import partial
+
+from numeric import available_backends, set_backend
+from operations import (
+    calculate_expression, chunked, format_result, map_chunks,
+    set_result_mode
+)
+from utils import backend_options, positive_int
+
+DEFAULT_CHUNK_SIZE = 4096
+READ_BUFFER = 1 << 20
+
+
+# ============================
+#   PIPELINE STAGES
+# ============================
+def read_lines(paths):
+    """Yield expressions from each path ("-" is stdin), one per line."""
+    for path in paths or ["-"]:
+        if path == "-":
+            for line in sys.stdin:
+                yield line.rstrip("\r\n")
+        else:
+            with open(path, encoding="utf-8", buffering=READ_BUFFER) as f:
+                for line in f:
+                    yield line.rstrip("\r\n")
+
+
+def evaluate_chunk(chunk):
+    """Evaluate a chunk and return its results as one output block."""
+    return "".join(
+        [format_result(calculate_expression(expr)) + "\n" for expr in chunk])
+
+
+def run(paths, out, chunk_size=DEFAULT_CHUNK_SIZE, workers=1,
+        backend="float", options=None, mode="fixed", macro=None):
+    """Stream results for every expression in paths to out.
+
+    If macro (a key sequence) is given, lines are its input values.
+    """
+    set_backend(backend, **(options or {}))
+    set_result_mode(mode)
+    evaluate = evaluate_chunk
+    if macro is not None:
+        import macros
+        evaluate = partial(macros.evaluate_chunk, tuple(macro))
+    chunks = chunked(read_lines(paths), chunk_size)
+    if workers > 1:
+        # Workers inherit the backend and result mode set above.
+        blocks = map_chunks(evaluate, chunks, workers)
+    else:
+        blocks = map(evaluate, chunks)
+    write = out.write
+    for block in blocks:
+        write(block)
+    out.flush()
+
+
+# ============================
+#   COMMAND LINE
+# ============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m calculator",
+        description="Evaluate one expression per line and print results.")
+    parser.add_argument(
+        "files", nargs="*", metavar="FILE",
+        help="input files (default: stdin; '-' also means stdin)")
+    parser.add_argument(
+        "--chunk-size", type=positive_int, default=DEFAULT_CHUNK_SIZE,
+        help=f"lines per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument(
+        "--workers", type=positive_int, default=1,
+        help="evaluate chunks in N worker processes (default: 1)")
+    parser.add_argument(
+        "--numeric", choices=available_backends(), default="float",
+        help="numeric backend (default: float)")
+    parser.add_argument(
+        "--precision", type=positive_int,
+        help="significant digits for --numeric decimal")
+    parser.add_argument(
+        "--shortest", action="store_true",
+        help="print the shortest round-trip form of each result instead "
+             "of rounding to 10 decimal places")
+    parser.add_argument(
+        "--macro", metavar="NAME",
+        help="treat each line as the input of this recorded macro")
+    parser.add_argument(
+        "--macro-file", metavar="PATH",
+        default=os.path.join(os.environ.get("CALCULATOR_DATA_DIR", "."),
+                             "macros.json"),
+        help="macros saved by the calculator "
+             "(default: $CALCULATOR_DATA_DIR/macros.json)")
+    args = parser.parse_args(argv)
+
+    options = backend_options(parser, args)
+
+    keys = None
+    if args.macro is not None:
+        from macros import MacroError, MacroLibrary
+        try:
+            keys = MacroLibrary(args.macro_file)[args.macro].keys
+        except (MacroError, OSError, ValueError) as exc:
+            parser.error(str(exc))
+
+    try:
+        run(args.files, sys.stdout, args.chunk_size, args.workers,
+            args.numeric, options, "shortest" if args.shortest else "fixed",
+            keys)
+    except BrokenPipeError:
+        # Downstream closed early (e.g. `| head`); exit quietly.
+        sys.stderr.close()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+from functools import partial
+
+from operations import (
+    apply_binary, reciprocal, square, sqrt, toggle_sign, percentage,
+    format_number
+)
+from history import HistoryRecord, HistoryStore
+from numeric import to_number
+
+
+# ============================================================
+#   CALCULATOR ENGINE (Windows Mode A)
+# ============================================================
+class CalculatorEngine:
+    """Pure-Python calculator state machine.
+
+    Feed it button texts with press(); it returns the
+    (expression, result) pair the display should show. No Tk needed.
+    """
+
+    __slots__ = (
+        "current_value",      # number being typed
+        "stored_value",       # left operand
+        "pending_operator",   # operator waiting to be applied
+        "last_operator",      # for repeated equals
+        "last_operand",       # for repeated equals
+        "just_evaluated",
+        "expression",         # top display line
+        "result",             # bottom display line
+        "history",            # HistoryStore of HistoryRecord
+    )
+
+    def __init__(self, history=None):
+        self.history = HistoryStore() if history is None else history
+        self.expression = ""
+        self.result = ""
+        self.reset()
+
+    def reset(self):
+        """Forget operands and operators (the "C" key without display)."""
+        self.current_value = ""
+        self.stored_value = None
+        self.pending_operator = None
+        self.last_operator = None
+        self.last_operand = None
+        self.just_evaluated = False
+
+    @property
+    def display(self):
+        return self.expression, self.result
+
+    def load_result(self, record):
+        """Show a HistoryRecord and continue calculating from it."""
+        self.expression = record.expression
+        self.result = record.result_text
+        self.current_value = ""
+        try:
+            self.stored_value = to_number(record.result)
+        except (TypeError, ValueError):
+            self.stored_value = None
+        self.pending_operator = None
+        self.last_operator = None
+        self.last_operand = None
+        self.just_evaluated = True
+
+    def feed(self, keys):
+        """Press every key in keys and return the final display."""
+        press = self.press
+        for key in keys:
+            press(key)
+        return self.expression, self.result
+
+    def _record(self, left, op, right, result):
+        self.history.add(HistoryRecord(left, op, right, result))
+
+    def _operand(self):
+        """current_value as a number, or None if it is not one (e.g.
+        "Error" left by 1/x of zero)."""
+        try:
+            return to_number(self.current_value or "0")
+        except (TypeError, ValueError):
+            return None
+
+    def _error(self):
+        """Show "Error" and start over, as apply_binary's "Error" does."""
+        self.reset()
+        self.expression = ""
+        self.result = "Error"
+
+    # --- key handlers (see KEYS below) ---
+    def _digit(self, text):
+        if self.just_evaluated:
+            # Start new calculation
+            self.current_value = text
+            self.expression = ""
+            self.result = text
+            self.just_evaluated = False
+            return
+
+        # Normal typing
+        self.current_value += text
+        self.result = self.current_value
+
+    def _decimal(self, text):
+        if self.just_evaluated:
+            self.current_value = "0."
+            self.expression = ""
+            self.result = "0."
+            self.just_evaluated = False
+            return
+
+        if "." not in self.current_value:
+            if self.current_value == "":
+                self.current_value = "0."
+            else:
+                self.current_value += "."
+            self.result = self.current_value
+
+    def _operator(self, text):
+        # If no stored value yet
+        if self.stored_value is None:
+            self.stored_value = self._operand()
+            if self.stored_value is None:
+                self._error()
+                return
+            self.pending_operator = text
+            self.expression = f"{format_number(self.stored_value)} {text}"
+            self.current_value = ""
+            self.just_evaluated = False
+            return
+
+        # If operator exists, evaluate immediately
+        if self.current_value != "":
+            right = self._operand()
+            if right is None:
+                self._error()
+                return
+            self.stored_value = apply_binary(
+                self.pending_operator, self.stored_value, right)
+            self.expression = f"{format_number(self.stored_value)} {text}"
+            self.result = format_number(self.stored_value)
+
+        self.pending_operator = text
+        self.current_value = ""
+        self.just_evaluated = False
+
+    def _percent(self, text):
+        self.result = format_number(percentage(self.result or self.expression))
+
+    def _clear_entry(self, text):
+        self.current_value = ""
+        self.result = "0"
+
+    def _clear_all(self, text):
+        self.reset()
+        self.expression = ""
+        self.result = "0"
+
+    def _backspace(self, text):
+        if not self.just_evaluated:
+            self.current_value = self.current_value[:-1]
+            self.result = self.current_value or "0"
+
+    def _unary(self, text):
+        # Reciprocal / square / square root
+        if self.current_value == "":
+            self.current_value = self.result
+        self.current_value = str(UNARY_KEYS[text](self.current_value))
+        self.result = self.current_value
+        self.just_evaluated = True
+
+    def _sign(self, text):
+        if self.current_value == "":
+            self.current_value = self.result
+        self.current_value = str(toggle_sign(self.current_value))
+        self.result = self.current_value
+
+    def _equals(self, text):
+        # Case 1: normal evaluation
+        if self.pending_operator and self.current_value != "":
+            left = self.stored_value
+            right = self._operand()
+            if right is None:
+                self._error()
+                return
+            op = self.pending_operator
+
+            value = apply_binary(op, left, right)
+
+            # Save for repeated equals
+            self.last_operator = op
+            self.last_operand = right
+
+            self.expression = (
+                f"{format_number(left)} {op} {format_number(right)} =")
+            self.result = format_number(value)
+            self._record(left, op, right, value)
+
+            # Reset state
+            self.stored_value = value
+            self.current_value = ""
+            self.pending_operator = None
+            self.just_evaluated = True
+            return
+
+        # Case 2: repeated equals
+        if self.last_operator and self.stored_value is not None:
+            left = self.stored_value
+            right = self.last_operand
+            op = self.last_operator
+
+            value = apply_binary(op, left, right)
+
+            self.expression = (
+                f"{format_number(left)} {op} {format_number(right)} =")
+            self.result = format_number(value)
+            self._record(left, op, right, value)
+
+            self.stored_value = value
+            self.just_evaluated = True
+
+    # --- dispatch ---
+    def press(self, text):
+        """Apply one button press and return (expression, result)."""
+        handler = KEYS.get(text)
+        if handler is not None:
+            handler(self, text)
+        return self.expression, self.result
+
+    def handler(self, text):
+        """press(text) bound once, for a button or key binding.
+
+        The returned callable skips the table lookup; it updates the
+        display state and returns None.
+        """
+        return partial(KEYS[text], self, text)
+
+
+# ============================================================
+#   KEY DISPATCH TABLE
+# ============================================================
+UNARY_KEYS = {"1/x": reciprocal, "x²": square, "²√x": sqrt}
+
+KEYS = {digit: CalculatorEngine._digit for digit in "0123456789"}
+KEYS.update({
+    ".": CalculatorEngine._decimal,
+    "+": CalculatorEngine._operator,
+    "−": CalculatorEngine._operator,
+    "×": CalculatorEngine._operator,
+    "÷": CalculatorEngine._operator,
+    "%": CalculatorEngine._percent,
+    "CE": CalculatorEngine._clear_entry,
+    "C": CalculatorEngine._clear_all,
+    "⌫": CalculatorEngine._backspace,
+    "+/-": CalculatorEngine._sign,
+    "=": CalculatorEngine._equals,
+})
+KEYS.update(dict.fromkeys(UNARY_KEYS, CalculatorEngine._unary))
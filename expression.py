@@ -0,0 +1,418 @@
+import operator
+import re
+from functools import lru_cache
+
+import numeric
+
+# ============================
+#   ERRORS
+# ============================
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be tokenized or parsed."""
+
+
+# ============================
+#   NORMALIZATION
+# ============================
+_UNICODE_OPERATORS = str.maketrans({"×": "*", "÷": "/", "−": "-"})
+
+
+def normalize(expr: str) -> str:
+    """Map display operators (×, ÷, −) to their ASCII form."""
+    return expr.translate(_UNICODE_OPERATORS).strip()
+
+
+# ============================
+#   TOKENIZER
+# ============================
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+      | (?P<op>\*\*|//|[-+*/%()])
+    )""", re.VERBOSE)
+
+NUM, NAME, OP, END = "num", "name", "op", "end"
+
+
+def _check_literal(text):
+    """Reject literals Python source would (e.g. "05")."""
+    if (len(text) > 1 and text[0] == "0" and text.strip("0")
+            and text.isdigit()):
+        raise ExpressionError(f"leading zeros in literal {text!r}")
+
+
+def tokenize(expr: str, backend=None):
+    """Split a normalized expression into (kind, value) tokens.
+
+    Numeric literals are converted with backend (default: the active
+    numeric backend).
+    """
+    literal = (backend or numeric.get_backend()).literal
+    tokens = []
+    pos = 0
+    end = len(expr)
+    match = _TOKEN_RE.match
+    while pos < end:
+        m = match(expr, pos)
+        if m is None:
+            if expr[pos:].strip() == "":
+                break
+            raise ExpressionError(f"unexpected character at {pos}: "
+                                  f"{expr[pos:pos + 10]!r}")
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == NUM:
+            _check_literal(value)
+            value = literal(value)
+        tokens.append((kind, value))
+        pos = m.end()
+    tokens.append((END, None))
+    return tokens
+
+
+# ============================
+#   PARSER (PRATT)
+# ============================
+# AST nodes are plain tuples:
+#   ("num", value) | ("name", id) | ("neg", node) | ("pos", node)
+#   ("bin", op, left, right)
+_BINARY_POWER = {
+    "+": 10, "-": 10,
+    "*": 20, "/": 20, "//": 20, "%": 20,
+    "**": 40,
+}
+_PREFIX_POWER = 30
+_RIGHT_ASSOC = {"**"}
+
+
+class _Parser:
+    __slots__ = ("tokens", "pos")
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def next(self):
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def parse(self):
+        node = self.expression(0)
+        kind, value = self.peek()
+        if kind != END:
+            raise ExpressionError(f"unexpected token {value!r}")
+        return node
+
+    def expression(self, min_power):
+        node = self.prefix()
+        while True:
+            kind, value = self.peek()
+            if kind != OP or value not in _BINARY_POWER:
+                return node
+            power = _BINARY_POWER[value]
+            if power <= min_power:
+                return node
+            self.next()
+            right_power = power - 1 if value in _RIGHT_ASSOC else power
+            node = ("bin", value, node, self.expression(right_power))
+
+    def prefix(self):
+        kind, value = self.next()
+        if kind == NUM:
+            return ("num", value)
+        if kind == NAME:
+            return ("name", value)
+        if kind == OP:
+            if value == "-":
+                return ("neg", self.expression(_PREFIX_POWER))
+            if value == "+":
+                return ("pos", self.expression(_PREFIX_POWER))
+            if value == "(":
+                node = self.expression(0)
+                if self.next() != (OP, ")"):
+                    raise ExpressionError("missing closing parenthesis")
+                return node
+        if kind == END:
+            raise ExpressionError("unexpected end of expression")
+        raise ExpressionError(f"unexpected token {value!r}")
+
+
+def parse(expr: str, backend=None):
+    """Parse a normalized expression into an AST tuple."""
+    return _Parser(tokenize(expr, backend)).parse()
+
+
+# ============================
+#   CODE GENERATION
+# ============================
+# Compiled code is a flat tuple of (opcode, arg) pairs run on a stack.
+# STORE copies the top of the stack into temporary arg; FETCH pushes it.
+CONST, LOAD, UNARY, BINARY, STORE, FETCH = 0, 1, 2, 3, 4, 5
+
+BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": operator.pow,
+}
+UNARY_OPERATORS = {
+    "neg": operator.neg,
+    "pos": operator.pos,
+}
+
+
+def _emit(node, code, shared=None):
+    """Append node's code; keys in shared (key -> temp) are computed once."""
+    if shared:
+        temp = shared.get(_key(node))
+        if temp is not None:
+            if temp[1]:
+                code.append((FETCH, temp[0]))
+                return
+            temp[1] = True
+    tag = node[0]
+    if tag == "num":
+        code.append((CONST, node[1]))
+    elif tag == "name":
+        code.append((LOAD, node[1]))
+    elif tag == "bin":
+        _emit(node[2], code, shared)
+        _emit(node[3], code, shared)
+        code.append((BINARY, BINARY_OPERATORS[node[1]]))
+    else:
+        _emit(node[1], code, shared)
+        code.append((UNARY, UNARY_OPERATORS[tag]))
+    if shared and temp is not None:
+        code.append((STORE, temp[0]))
+
+
+def _names(node, found):
+    tag = node[0]
+    if tag == "name":
+        found.add(node[1])
+    elif tag == "bin":
+        _names(node[2], found)
+        _names(node[3], found)
+    elif tag in UNARY_OPERATORS:
+        _names(node[1], found)
+    return found
+
+
+# ============================
+#   OPTIMIZER
+# ============================
+# Every rewrite gives the same value, of the same type, and raises the
+# same exceptions as the original tree. For floats that rules out most
+# textbook identities: x + 0 turns -0.0 into 0.0, x * 0 and x - x are
+# NaN for infinities, and reassociating (x + 1) + 2 changes rounding.
+# What is left holds for ints and floats alike (names in batch mode may
+# be either); Decimal rounds on +x and -x, so other backends only fold.
+def _is_int(node, value):
+    return node[0] == "num" and type(node[1]) is int and node[1] == value
+
+
+def _identity(op, left, right):
+    """A simpler node equal to left op right, or None."""
+    if op == "*":
+        if _is_int(right, 1):
+            return left
+        if _is_int(left, 1):
+            return right
+        if _is_int(right, -1):
+            return ("neg", left)
+        if _is_int(left, -1):
+            return ("neg", right)
+    elif op == "-" and _is_int(right, 0):
+        return left         # -0.0 - 0 is still -0.0
+    elif op == "**" and _is_int(right, 1):
+        return left
+    return None
+
+
+def optimize_tree(node, backend=None):
+    """Fold constant subtrees and drop exact identities (x × 1, --x).
+
+    A constant subtree that raises when folded (1 / 0) is left for
+    evaluation to raise.
+    """
+    tag = node[0]
+    if tag == "bin":
+        op = node[1]
+        left = optimize_tree(node[2], backend)
+        right = optimize_tree(node[3], backend)
+        if left[0] == "num" and right[0] == "num":
+            try:
+                return ("num", BINARY_OPERATORS[op](left[1], right[1]))
+            except Exception:
+                pass
+        elif (backend or numeric.get_backend()).name == "float":
+            simpler = _identity(op, left, right)
+            if simpler is not None:
+                return optimize_tree(simpler, backend)
+        return ("bin", op, left, right)
+    if tag in UNARY_OPERATORS:
+        operand = optimize_tree(node[1], backend)
+        if operand[0] == "num":
+            try:
+                return ("num", UNARY_OPERATORS[tag](operand[1]))
+            except Exception:
+                pass
+        elif (backend or numeric.get_backend()).name == "float":
+            if tag == "pos":
+                return operand
+            if operand[0] == "neg":
+                return operand[1]
+        return (tag, operand)
+    return node
+
+
+def _key(node):
+    """Hashable identity of a subtree: 1, 1.0 and -0.0 stay distinct."""
+    tag = node[0]
+    if tag == "num":
+        return ("num", type(node[1]), repr(node[1]))
+    if tag == "name":
+        return node
+    if tag == "bin":
+        return ("bin", node[1], _key(node[2]), _key(node[3]))
+    return (tag, _key(node[1]))
+
+
+def _shared(node, counts=None):
+    """{key: [temp, emitted]} for subtrees that occur more than once.
+
+    Occurrences inside a repeated subtree are not counted again, since
+    only its first copy will be evaluated.
+    """
+    top = counts is None
+    if top:
+        counts = {}
+    key = _key(node)
+    counts[key] = counts.get(key, 0) + 1
+    if counts[key] == 1:
+        if node[0] == "bin":
+            _shared(node[2], counts)
+            _shared(node[3], counts)
+        elif node[0] in UNARY_OPERATORS:
+            _shared(node[1], counts)
+    if not top:
+        return None
+    repeated = [key for key, count in counts.items()
+                if count > 1 and key[0] not in ("num", "name")]
+    return {key: [temp, False] for temp, key in enumerate(repeated)}
+
+
+_SYMBOLS = {func: op for op, func in BINARY_OPERATORS.items()}
+
+
+# ============================
+#   COMPILED EXPRESSION
+# ============================
+class CompiledExpression:
+    """A parsed expression ready to be evaluated repeatedly.
+
+    `tree` is the parse tree and `optimized` the tree the code runs
+    (see optimize_tree(); pass optimize=False to run the parse tree as is).
+    explain() shows the code as text.
+    """
+
+    __slots__ = ("source", "tree", "optimized", "code", "names", "temps")
+
+    def __init__(self, source, tree, backend=None, optimize=True):
+        self.source = source
+        self.tree = tree
+        if optimize:
+            self.optimized = optimize_tree(tree, backend)
+            shared = _shared(self.optimized)
+        else:
+            self.optimized = tree
+            shared = {}
+        code = []
+        _emit(self.optimized, code, shared)
+        self.code = tuple(code)
+        self.temps = len(shared)
+        self.names = frozenset(_names(tree, set()))
+
+    def evaluate(self, env=None):
+        """Run the compiled code; names are looked up in env."""
+        code = self.code
+        if len(code) == 1:
+            opcode, arg = code[0]
+            return arg if opcode == CONST else env[arg]
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        temps = [None] * self.temps
+        for opcode, arg in code:
+            if opcode == CONST:
+                push(arg)
+            elif opcode == BINARY:
+                right = pop()
+                push(arg(pop(), right))
+            elif opcode == LOAD:
+                push(env[arg])
+            elif opcode == UNARY:
+                push(arg(pop()))
+            elif opcode == STORE:
+                temps[arg] = stack[-1]
+            else:
+                push(temps[arg])
+        return stack[0]
+
+    def explain(self):
+        """The code as text: one "tN = ..." line per shared subexpression,
+        then the result, e.g. "t0 = (a * b)" and "t0 + t0"."""
+        lines = []
+        stack = []
+        for opcode, arg in self.code:
+            if opcode == CONST:
+                text = str(arg)
+                stack.append(f"({text})" if text.startswith("-") else text)
+            elif opcode == LOAD:
+                stack.append(arg)
+            elif opcode == BINARY:
+                right = stack.pop()
+                stack.append(f"({stack.pop()} {_SYMBOLS[arg]} {right})")
+            elif opcode == UNARY:
+                sign = "-" if arg is operator.neg else "+"
+                stack.append(f"{sign}{stack.pop()}")
+            elif opcode == STORE:
+                lines.append(f"t{arg} = {stack.pop()}")
+                stack.append(f"t{arg}")
+            else:
+                stack.append(f"t{arg}")
+        result = stack[0]
+        if result.startswith("(") and result.endswith(")"):
+            result = result[1:-1]
+        return "\n".join(lines + [result])
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+
+@lru_cache(maxsize=1024)
+def _compile_normalized(source, backend):
+    return CompiledExpression(source, parse(source, backend), backend)
+
+
+def compile_expression(expr: str, backend=None) -> CompiledExpression:
+    """Normalize and compile expr, reusing cached compilations.
+
+    Literals use backend, or the active numeric backend if omitted.
+    """
+    return _compile_normalized(normalize(expr),
+                               backend or numeric.get_backend())
+
+
+def cache_info():
+    """Return hit/miss statistics for the compilation cache."""
+    return _compile_normalized.cache_info()
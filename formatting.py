@@ -0,0 +1,84 @@
+"""Fast number formatting for the float backend.
+
+Values are dispatched on their type: floats and ints are formatted
+directly without a float() round-trip. Only text (e.g. a value already
+on the display or in memory) is parsed, and the last CACHE_SIZE texts
+are kept in an LRU so re-formatting them skips parse and format.
+"""
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+
+# ============================
+#   FLOAT FORMATTERS
+# ============================
+def number(num: float) -> str:
+    """Int-like floats without .0, others as their shortest repr.
+
+    repr() gives the shortest text that round-trips to the same float.
+    """
+    if num.is_integer():
+        return str(int(num))
+    return repr(num)
+
+
+def fixed(num: float, places: int = 10) -> str:
+    """Int-like floats without .0, others rounded to `places` decimals."""
+    if num.is_integer():
+        return str(int(num))
+    text = f"{num:.{places}f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+# ============================
+#   LRU CACHES (TEXT INPUT)
+# ============================
+@lru_cache(maxsize=CACHE_SIZE)
+def _number_text(text):
+    return number(float(text))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _fixed_text(text):
+    return fixed(float(text))
+
+
+# ============================
+#   TYPE DISPATCH
+# ============================
+def format_number(value):
+    """format_number for floats, ints and numeric text."""
+    kind = type(value)
+    if kind is float:
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    if kind is int:
+        return str(value)
+    if kind is str:
+        return _number_text(value)
+    return number(float(value))
+
+
+def format_fixed(value):
+    """format_result (10 decimal places) for floats, ints and text."""
+    kind = type(value)
+    if kind is float:
+        return fixed(value)
+    if kind is int:
+        return str(value)
+    if kind is str:
+        return _fixed_text(value)
+    return fixed(float(value))
+
+
+def cache_info():
+    """LRU statistics for the text caches."""
+    return {"number": _number_text.cache_info(),
+            "fixed": _fixed_text.cache_info()}
+
+
+def cache_clear():
+    _number_text.cache_clear()
+    _fixed_text.cache_clear()
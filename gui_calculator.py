@@ -1,87 +1,154 @@
+import sys
+
+# --profile-startup has to start timing before anything else is imported
+if "--profile-startup" in sys.argv:
+    from instrumentation import StartupProfile
+    profile = StartupProfile()
+else:
+    profile = None
+
+import argparse
+import atexit
+import os
 import tkinter as tk
 from tkinter import ttk
 from operations import (
-    calculate_expression, memory_store, memory_add, memory_subtract,
-    memory_recall, memory_clear, memory_list, reciprocal, square, sqrt,
-    toggle_sign, percentage, format_number
+    memory_store, memory_add, memory_subtract,
+    memory_recall, memory_clear, format_number,
+    subscribe_memory
 )
+import operations
+from numeric import available_backends, set_backend
 from style import apply_styles
+from engine import CalculatorEngine
+from history import HistoryStore, IndexedHistory
+from utils import backend_options, positive_int
+from widgets import (
+    VirtualList, LayoutScheduler, PopupManager, TooltipService,
+    set_geometry, place_at, unplace
+)
+
+
+def phase(name):
+    """End a named startup phase when --profile-startup is on."""
+    if profile is not None:
+        profile.mark(name)
+
+
+phase("imports")
+
+# === Command Line ===
+parser = argparse.ArgumentParser(description="Standard Calculator")
+parser.add_argument(
+    "--data-dir", default=os.environ.get("CALCULATOR_DATA_DIR"),
+    help="keep history and memory in this directory between sessions "
+         "(default: $CALCULATOR_DATA_DIR, otherwise nothing is saved)")
+parser.add_argument(
+    "--numeric", choices=available_backends(),
+    default=os.environ.get("CALCULATOR_NUMERIC", "float"),
+    help="numeric backend (default: $CALCULATOR_NUMERIC or float)")
+parser.add_argument(
+    "--precision", type=positive_int,
+    help="significant digits for --numeric decimal")
+parser.add_argument(
+    "--trace", action="store_true",
+    default=bool(os.environ.get("CALCULATOR_TRACE")),
+    help="record keystroke-to-render latencies and print them on exit "
+         "(default: on if $CALCULATOR_TRACE is set)")
+parser.add_argument(
+    "--profile-startup", action="store_true",
+    help="print import and startup phase timings (up to the first "
+         "paint) to stderr")
+args, _ = parser.parse_known_args()
+
+set_backend(args.numeric, **backend_options(parser, args))
+
+# === Latency Tracing (opt-in) ===
+tracer = None
+if args.trace:
+    import engine as engine_module
+    from instrumentation import Tracer
+
+    tracer = Tracer()
+    # Attribute the engine's formatting time to its own stage
+    engine_module.format_number = tracer.timed_format(
+        engine_module.format_number)
+    atexit.register(lambda: print(tracer.report(), file=sys.stderr))
 
 # === Main Window Setup ===
 root = tk.Tk()
 root.title("Standard Calculator")
 root.geometry("320x420")
 root.minsize(320, 420)
+phase("window")
 
-# === Apply Styles ===
-apply_styles()
-
-
-# === Tooltip Helper Class ===
-class ToolTip:
-    def __init__(self, widget, text):
-        self.widget = widget
-        self.text = text
-        self.tip_window = None
-        widget.bind("<Enter>", self.show_tip)
-        widget.bind("<Leave>", self.hide_tip)
-
-    def show_tip(self, event=None):
-        if self.tip_window or not self.text:
-            return
-        x = self.widget.winfo_rootx() + 20
-        y = self.widget.winfo_rooty() + self.widget.winfo_height() + 5
-
-        self.tip_window = tw = tk.Toplevel(self.widget)
-        tw.wm_overrideredirect(True)
-        tw.wm_geometry(f"+{x}+{y}")
-
-        label = tk.Label(
-            tw, text=self.text, justify="left",
-            background="#ffffe0", relief="solid", borderwidth=1,
-            font=("Segoe UI", 9)
-        )
-        label.pack(ipadx=4, ipady=2)
-
-    def hide_tip(self, event=None):
-        tw = self.tip_window
-        self.tip_window = None
-        if tw:
-            tw.destroy()
+# ttk styles are applied by the panels on first use (see style.py).
 
 
 # === Variables ===
 expression_var = tk.StringVar()
 result_var = tk.StringVar()
-history_data = []
+if args.data_dir:
+    # Persistent session: history pages straight from the mmap'ed log,
+    # memory is rebuilt from its journal and every change is logged.
+    from storage import MemoryJournal, PersistentHistory
+
+    history_data = PersistentHistory(args.data_dir)
+    memory_journal = MemoryJournal(
+        os.path.join(args.data_dir, "memory.log"), operations.memory)
+    memory_journal.restore()
+    subscribe_memory(memory_journal.record)
+    atexit.register(memory_journal.close)
+    atexit.register(history_data.close)
+else:
+    history_data = HistoryStore()
+# Searchable from the history panel; the index is built on first search.
+history_data = IndexedHistory(history_data)
 memory_visible = tk.BooleanVar(value=False)
 history_visible = tk.BooleanVar(value=False)
-just_evaluated = tk.BooleanVar(value=False)
 last_was_operator = tk.BooleanVar(value=False)
-selected_history_row = None
-selected_memory_row = None
+selected_history = None   # (history index, 0=expression / 1=result)
+selected_memory = None   # index into operations.memory
 history_popup = None
+history_list = None
+history_search_var = None
+history_search_job = None
+SEARCH_DELAY_MS = 150   # typing pause before the history is searched
 memory_popup = None
+memory_view = None
+popups = PopupManager(root)   # closes the panels on outside clicks
+phase("state")
 # ============================================================
-#   INTERNAL STATE (Windows Mode A)
+#   INTERNAL STATE (Windows Mode A) — see engine.py
 # ============================================================
-current_value = ""        # number being typed
-stored_value = None       # left operand
-pending_operator = None   # operator waiting to be applied
-last_operator = None      # for repeated equals
-last_operand = None       # for repeated equals
+engine = CalculatorEngine(history=history_data)
+
+
+def refresh_display():
+    """Push the engine's display state into the Tk variables."""
+    expression_var.set(engine.expression)
+    result_var.set(engine.result)
+
+
+def mark_evaluated():
+    engine.just_evaluated = True
 
 
 def hide_history_overlay():
     """Close the history popup completely."""
-    global history_popup, selected_history_row
+    global history_popup, history_list, selected_history
+    global history_search_var
+    cancel_history_search()
     if history_popup is not None:
+        popups.closed(history_popup)
         try:
             history_popup.destroy()
         except Exception:
             pass
         history_popup = None
-    selected_history_row = None
+    history_list = None
+    history_search_var = None
+    selected_history = None
     history_visible.set(False)
 
 
@@ -197,18 +264,107 @@ def copy_to_clipboard(value):
 # ============================================================
 #   FLOATING HISTORY PANEL
 # ============================================================
+# The popup and its rows are built when the panel first opens (see
+# show_history_overlay()).
+def make_history_row(parent):
+    """Build one reusable history row (expression + result entries)."""
+    row = tk.Frame(parent, bg="white")
+    row.index = None
+    row.item = None
+    row.entries = []
+
+    for font in (("Segoe UI", 12), ("Segoe UI", 16, "bold")):
+        entry = tk.Entry(
+            row,
+            font=font,
+            justify="right",
+            bd=0,
+            relief="flat",
+            bg="white",
+            readonlybackground="white",
+            state="readonly",
+            cursor="arrow"
+        )
+        entry.pack(fill="x", padx=5, pady=(2, 0))
+        row.entries.append(entry)
+
+    # CLICK HANDLER (H1: load expression + result)
+    for part, entry in enumerate(row.entries):
+        entry.bind("<Button-1>",
+                   lambda e, r=row, p=part: on_history_click(r, p))
+
+    # HOVER HANDLERS
+    for widget in (row, *row.entries):
+        widget.bind("<Enter>", lambda e, r=row: paint_history_row(r, True))
+        widget.bind("<Leave>", lambda e, r=row: paint_history_row(r))
+
+    return row
+
+
+def fill_history_row(row, index, record):
+    """Show history_data[index] in a recycled row."""
+    row.index = index
+    row.item = record
+    for entry, text in zip(row.entries,
+                           (record.expression, record.result_text)):
+        entry.config(state="normal")
+        entry.delete(0, tk.END)
+        entry.insert(0, text)
+        entry.config(state="readonly")
+    paint_history_row(row)
+
+
+def paint_history_row(row, hover=False):
+    """Apply selection highlight and, unless selected, hover colors."""
+    selected_part = None
+    if selected_history and selected_history[0] == row.index:
+        selected_part = selected_history[1]
+    if hover and selected_part is not None:
+        return
+
+    bg = "#e0e0e0" if hover else "white"
+    row.config(bg=bg)
+    for part, entry in enumerate(row.entries):
+        color = "#cce5ff" if part == selected_part else bg
+        entry.config(bg=color, readonlybackground=color)
+
+
+def on_history_click(row, part):
+    global selected_history
+    if row.index is None:
+        return
+
+    # Highlight the clicked entry, clear the previous selection
+    selected_history = (row.index, part)
+    for other in history_list.rows:
+        if other.index is not None:
+            paint_history_row(other)
+
+    # Copy to clipboard
+    record = row.item
+    copy_to_clipboard(str(record))
 
-history_overlay = tk.Frame(root, bd=1, relief="solid", bg="#f0f0f0")
-history_inner = tk.Frame(history_overlay, bg="#f0f0f0")
-history_inner.pack(expand=True, fill="both")
+    # Select all text
+    entry = row.entries[part]
+    entry.config(state="normal")
+    entry.selection_range(0, tk.END)
+    entry.config(state="readonly")
+
+    # --- H1 behavior: load expression + result into display ---
+    # The engine resets its state for new calculations.
+    engine.load_result(record)
+    refresh_display()
 
 
 def show_history_overlay():
-    global history_popup, selected_history_row, history_delete_btn
-    selected_history_row = None
+    global history_popup, history_list, selected_history
+    global history_delete_btn, history_search_var
+    cancel_history_search()
+    selected_history = None
 
     # Destroy old popup if exists
     if history_popup is not None:
+        popups.closed(history_popup)
         try:
             history_popup.destroy()
         except Exception:
@@ -216,157 +372,89 @@ def show_history_overlay():
         history_popup = None
 
     # Create new popup
+    apply_styles()
     history_popup = tk.Toplevel(root)
     history_popup.overrideredirect(True)
     history_popup.configure(bg="#f0f0f0", bd=1, relief="solid")
 
+    # --- SEARCH BOX (see IndexedHistory.search for the syntax) ---
+    history_search_var = tk.StringVar()
+    search_entry = tk.Entry(
+        history_popup,
+        textvariable=history_search_var,
+        font=("Segoe UI", 10),
+        relief="flat",
+        bd=4
+    )
+    search_entry.pack(fill="x", padx=6, pady=(6, 0))
+    history_search_var.trace_add(
+        "write", lambda *args: schedule_history_search())
+
+    # Only the rows that fit on screen are built, whatever the size
+    # of history_data.
+    history_list = VirtualList(
+        history_popup,
+        history_data,
+        make_history_row,
+        fill_history_row,
+        empty_text="There is no history yet."
+    )
+    history_list.pack(expand=True, fill="both")
+
+    # --- DELETE BUTTON ---
+    # A child of the popup, placed in its coordinates: the list is
+    # shorter than the popup by the search box.
+    history_delete_btn = tk.Button(
+        history_popup, text="🗑️", command=clear_history)
+
     resize_floating_panels()
+    popups.opened(history_popup, hide_history_overlay)
+    search_entry.focus_set()
 
-    frame = tk.Frame(history_popup, bg="#f0f0f0")
-    frame.pack(expand=True, fill="both")
-
-    # Empty history
-    if not history_data:
-        tk.Label(
-            frame,
-            text="There is no history yet.",
-            anchor="nw",
-            justify="left",
-            bg="#f0f0f0",
-            fg="gray"
-        ).pack(expand=True, fill="both")
-        return
 
-    #   BUILD HISTORY ROWS
-    for item in history_data:
-        # Split into expression and result
-        if "=" in item:
-            expr, result = item.split("=")
-            expr = expr.strip() + " ="
-            result = result.strip()
-        else:
-            expr = item
-            result = ""
-        # --- create row ---
-        row = tk.Frame(frame, bg="white")
-        row.pack(fill="x", pady=2)
-
-        # Expression ENTRY
-        expr_entry = tk.Entry(
-            row,
-            text=expr,
-            font=("Segoe UI", 12),
-            justify="right",
-            bd=0,
-            relief="flat",
-            bg="white",
-            readonlybackground="white",
-            state="normal",
-            cursor="arrow"
-        )
-        expr_entry.insert(0, expr)
-        expr_entry.config(state="readonly")
-        expr_entry.pack(fill="x", padx=5, pady=(2, 0))
+def history_query():
+    return history_search_var.get().strip() if history_search_var else ""
 
-        # Result label
-        result_entry = tk.Entry(
-            row,
-            text=result,
-            font=("Segoe UI", 16, "bold"),
-            justify="right",
-            bd=0,
-            relief="flat",
-            bg="white",
-            readonlybackground="white",
-            state="normal",
-            cursor="arrow"
-        )
-        result_entry.insert(0, result)
-        result_entry.config(state="readonly")
-        result_entry.pack(fill="x", padx=5, pady=(2, 0))
-
-        # CLICK HANDLER (H1: load expression + result)
-        def on_click(event, entry, value):
-            global selected_history_row
-            global current_value, stored_value, pending_operator
-            global last_operator, last_operand
-
-            # Reset previous selection
-            if selected_history_row and selected_history_row != entry:
-                selected_history_row.config(
-                    bg="white", readonlybackground="white")
-
-            # Highlight selected entry
-            entry.config(bg="#cce5ff", readonlybackground="#cce5ff")
-            selected_history_row = entry
-
-            # Copy to clipboard
-            root.clipboard_clear()
-            root.clipboard_append(value)
-
-            # Select all text
-            entry.config(state="normal")
-            entry.selection_range(0, tk.END)
-            entry.config(state="readonly")
-
-            # --- H1 behavior: load expression + result into display ---
-            if "=" in value:
-                expr_raw, res_raw = value.split("=", 1)
-                expr_raw = expr_raw.strip()
-                res_raw = res_raw.strip()
-
-                # Top: full expression with "="
-                expression_var.set(expr_raw + " =")
-                # Bottom: result
-                result_var.set(res_raw)
-
-                # Reset internal state for new calculations
-                current_value = ""
-                try:
-                    stored_value = float(res_raw)
-                except ValueError:
-                    stored_value = None
-
-                pending_operator = None
-                last_operator = None
-                last_operand = None
-                just_evaluated.set(True)
-
-        # Bind click to both rows
-        expr_entry.bind("<Button-1>", lambda e, ent=expr_entry,
-                        v=item: on_click(e, ent, v))
-        result_entry.bind("<Button-1>", lambda e, ent=result_entry,
-                          v=item: on_click(e, ent, v))
-
-        # --- HOVER HANDLERS ---
-        def on_enter(e, r=row):
-            if (not selected_history_row or selected_history_row
-               not in r.winfo_children()):
-                r.config(bg="#e0e0e0")
-                expr_entry.config(bg="#e0e0e0", readonlybackground="#e0e0e0")
-                result_entry.config(bg="#e0e0e0", readonlybackground="#e0e0e0")
-
-        def on_leave(e, r=row):
-            if (not selected_history_row or selected_history_row
-               not in r.winfo_children()):
-                r.config(bg="white")
-                expr_entry.config(bg="white", readonlybackground="white")
-                result_entry.config(bg="white", readonlybackground="white")
-
-        # Hover bindings
-        row.bind("<Enter>", on_enter)
-        row.bind("<Leave>", on_leave)
-        expr_entry.bind("<Enter>", on_enter)
-        expr_entry.bind("<Leave>", on_leave)
-        result_entry.bind("<Enter>", on_enter)
-        result_entry.bind("<Leave>", on_leave)
 
-    # --- DELETE BUTTON ---
-    delete_btn = tk.Button(frame, text="🗑️", command=clear_history)
-    history_delete_btn = delete_btn
-    delete_btn.place(x=0, y=0)
+def schedule_history_search():
+    """Search once typing pauses for SEARCH_DELAY_MS."""
+    global history_search_job
+    cancel_history_search()
+    history_search_job = root.after(SEARCH_DELAY_MS, run_history_search)
 
-    resize_floating_panels()
+
+def cancel_history_search():
+    global history_search_job
+    if history_search_job is not None:
+        root.after_cancel(history_search_job)
+        history_search_job = None
+
+
+def run_history_search():
+    """Show the matches for the search box, or everything if empty."""
+    global history_search_job, selected_history
+    history_search_job = None
+    if history_list is None:
+        return
+    selected_history = None
+    query = history_query()
+    history_list.set_items(
+        history_data.search(query) if query else history_data)
+
+
+def history_prepended(count=1):
+    """Show count new history_data entries in the open panel."""
+    global selected_history
+    if history_list is None:
+        return
+    if history_query():
+        run_history_search()
+    else:
+        selected_history = None
+        history_list.prepend(count)
+    if len(history_data) == count:
+        # First entry: the delete button becomes available
+        resize_floating_panels()
 
 
 # === History Button Above Display ===
@@ -384,6 +472,7 @@ history_btn = tk.Button(
     command=toggle_history_panel
 )
 history_btn.pack(side="right", padx=5)
+popups.exempt_widget(history_btn)
 
 
 def clear_history():
@@ -392,14 +481,56 @@ def clear_history():
     history_visible.set(False)
 
 
+# === Macro Recording ===
+# Button presses between two clicks on ⏺ are saved as a named macro
+# in macros.json, in --data-dir or else the current directory (where
+# python -m calculator --macro NAME looks by default). macros.py is
+# imported on the first click.
+macro_recorder = None
+MACRO_FILE = os.path.join(args.data_dir or ".", "macros.json")
+
+
+def toggle_macro_recording():
+    global macro_recorder
+    if macro_recorder is None:
+        from macros import MacroRecorder
+        macro_recorder = MacroRecorder()
+    if not macro_recorder.recording:
+        macro_recorder.start()
+        macro_btn.config(text="⏹", fg="red")
+        return
+    keys = macro_recorder.stop()
+    macro_btn.config(text="⏺", fg="black")
+    if not keys:
+        return
+    from tkinter import messagebox, simpledialog
+    from macros import MacroError, MacroLibrary
+    name = simpledialog.askstring(
+        "Save macro", f"Name for these {len(keys)} keys:", parent=root)
+    if name:
+        try:
+            MacroLibrary(MACRO_FILE).add(name, keys)
+        except (MacroError, OSError) as exc:
+            messagebox.showerror("Save macro", str(exc), parent=root)
+
+
+macro_btn = tk.Button(
+    history_top_frame,
+    text="⏺",
+    font=("Segoe UI", 12),
+    relief="flat",
+    bg="#f3f3f3",
+    activebackground="#e0e0e0",
+    bd=0,
+    command=toggle_macro_recording
+)
+macro_btn.pack(side="left", padx=5)
+
+
 # ============================================================
 #   FLOATING MEMORY PANEL
 # ============================================================
 
-memory_overlay = tk.Frame(root, bd=1, relief="solid", bg="#f0f0f0")
-memory_inner = tk.Frame(memory_overlay, bg="#f0f0f0")
-memory_inner.pack(expand=True, fill="both")
-
 
 def handle_memory_action(action, value):
     if action == "MC":
@@ -408,110 +539,138 @@ def handle_memory_action(action, value):
         memory_add(value)
     elif action == "M-":
         memory_subtract(value)
-    # Refresh panel to show updated memory
-    show_memory_overlay()
+    # The panel updates itself through on_memory_changed
 
 
-def show_memory_overlay():
-    global memory_popup, selected_memory_row, memory_delete_btn
-    selected_memory_row = None
+def make_memory_row(parent):
+    """Build one reusable memory row (value + MC/M+/M- buttons)."""
+    row = tk.Frame(parent, bg="white")
+    row.index = None
+    row.item = None
 
-    try:
-        memory_popup.destroy()
-    except Exception:
-        pass
+    row.value_entry = tk.Entry(
+        row,
+        font=("Segoe UI", 14),
+        justify="right",
+        bd=0,
+        relief="flat",
+        bg="white",
+        readonlybackground="white",
+        state="readonly",
+        cursor="arrow"
+    )
+    row.value_entry.pack(fill="x", padx=5, pady=(2, 0))
 
-    memory_popup = tk.Toplevel(root)
-    memory_popup.overrideredirect(True)
-    memory_popup.configure(bg="#f0f0f0", bd=1, relief="solid")
+    # BUTTON ROW (always visible)
+    button_row = tk.Frame(row, bg="white")
+    button_row.pack(fill="x", padx=5, pady=(0, 4))
 
-    resize_floating_panels()
+    right_container = tk.Frame(button_row, bg="white")
+    right_container.pack(side="right")
 
-    frame = tk.Frame(memory_popup, bg="#f3f3f3", padx=8, pady=6)
-    frame.pack(expand=True, fill="both")
+    for btn_text in ["MC", "M+", "M-"]:
+        btn = ttk.Button(
+            right_container,
+            text=btn_text,
+            style="Memory.TButton",
+            command=lambda b=btn_text, r=row: handle_memory_action(b, r.item)
+        )
+        btn.pack(side="left", padx=2)
 
-    mem = memory_list()
+    # CLICK HANDLER
+    row.bind("<Button-1>", lambda e, r=row: on_memory_click(r))
+    button_row.bind("<Button-1>", lambda e, r=row: on_memory_click(r))
+    return row
 
-    if not mem:
-        tk.Label(
-            frame,
-            text="There is nothing saved in memory.",
-            anchor="nw",
-            justify="left",
-            bg="#f0f0f0",
-            fg="gray"
-        ).pack(expand=True, fill="both")
+
+def fill_memory_row(row, index, item):
+    """Show operations.memory[index] in a recycled row."""
+    row.index = index
+    row.item = item
+    row.value_entry.config(state="normal")
+    row.value_entry.delete(0, tk.END)
+    row.value_entry.insert(0, format_number(item))
+    row.value_entry.config(state="readonly")
+    paint_memory_row(row)
+
+
+def paint_memory_row(row):
+    bg = "#cce5ff" if row.index == selected_memory else "white"
+    row.config(bg=bg)
+    for child in row.winfo_children():
+        child.config(bg=bg)
+
+
+def on_memory_click(row):
+    global selected_memory
+    if row.index is None:
         return
 
-    for item in mem:
+    # Apply blue highlight, clear the previous one
+    selected_memory = row.index
+    for other in memory_view.rows:
+        if other.index is not None:
+            paint_memory_row(other)
 
-        row = tk.Frame(frame, bg="white")
-        row.pack(fill="x", pady=2)
+    # Copy memory value
+    copy_to_clipboard(format_number(row.item))
+
+
+def on_memory_changed(action, value):
+    """Memory listener: patch the open panel instead of rebuilding it."""
+    global selected_memory
+    update_memory_buttons()
+    if memory_view is None:
+        return
+    selected_memory = None
+    was_empty = not memory_view.count
+    memory_view.sync()
+    if was_empty != (not memory_view.count):
+        # The delete button appears/disappears
+        resize_floating_panels()
+
+
+def show_memory_overlay():
+    global memory_popup, memory_view, selected_memory, memory_delete_btn
+    selected_memory = None
+
+    if memory_popup is not None:
+        popups.closed(memory_popup)
+        try:
+            memory_popup.destroy()
+        except Exception:
+            pass
+
+    apply_styles()
+    memory_popup = tk.Toplevel(root)
+    memory_popup.overrideredirect(True)
+    memory_popup.configure(bg="#f0f0f0", bd=1, relief="solid")
+
+    # Rows are recycled from a pool sized to the popup, so a huge
+    # memory stack costs no more than a short one.
+    memory_view = VirtualList(
+        memory_popup,
+        operations.memory.view(),
+        make_memory_row,
+        fill_memory_row,
+        empty_text="There is nothing saved in memory.",
+        bg="#f3f3f3"
+    )
+    memory_view.pack(expand=True, fill="both", padx=8, pady=6)
 
-        value_entry = tk.Entry(
-            row,
-            font=("Segoe UI", 14),
-            justify="right",
-            bd=0,
-            relief="flat",
-            bg="white",
-            readonlybackground="white",
-            state="normal",
-            cursor="arrow"
-        )
-        value_entry.insert(0, str(item))
-        value_entry.config(state="readonly")
-        value_entry.pack(fill="x", padx=5, pady=(2, 0))
-
-        # BUTTON ROW (always visible)
-        button_row = tk.Frame(row, bg="white")
-        button_row.pack(fill="x", padx=5, pady=(0, 4))
-
-        right_container = tk.Frame(button_row, bg="white")
-        right_container.pack(side="right")
-
-        buttons = []
-        for btn_text in ["MC", "M+", "M-"]:
-            btn = ttk.Button(
-                right_container,
-                text=btn_text,
-                style="Memory.TButton",
-                command=lambda b=btn_text, v=item: handle_memory_action(b, v)
-            )
-            btn.pack(side="left", padx=2)
-            buttons.append(btn)
-
-        # CLICK HANDLER
-        def on_click_row(event, row=row, value=item):
-            global selected_memory_row
-
-            if selected_memory_row and selected_memory_row != row:
-                selected_memory_row.config(bg="white")
-                for child in selected_memory_row.winfo_children():
-                    child.config(bg="white")
-            # Apply blue highlight
-            row.config(bg="#cce5ff")
-            for child in row.winfo_children():
-                child.config(bg="#cce5ff")
-
-            selected_memory_row = row
-            # Copy memory value
-            root.clipboard_clear()
-            root.clipboard_append(value)
-
-        row.bind("<Button-1>", on_click_row)
-        button_row.bind("<Button-1>", on_click_row)
     # --- DELETE BUTTON ---
-    delete_btn = tk.Button(frame, text="🗑️", command=clear_memory)
-    memory_delete_btn = delete_btn
-    delete_btn.place(x=0, y=0)
+    memory_delete_btn = tk.Button(
+        memory_popup, text="🗑️", command=clear_memory)
 
     resize_floating_panels()
+    popups.opened(memory_popup, hide_memory_overlay)
 
 
 def hide_memory_overlay():
-    global memory_popup
+    global memory_popup, memory_view
+    memory_view = None
     if memory_popup:
+        popups.closed(memory_popup)
         memory_popup.destroy()
         memory_popup = None
         memory_visible.set(False)
@@ -530,17 +689,6 @@ def clear_memory():
     memory_clear()
     hide_memory_overlay()
     memory_visible.set(False)
-    update_memory_buttons()
-
-
-def is_descendant(widget, ancestor):
-    """Return True if widget is the ancestor or inside ancestor."""
-    w = widget
-    while w is not None:
-        if w == ancestor:
-            return True
-        w = w.master
-    return False
 
 
 # ============================================================
@@ -565,15 +713,16 @@ def resize_floating_panels(event=None):
         new_x = calc_x + 10
         new_y = btn_y + 31
 
-        history_popup.geometry(f"{new_width}x{new_height}+{new_x}+{new_y}")
+        set_geometry(history_popup,
+                     f"{new_width}x{new_height}+{new_x}+{new_y}")
 
         # Move delete button only if it still exists
         if ('history_delete_btn' in globals() and
            history_delete_btn.winfo_exists()):
-            history_delete_btn.place(
-                x=new_width - 43,
-                y=new_height - 30
-            )
+            if history_data:
+                place_at(history_delete_btn, new_width - 43, new_height - 30)
+            else:
+                unplace(history_delete_btn)
 
     # MEMORY PANEL
     if memory_popup and memory_popup.winfo_exists():
@@ -581,55 +730,31 @@ def resize_floating_panels(event=None):
         new_x = calc_x + 10
         new_y = btn_y + 5
 
-        memory_popup.geometry(f"{new_width}x{new_height}+{new_x}+{new_y}")
+        set_geometry(memory_popup,
+                     f"{new_width}x{new_height}+{new_x}+{new_y}")
 
         # Move delete button only if it still exists
         if ('memory_delete_btn' in globals() and
            memory_delete_btn.winfo_exists()):
-            memory_delete_btn.place(
-                x=new_width - 51,
-                y=new_height - 36
-            )
-
-
-# Bind resize event (ALSO ADD HERE)
-root.bind("<Configure>", resize_floating_panels)
-
-
-# ============================================================
-#   CLICK OUTSIDE TO CLOSE PANELS
-# ============================================================
-
-def on_click_outside(event):
-    mouse_widget = root.winfo_containing(event.x_root, event.y_root)
-
-    # Ignore clicks on toggle buttons
-    if mouse_widget in (history_btn, mview_btn):
-        return
+            if operations.memory:
+                place_at(memory_delete_btn, new_width - 51, new_height - 36)
+            else:
+                unplace(memory_delete_btn)
 
-    # If history popup exists and click is inside it → do nothing
-    if history_visible.get() and history_popup is not None:
-        if is_descendant(mouse_widget, history_popup):
-            return
 
-    # If memory popup exists and click is inside it → do nothing
-    if memory_visible.get() and memory_popup is not None:
-        if is_descendant(mouse_widget, memory_popup):
-            return
+# Bind resize event: a drag sends a burst of <Configure> events, which
+# are coalesced into one relayout per idle pass.
+if tracer is None:
+    layout = LayoutScheduler(root, resize_floating_panels)
+else:
+    def traced_resize():
+        with tracer.measure("window", "resize"):
+            resize_floating_panels()
 
-    # Otherwise click is outside → close panels
-    if history_visible.get():
-        hide_history_overlay()
-        history_visible.set(False)
-
-    if memory_visible.get():
-        hide_memory_overlay()
-        memory_visible.set(False)
-
-
-# Bind global click
-root.bind_all(
-    "<ButtonRelease-1>", lambda e: root.after(1, on_click_outside, e), add="+")
+    layout = LayoutScheduler(root, traced_resize)
+    atexit.register(lambda: print(
+        "resize events {received} (+{ignored} from children), "
+        "relayouts {relayouts}".format(**layout.stats()), file=sys.stderr))
 
 
 # ============================================================
@@ -637,7 +762,7 @@ root.bind_all(
 # ============================================================
 
 def update_memory_buttons():
-    if memory_list():  # use operations.py memory
+    if not operations.memory.is_empty():
         mc_btn.config(state="normal")
         mr_btn.config(state="normal")
         mview_btn.config(state="normal")
@@ -658,16 +783,16 @@ mc_btn = tk.Button(
     mem_frame, text="MC",
     command=lambda: (
         memory_clear(),
-        update_memory_buttons(),
-        just_evaluated.set(True),
+        mark_evaluated(),
     )
 )
 
 mr_btn = tk.Button(
     mem_frame, text="MR",
     command=lambda: (
-        result_var.set(memory_recall()),
-        just_evaluated.set(True),
+        setattr(engine, "result", memory_recall()),
+        refresh_display(),
+        mark_evaluated(),
         last_was_operator.set(False)
     )
 )
@@ -676,8 +801,7 @@ mplus_btn = tk.Button(
     mem_frame, text="M+",
     command=lambda: (
         memory_add(get_memory_value()),
-        update_memory_buttons(),
-        just_evaluated.set(True),
+        mark_evaluated(),
         last_was_operator.set(False)
     )
 )
@@ -686,8 +810,7 @@ mminus_btn = tk.Button(
     mem_frame, text="M−",
     command=lambda: (
         memory_subtract(get_memory_value()),
-        update_memory_buttons(),
-        just_evaluated.set(True),
+        mark_evaluated(),
         last_was_operator.set(False)
     )
 )
@@ -696,8 +819,7 @@ ms_btn = tk.Button(
     mem_frame, text="MS",
     command=lambda: (
         memory_store(get_memory_value()),
-        update_memory_buttons(),
-        just_evaluated.set(True),
+        mark_evaluated(),
         last_was_operator.set(False)
     )
 )
@@ -710,250 +832,88 @@ mplus_btn.pack(side="left", expand=True, fill="x")
 mminus_btn.pack(side="left", expand=True, fill="x")
 ms_btn.pack(side="left", expand=True, fill="x")
 mview_btn.pack(side="left", expand=True, fill="x")
+popups.exempt_widget(mview_btn)
 
-# Initialize button states
+# Initialize button states, then follow every memory change
 update_memory_buttons()
+subscribe_memory(on_memory_changed)
+
 
 # ============================================================
 #   Tool Tips for Memory Buttons
 # ============================================================
-ToolTip(mc_btn, "Memory Clear")
-ToolTip(mr_btn, "Memory Recall")
-ToolTip(mplus_btn, "Add to Memory")
-ToolTip(mminus_btn, "Subtract from Memory")
-ToolTip(ms_btn, "Store in Memory")
-ToolTip(mview_btn, "View Memory")
+tooltips = None   # TooltipService, created after the first paint
+
+
+def add_tooltips():
+    global tooltips
+    tooltips = TooltipService(root)
+    tooltips.attach(mc_btn, "Memory Clear")
+    tooltips.attach(mr_btn, "Memory Recall")
+    tooltips.attach(mplus_btn, "Add to Memory")
+    tooltips.attach(mminus_btn, "Subtract from Memory")
+    tooltips.attach(ms_btn, "Store in Memory")
+    tooltips.attach(mview_btn, "View Memory")
+    tooltips.attach(macro_btn, "Record a macro")
 
 
 # ============================================================
-#   CALCULATION FUNCTIONS
+#   BUTTON GRID
 # ============================================================
-def calculate():
-    expr = expression_var.get()
-    result = calculate_expression(expr)
 
-    if result != "Error":
-        formatted = format_number(result)
+btn_frame = tk.Frame(root)
+btn_frame.pack(expand=True, fill="both", padx=10, pady=10)
 
-        expression_var.set(f"{expr} =")
-        result_var.set(formatted)
 
-        # Save formatted result to history
-        history_data.insert(0, f"{expr} = {formatted}")
+def finish_trace():
+    tracer.mark("idle")
+    tracer.end()
 
-        just_evaluated.set(True)
-    else:
-        expression_var.set(expr)
-        result_var.set("Error")
-        just_evaluated.set(False)
 
-    if history_visible.get():
-        show_history_overlay()
+button_commands = {}   # button text → command, shared with the keyboard
 
 
-# ============================================================
-#   BUTTON GRID
-# ============================================================
-
-btn_frame = tk.Frame(root)
-btn_frame.pack(expand=True, fill="both", padx=10, pady=10)
+def show_added_history(total):
+    """Prepend the records added since history_data.total was total."""
+    added = history_data.total - total
+    if added > 0:
+        history_prepended(added)
 
 
 def make_button(text, row, col, colspan=1):
-    def cmd():
-        global current_value, stored_value, pending_operator
-        global last_operator, last_operand
-
-        # text = btn_text  # however you pass the button text
-
-        current = expression_var.get()
-        result = result_var.get()
-
-        # === NUMBER BUTTONS ===
-        if text.isdigit():
-            if just_evaluated.get():
-                # Start new calculation
-                current_value = text
-                expression_var.set("")
-                result_var.set(text)
-                just_evaluated.set(False)
-                return
-
-            # Normal typing
-            current_value += text
-            result_var.set(current_value)
-            return
-
-        # === DECIMAL POINT ===
-        if text == ".":
-            if just_evaluated.get():
-                current_value = "0."
-                expression_var.set("")
-                result_var.set("0.")
-                just_evaluated.set(False)
-                return
-
-            if "." not in current_value:
-                if current_value == "":
-                    current_value = "0."
-                else:
-                    current_value += "."
-                result_var.set(current_value)
-            return
-
-        # === BASIC OPERATORS ===
-        if text in ["+", "−", "×", "÷"]:
-            # If no stored value yet
-            if stored_value is None:
-                stored_value = float(current_value or "0")
-                pending_operator = text
-                expression_var.set(f"{format_number(stored_value)} {text}")
-                current_value = ""
-                just_evaluated.set(False)
-                return
-
-            # If operator exists, evaluate immediately
-            if current_value != "":
-                right = float(current_value)
-                stored_value = calculate_expression(
-                    f"{stored_value}{pending_operator}{right}")
-                expression_var.set(f"{format_number(stored_value)} {text}")
-                result_var.set(format_number(stored_value))
-
-            pending_operator = text
-            current_value = ""
-            just_evaluated.set(False)
-            return
-
-        # === PERCENTAGE ===
-        if text == "%":
-            result_var.set(str(percentage(result or current)))
-            return
-
-        # === CLEAR ENTRY ===
-        if text == "CE":
-            current_value = ""
-            result_var.set("0")
-            return
-
-        # === CLEAR ALL ===
-        if text == "C":
-            current_value = ""
-            stored_value = None
-            pending_operator = None
-            last_operator = None
-            last_operand = None
-            expression_var.set("")
-            result_var.set("0")
-            just_evaluated.set(False)
-            return
-
-        # === BACKSPACE ===
-        if text == "⌫":
-            if not just_evaluated.get():
-                current_value = current_value[:-1]
-                result_var.set(current_value or "0")
-            return
-
-        # === RECIPROCAL ===
-        if text == "1/x":
-            if current_value == "":
-                current_value = result_var.get()
-            val = reciprocal(current_value)
-            current_value = str(val)
-            result_var.set(current_value)
-            just_evaluated.set(True)
-            return
-
-        # === SQUARE ===
-        if text == "x²":
-            if current_value == "":
-                current_value = result_var.get()
-            val = square(current_value)
-            current_value = str(val)
-            result_var.set(current_value)
-            just_evaluated.set(True)
-            return
-
-        # === SQUARE ROOT ===
-        if text == "²√x":
-            if current_value == "":
-                current_value = result_var.get()
-            val = sqrt(current_value)
-            current_value = str(val)
-            result_var.set(current_value)
-            just_evaluated.set(True)
-            return
-
-        # === SIGN TOGGLE ===
-        if text == "+/-":
-            if current_value == "":
-                current_value = result_var.get()
-            current_value = str(toggle_sign(current_value))
-            result_var.set(current_value)
-            return
-
-        # === EQUALS ===
-        if text == "=":
-
-            # Case 1: normal evaluation
-            if pending_operator and current_value != "":
-                left = stored_value
-                right = float(current_value)
-                op = pending_operator
-
-                result = calculate_expression(f"{left}{op}{right}")
-
-                # Save for repeated equals
-                last_operator = op
-                last_operand = right
-
-                expression_var.set(
-                    f"{format_number(left)} {op} {format_number(right)} =")
-                result_var.set(format_number(result))
-
-                # Save to history
-                history_data.insert(
-                        0,
-                        f"{format_number(left)} {op} {format_number(right)} = "
-                        f"{format_number(result)}"
-                    )
-
-                # Reset state
-                stored_value = result
-                current_value = ""
-                pending_operator = None
-                just_evaluated.set(True)
-                return
-
-            # Case 2: repeated equals
-            if last_operator and stored_value is not None:
-                left = stored_value
-                right = last_operand
-                op = last_operator
-
-                result = calculate_expression(f"{left}{op}{right}")
-
-                expression_var.set(
-                    f"{format_number(left)} {op} {format_number(right)} =")
-                result_var.set(format_number(result))
-
-                # Save to history
-                history_data.insert(
-                    0,
-                    f"{format_number(left)} {op} {format_number(right)} = "
-                    f"{format_number(result)}"
-                )
-
-                stored_value = result
-                just_evaluated.set(True)
-                return
-
-            return
-
+    # The engine handler is looked up once here, not on every press
+    press = engine.handler(text)
+    if tracer is None:
+        def cmd():
+            if macro_recorder is not None and macro_recorder.recording:
+                macro_recorder.record(text)
+            total = history_data.total
+            press()
+            refresh_display()
+            show_added_history(total)
+    else:
+        def cmd():
+            if macro_recorder is not None and macro_recorder.recording:
+                macro_recorder.record(text)
+            if not tracer.active:
+                tracer.begin(text)   # invoked without a pointer event
+            tracer.mark("dispatch")
+            total = history_data.total
+            press()
+            tracer.mark("compute")
+            refresh_display()
+            show_added_history(total)
+            tracer.mark("widget")
+            root.after_idle(finish_trace)
+
+    button_commands[text] = cmd
     btn = tk.Button(btn_frame, text=text, font=("Segoe UI", 12), command=cmd)
     btn.grid(row=row, column=col, columnspan=colspan,
              sticky="nsew", padx=2, pady=2)
+    if tracer is not None:
+        # Widget bindings run before the class binding that invokes cmd
+        btn.bind("<ButtonRelease-1>", lambda e: tracer.begin(text), add="+")
+    return btn
 
 
 for r in range(6):
@@ -992,5 +952,77 @@ make_button(".", 5, 2)
 make_button("=", 5, 3)
 
 
+# ============================================================
+#   KEYBOARD
+# ============================================================
+# Tk keysym → button text
+KEY_BUTTONS = {str(d): str(d) for d in range(10)}
+KEY_BUTTONS.update({f"KP_{d}": str(d) for d in range(10)})
+KEY_BUTTONS.update({
+    "period": ".", "comma": ".", "KP_Decimal": ".",
+    "plus": "+", "KP_Add": "+",
+    "minus": "−", "KP_Subtract": "−",
+    "asterisk": "×", "KP_Multiply": "×",
+    "slash": "÷", "KP_Divide": "÷",
+    "percent": "%",
+    "equal": "=", "Return": "=", "KP_Enter": "=",
+    "BackSpace": "⌫",
+    "Delete": "CE",
+    "Escape": "C",
+    "r": "1/x",
+    "q": "x²",
+    "at": "²√x",
+    "F9": "+/-",
+})
+# Bound once: a key press is a single dict lookup
+key_commands = {key: button_commands[text]
+                for key, text in KEY_BUTTONS.items()}
+
+
+def on_key(event):
+    cmd = key_commands.get(event.keysym)
+    if cmd is None:
+        return None
+    cmd()
+    return "break"
+
+
+root.bind("<Key>", on_key)
+
+phase("widgets")
+
+
+# ============================================================
+#   DEFERRED STARTUP
+# ============================================================
+startup_done = False
+
+
+def finish_startup():
+    """Work that can wait until the window has been painted."""
+    global startup_done
+    if startup_done:
+        return
+    startup_done = True
+    phase("first paint")
+    add_tooltips()
+    phase("deferred")
+    if profile is not None:
+        profile.finish()
+        print(profile.report(), file=sys.stderr)
+
+
+def on_first_expose(event):
+    if event.widget is root:
+        root.unbind("<Expose>")
+        # Runs after the redraws queued by this Expose
+        root.after_idle(finish_startup)
+
+
+root.bind("<Expose>", on_first_expose)
+root.after(1000, finish_startup)   # in case no Expose reaches root
+
+
 # === Start the GUI Event Loop ===
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    root.mainloop()
\ No newline at end of file
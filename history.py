@@ -0,0 +1,527 @@
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+from expression import normalize
+from operations import format_number
+
+DEFAULT_CAPACITY = 100_000
+
+
+# ============================================================
+#   HISTORY RECORD
+# ============================================================
+class HistoryRecord:
+    """One calculation: left op right = result, kept as numbers.
+
+    Free-form expressions (no single operator) store the expression
+    text in `left` and leave `op` and `right` as None.
+    """
+
+    __slots__ = ("left", "op", "right", "result")
+
+    def __init__(self, left, op, right, result):
+        self.left = left
+        self.op = op
+        self.right = right
+        self.result = result
+
+    @property
+    def expression(self):
+        """Top display line, e.g. "12 × 3 =" """
+        if self.op is None:
+            return f"{self.left} ="
+        return (f"{format_number(self.left)} {self.op} "
+                f"{format_number(self.right)} =")
+
+    @property
+    def result_text(self):
+        return format_number(self.result)
+
+    def __str__(self):
+        return f"{self.expression} {self.result_text}"
+
+    def __repr__(self):
+        return (f"HistoryRecord({self.left!r}, {self.op!r}, "
+                f"{self.right!r}, {self.result!r})")
+
+
+# ============================================================
+#   HISTORY STORE (RING BUFFER)
+# ============================================================
+class HistoryStore:
+    """Bounded, newest-first history backed by a ring buffer.
+
+    add() is O(1); once `capacity` records are stored the oldest one is
+    overwritten. Indexing is newest first: store[0] is the latest result.
+    """
+
+    __slots__ = ("capacity", "_slots", "_head")
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._slots = []   # grows up to capacity, then wraps
+        self._head = 0     # where the next record is written
+
+    def add(self, record):
+        """Insert record as the newest entry."""
+        slots = self._slots
+        if len(slots) < self.capacity:
+            slots.append(record)
+        else:
+            slots[self._head] = record
+        self._head = (self._head + 1) % self.capacity
+
+    def clear(self):
+        self._slots = []
+        self._head = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __getitem__(self, index):
+        size = len(self._slots)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("history index out of range")
+        return self._slots[(self._head - 1 - index) % size]
+
+    def __iter__(self):
+        for index in range(len(self._slots)):
+            yield self[index]
+
+    def memory_usage(self):
+        """Approximate memory footprint in bytes.
+
+        Counts the ring buffer itself plus each record and its numeric
+        fields (operator strings are shared and not counted).
+        """
+        buffer_bytes = sys.getsizeof(self._slots)
+        record_bytes = 0
+        for record in self._slots:
+            record_bytes += sys.getsizeof(record)
+            for value in (record.left, record.right, record.result):
+                if value is not None:
+                    record_bytes += sys.getsizeof(value)
+        entries = len(self._slots)
+        total = buffer_bytes + record_bytes
+        return {
+            "entries": entries,
+            "capacity": self.capacity,
+            "buffer_bytes": buffer_bytes,
+            "record_bytes": record_bytes,
+            "total_bytes": total,
+            "bytes_per_entry": total / entries if entries else 0.0,
+        }
+
+
+# ============================================================
+#   SEARCH INDEX
+# ============================================================
+SORT_LIMIT = 20_000     # larger range matches are found by scanning
+LOOKAHEAD = 100         # multi-term matches found past the last one shown
+
+_TEXT_TOKENS = re.compile(
+    r"\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+|\*\*|//|[^\s\d.()]")
+_OPERATOR_TOKENS = {"−": "-", "×": "*", "÷": "/"}
+_COMPARISON = re.compile(r"(<=|>=|<|>|=)(.+)$")
+_NAN = float("nan")
+
+
+def record_tokens(record, fmt=format_number):
+    """Operand and operator tokens of a record, as shown on screen.
+
+    Operators are in their ASCII form, so "×" and "*" find the same.
+    """
+    if record.op is None:
+        return _TEXT_TOKENS.findall(normalize(str(record.left)))
+    op = record.op
+    return [fmt(record.left), _OPERATOR_TOKENS.get(op, op), fmt(record.right)]
+
+
+def _sort_key(value):
+    """Result as a float for range queries; NaN for "Error" and the like."""
+    if isinstance(value, str):
+        return _NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return _NAN
+
+
+class HistoryIndex:
+    """Search structures over history records, by sequence number.
+
+    values[seq - base] is each record's result as a float. The results
+    are also kept sorted in `keys`, with their sequence numbers in
+    `key_seqs`, for range queries. Every operand and operator token
+    maps to its sequence numbers in ascending order (an int while there
+    is only one) and `vocabulary` lists the tokens sorted, for prefix
+    queries.
+    """
+
+    __slots__ = ("base", "values", "keys", "key_seqs", "postings",
+                 "vocabulary")
+
+    def __init__(self, base=0):
+        self.base = base
+        self.values = array("d")
+        self.keys = array("d")
+        self.key_seqs = array("q")
+        self.postings = {}
+        self.vocabulary = []
+
+    @classmethod
+    def build(cls, base, records):
+        """Index records (oldest first) numbered from base, in bulk.
+
+        Sorting once is much faster than add() per record, which keeps
+        the arrays sorted one insert at a time.
+        """
+        index = cls(base)
+        values = index.values
+        postings = index.postings
+        texts = {}
+
+        def fmt(value):
+            text = texts.get(value)
+            if text is None:
+                text = texts[value] = format_number(value)
+            return text
+
+        for seq, record in enumerate(records, base):
+            values.append(_sort_key(record.result))
+            for token in record_tokens(record, fmt):
+                seqs = postings.get(token)
+                if seqs is None:
+                    postings[token] = seq
+                elif type(seqs) is int:
+                    if seqs != seq:
+                        postings[token] = array("q", (seqs, seq))
+                elif seqs[-1] != seq:
+                    seqs.append(seq)
+
+        order = sorted((i for i, key in enumerate(values) if key == key),
+                       key=values.__getitem__)
+        index.keys = array("d", [values[i] for i in order])
+        index.key_seqs = array("q", [base + i for i in order])
+        index.vocabulary = sorted(postings)
+        return index
+
+    def add(self, seq, record):
+        """Index the record that follows the last one added."""
+        key = _sort_key(record.result)
+        self.values.append(key)
+        if key == key:
+            position = bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.key_seqs.insert(position, seq)
+
+        postings = self.postings
+        for token in record_tokens(record):
+            seqs = postings.get(token)
+            if seqs is None:
+                postings[token] = seq
+                insort(self.vocabulary, token)
+            elif type(seqs) is int:
+                if seqs != seq:
+                    postings[token] = array("q", (seqs, seq))
+            elif seqs[-1] != seq:
+                seqs.append(seq)
+
+    def remove(self, seq):
+        """Drop an evicted record from the range structures.
+
+        Token postings keep it; queries skip sequence numbers below the
+        oldest record still in the store.
+        """
+        key = self.values[seq - self.base]
+        if key != key:
+            return
+        start = bisect_left(self.keys, key)
+        end = bisect_right(self.keys, key, start)
+        position = start + self.key_seqs[start:end].index(seq)
+        del self.keys[position]
+        del self.key_seqs[position]
+
+    def range(self, low=None, high=None, include_low=True,
+              include_high=True):
+        return _RangeMatch(self, low, high, include_low, include_high)
+
+    def prefix(self, text, first):
+        """Records from first on with a token starting with text."""
+        vocabulary = self.vocabulary
+        lists = []
+        for i in range(bisect_left(vocabulary, text), len(vocabulary)):
+            token = vocabulary[i]
+            if not token.startswith(text):
+                break
+            seqs = self.postings[token]
+            lists.append((seqs,) if type(seqs) is int else seqs)
+        if len(lists) == 1:
+            return _PostingsMatch(lists[0], first)
+        return _PostingsMatch(
+            sorted({seq for seqs in lists for seq in seqs}), first)
+
+
+class _PostingsMatch:
+    """Matches given by an ascending sequence of sequence numbers."""
+
+    __slots__ = ("seqs", "start")
+
+    def __init__(self, seqs, first):
+        self.seqs = seqs
+        self.start = bisect_left(seqs, first)
+
+    def __len__(self):
+        return len(self.seqs) - self.start
+
+    def __contains__(self, seq):
+        seqs = self.seqs
+        i = bisect_left(seqs, seq, self.start)
+        return i < len(seqs) and seqs[i] == seq
+
+    def newest_first(self):
+        return reversed(self.seqs[self.start:])
+
+
+class _RangeMatch:
+    """Records whose result lies between low and high.
+
+    The count comes straight from the sorted keys. Up to SORT_LIMIT
+    matches are put in time order by sorting; more than that are found
+    by walking the results newest first, which finds a screenful of a
+    common match without touching the rest.
+    """
+
+    __slots__ = ("index", "low", "high", "include_low", "include_high",
+                 "start", "end")
+
+    def __init__(self, index, low, high, include_low, include_high):
+        self.index = index
+        self.low = low
+        self.high = high
+        self.include_low = include_low
+        self.include_high = include_high
+        keys = index.keys
+        self.start = 0
+        if low is not None:
+            self.start = (bisect_left if include_low
+                          else bisect_right)(keys, low)
+        self.end = len(keys)
+        if high is not None:
+            self.end = (bisect_right if include_high
+                        else bisect_left)(keys, high)
+        self.end = max(self.start, self.end)
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _matches(self, key):
+        low, high = self.low, self.high
+        if low is not None and not (
+                low <= key if self.include_low else low < key):
+            return False
+        if high is not None and not (
+                key <= high if self.include_high else key < high):
+            return False
+        return key == key
+
+    def __contains__(self, seq):
+        index = self.index
+        return seq >= index.base and self._matches(
+            index.values[seq - index.base])
+
+    def newest_first(self):
+        index = self.index
+        count = len(self)
+        if count <= SORT_LIMIT:
+            yield from sorted(index.key_seqs[self.start:self.end],
+                              reverse=True)
+            return
+        values = index.values
+        matches = self._matches
+        for i in range(len(values) - 1, -1, -1):
+            if matches(values[i]):
+                yield index.base + i
+                count -= 1
+                if not count:
+                    return
+
+
+def _number(text):
+    return float(text.replace(",", ""))
+
+
+def _term_match(index, term, first):
+    """Match object for one query term."""
+    comparison = _COMPARISON.match(term)
+    low, sep, high = term.partition("..")
+    try:
+        if comparison:
+            op, value = comparison.group(1), _number(comparison.group(2))
+            if op == "=":
+                return index.range(value, value)
+            if op[0] == ">":
+                return index.range(low=value, include_low=op == ">=")
+            return index.range(high=value, include_high=op == "<=")
+        if sep:
+            return index.range(_number(low) if low else None,
+                               _number(high) if high else None)
+    except ValueError:
+        pass    # not a number after all: match it as text
+    return index.prefix(normalize(term), first)
+
+
+class SearchResults:
+    """Matching records of an IndexedHistory, newest first.
+
+    Matches are produced on demand: showing the first page of a query
+    that matches half the history only looks at that page. Queries with
+    several terms walk the rarest term and test each candidate against
+    the others. Their full count is only known once that walk is done:
+    until then len() is the number found so far, kept LOOKAHEAD ahead
+    of the furthest match fetched, so it grows as the list scrolls.
+    """
+
+    __slots__ = ("history", "found", "stream", "length", "wanted")
+
+    def __init__(self, history, matches):
+        self.history = history
+        self.found = []     # sequence numbers, newest first
+        self.wanted = 0     # 1 + the furthest index fetched
+        if not matches:
+            self.stream = iter(())
+            self.length = 0
+            return
+        matches = sorted(matches, key=len)
+        rarest, others = matches[0], matches[1:]
+        self.stream = rarest.newest_first()
+        self.length = len(rarest)
+        if others:
+            for match in others:
+                self.stream = filter(match.__contains__, self.stream)
+            self.length = None
+
+    @property
+    def complete(self):
+        """Is len() the final count?"""
+        return self.length is not None
+
+    def _fetch(self, count):
+        # Find matches until count are known or there are no more
+        found = self.found
+        if len(found) < count:
+            found.extend(islice(self.stream, count - len(found)))
+            if len(found) < count and self.length is None:
+                self.length = len(found)
+
+    def __len__(self):
+        if self.length is None:
+            self._fetch(self.wanted + LOOKAHEAD)
+            if self.length is None:
+                return len(self.found)
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            if self.length is None:
+                self.found.extend(self.stream)
+                self.length = len(self.found)
+            index += self.length
+        self._fetch(index + 1)
+        if not 0 <= index < len(self.found):
+            raise IndexError("search result index out of range")
+        self.wanted = max(self.wanted, index + 1)
+        history = self.history
+        return history.store[history.total - 1 - self.found[index]]
+
+    def __iter__(self):
+        index = 0
+        while True:
+            try:
+                yield self[index]
+            except IndexError:
+                return
+            index += 1
+
+
+class IndexedHistory:
+    """A history store plus a search index updated on every add().
+
+    Wraps a HistoryStore or storage.PersistentHistory and forwards the
+    rest of their interface. Records are numbered in the order they
+    were added. The index is built on the first search, then kept
+    current (evicted records leave the range index as they go) and
+    rebuilt once more records have been evicted than the store holds.
+
+    Queries are whitespace-separated terms that must all match:
+
+        1.0825    operand or operator token starting with "1.0825"
+        ×         records using that operator (same as *)
+        >10000    result above 10000 (also <, >=, <=, =)
+        5..10     result between 5 and 10 (either end may be left out)
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.total = len(store)     # sequence number of the next record
+        self.index = None
+        self.pruned = 0             # records below this left the index
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    # --- HistoryStore interface ---
+    def add(self, record):
+        self.store.add(record)
+        seq = self.total
+        self.total += 1
+        index = self.index
+        if index is None:
+            return
+        index.add(seq, record)
+        first = self.total - len(self.store)
+        if first - index.base > len(self.store):
+            self.index = None   # mostly stale: rebuild on next search
+            return
+        while self.pruned < first:
+            index.remove(self.pruned)
+            self.pruned += 1
+
+    def clear(self):
+        self.store.clear()
+        self.total = 0
+        self.index = None
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        return self.store[index]
+
+    def __iter__(self):
+        return iter(self.store)
+
+    # --- search ---
+    def build_index(self):
+        """(Re)build the index from the records in the store."""
+        store = self.store
+        size = len(store)
+        first = self.total - size
+        self.index = HistoryIndex.build(
+            first, (store[i] for i in range(size - 1, -1, -1)))
+        self.pruned = first
+        return self.index
+
+    def search(self, query):
+        """SearchResults for query (see the class docstring)."""
+        index = self.index if self.index is not None else self.build_index()
+        first = self.total - len(self.store)
+        return SearchResults(
+            self, [_term_match(index, term, first) for term in query.split()])
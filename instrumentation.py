@@ -0,0 +1,266 @@
+"""Opt-in keystroke-to-render latency tracing.
+
+A Tracer follows one key press through its stages:
+
+    dispatch  pointer release → button command starts
+    compute   engine.press() minus time spent formatting
+    format    format_number() calls made by the engine
+    widget    StringVar updates
+    idle      widget update → Tk's pending idle work (redraws) flushed
+
+Durations go into HDR-style histograms per (button type, stage), plus a
+"total" stage covering the whole press. Enable it in the GUI with
+--trace or CALCULATOR_TRACE=1; the report is printed on exit.
+
+StartupProfile times module imports (like python -X importtime) and
+named startup phases for --profile-startup.
+"""
+import builtins
+import sys
+import time
+from contextlib import contextmanager
+
+SUB_BUCKET_BITS = 5     # 32 linear sub-buckets per power of two: ~3% error
+
+
+# ============================================================
+#   LATENCY HISTOGRAM
+# ============================================================
+class LatencyHistogram:
+    """Log-linear histogram of nanosecond latencies (HDR-style).
+
+    Values are bucketed by power of two, each power split into
+    2**SUB_BUCKET_BITS linear steps, so memory stays small while any
+    percentile is accurate to a few percent.
+    """
+
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def _bucket(value):
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            return value
+        return ((shift + 1) << SUB_BUCKET_BITS) | (
+            (value >> shift) & ((1 << SUB_BUCKET_BITS) - 1))
+
+    @staticmethod
+    def _bucket_top(index):
+        """Largest value that falls into bucket index."""
+        if index < (2 << SUB_BUCKET_BITS):
+            return index
+        shift = (index >> SUB_BUCKET_BITS) - 1
+        sub = index & ((1 << SUB_BUCKET_BITS) - 1)
+        return (((1 << SUB_BUCKET_BITS) | sub) << shift) + (1 << shift) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = self._bucket(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add every value recorded in other to this histogram."""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = (other.min if self.min is None
+                        else min(self.min, other.min))
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """Value at percentile p (0-100), to bucket precision."""
+        if not self.count:
+            return 0
+        target = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(self._bucket_top(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+# ============================================================
+#   TRACER
+# ============================================================
+def button_type(text):
+    """Group button texts for reporting."""
+    if text.isdigit():
+        return "digit"
+    if text in ("+", "−", "×", "÷"):
+        return "operator"
+    if text in ("1/x", "x²", "²√x", "+/-", "%"):
+        return "unary"
+    if text in ("C", "CE", "⌫"):
+        return "clear"
+    if text == "=":
+        return "equals"
+    if text == ".":
+        return "decimal"
+    return "other"
+
+
+class Tracer:
+    """Collects per-stage latencies for key presses."""
+
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.histograms = {}
+        self.kind = None
+        self.started = None
+        self.last = None
+        self.format_ns = 0
+
+    def histogram(self, kind, stage):
+        key = (kind, stage)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = LatencyHistogram()
+        return hist
+
+    # --- one key press ---
+    def begin(self, text):
+        """Start tracing a press of button text (at pointer release)."""
+        self.kind = button_type(text)
+        self.started = self.last = self.clock()
+        self.format_ns = 0
+
+    @property
+    def active(self):
+        return self.kind is not None
+
+    def mark(self, stage):
+        """Record the time since the previous mark as `stage`."""
+        if self.kind is None:
+            return
+        now = self.clock()
+        elapsed = now - self.last
+        if stage == "compute" and self.format_ns:
+            self.histogram(self.kind, "format").record(self.format_ns)
+            elapsed -= self.format_ns
+        self.histogram(self.kind, stage).record(elapsed)
+        self.last = now
+
+    def end(self):
+        """Finish the current press and record its total latency."""
+        if self.kind is None:
+            return
+        self.histogram(self.kind, "total").record(self.clock() - self.started)
+        self.kind = None
+
+    # --- helpers ---
+    def timed_format(self, func):
+        """Wrap a formatter so its time is attributed to "format"."""
+        clock = self.clock
+
+        def wrapper(value):
+            if self.kind is None:
+                return func(value)
+            start = clock()
+            try:
+                return func(value)
+            finally:
+                self.format_ns += clock() - start
+        return wrapper
+
+    @contextmanager
+    def measure(self, kind, stage):
+        """Time a standalone event, e.g. a <Configure> relayout."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.histogram(kind, stage).record(self.clock() - start)
+
+    def report(self):
+        """Table of count, p50, p99 and max (in ms) per type and stage."""
+        lines = [f"{'button':<10}{'stage':<10}{'count':>8}"
+                 f"{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for (kind, stage), hist in sorted(self.histograms.items()):
+            lines.append(
+                f"{kind:<10}{stage:<10}{hist.count:>8}"
+                f"{hist.percentile(50) / 1e6:>10.3f}"
+                f"{hist.percentile(99) / 1e6:>10.3f}"
+                f"{hist.max / 1e6:>10.3f}")
+        return "\n".join(lines)
+
+
+# ============================================================
+#   STARTUP PROFILE
+# ============================================================
+class StartupProfile:
+    """Import and phase timings from creation to the first paint.
+
+    Creating it replaces builtins.__import__ until finish(), so every
+    module loaded in between is timed with its self and cumulative
+    time, nested the way -X importtime shows them.
+    """
+
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.started = self.last = clock()
+        self.phases = []     # (name, ns)
+        self.imports = []    # (depth, module, self ns, cumulative ns)
+        self._stack = []     # child time of each import in progress
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(),
+                      level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        clock = self.clock
+        self._stack.append(0)
+        start = clock()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = clock() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.imports.append(
+                (len(self._stack), name, elapsed - children, elapsed))
+
+    def mark(self, phase):
+        """Record the time since the previous mark as `phase`."""
+        now = self.clock()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def finish(self):
+        """Stop timing imports."""
+        if builtins.__import__ == self._timed_import:
+            builtins.__import__ = self._import
+
+    def report(self):
+        """-X importtime-style import lines, then one line per phase."""
+        lines = ["import time: self [us] | cumulative | imported package"]
+        for depth, name, own, total in self.imports:
+            lines.append(f"import time: {own // 1000:>9} | "
+                         f"{total // 1000:>10} | {'  ' * depth}{name}")
+        lines.append(f"{'phase':<16}{'ms':>9}{'total ms':>10}")
+        elapsed = 0
+        for phase, ns in self.phases:
+            elapsed += ns
+            lines.append(f"{phase:<16}{ns / 1e6:>9.2f}{elapsed / 1e6:>10.2f}")
+        return "\n".join(lines)
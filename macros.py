@@ -0,0 +1,528 @@
+"""Keystroke macros: record button presses, compile them, replay them.
+
+A macro is the list of button texts pressed after a value was entered,
+e.g. ["×", "1", ".", "0", "8", "2", "5", "=", "−", "1", "0", "%", "="]
+for "add tax, then take 10% off". Replaying it on an input value gives
+the result the display would show had the value been typed first.
+
+Macros are compiled into a straight-line Python function of the input:
+the engine's state machine is run once at compile time, with the input
+as an unknown, and every step that only involves typed digits and
+operators is folded into a constant. Runs of "=" repeating an operation
+become one power or multiply when the numeric backend is exact. See
+compile_macro() and Macro.run_many().
+
+    python -m calculator --macro pricing --macro-file macros.json prices.txt
+"""
+import json
+import os
+from functools import lru_cache, partial
+
+import numeric
+from engine import CalculatorEngine, UNARY_KEYS
+from operations import (
+    apply_binary, format_number, percentage, toggle_sign
+)
+from numeric import to_number
+
+_NUMBER_KEYS = frozenset("0123456789.")
+
+
+# ============================
+#   ERRORS
+# ============================
+class MacroError(ValueError):
+    """Raised for a key sequence that cannot be compiled or saved."""
+
+
+# ============================
+#   RECORDING
+# ============================
+class MacroRecorder:
+    """Collects the button texts pressed between start() and stop()."""
+
+    __slots__ = ("recording", "keys")
+
+    def __init__(self):
+        self.recording = False
+        self.keys = []
+
+    def start(self):
+        self.recording = True
+        self.keys = []
+
+    def record(self, text):
+        self.keys.append(text)
+
+    def stop(self):
+        """Stop and return the macro keys.
+
+        A number typed first is the sample input, not part of the macro:
+        replaying enters the input in its place.
+        """
+        self.recording = False
+        keys = self.keys
+        start = 0
+        while start < len(keys) and keys[start] in _NUMBER_KEYS:
+            start += 1
+        return keys[start:]
+
+
+# ============================
+#   COMPILER
+# ============================
+class _Slot:
+    """A value only known at run time: r<index> in the generated code.
+
+    Text slots are never empty unless maybe_empty is set (by ⌫).
+    """
+
+    __slots__ = ("index", "maybe_empty")
+
+    def __init__(self, index):
+        self.index = index
+        self.maybe_empty = False
+
+
+def _append(text, digit):
+    return text + digit
+
+
+def _with_point(text):
+    return text if "." in text else text + "."
+
+
+def _drop_last(text):
+    return text[:-1]
+
+
+def _or_zero(text):
+    return text or "0"
+
+
+def _point_display(old, new, result):
+    # The engine leaves the display alone when there already is a point
+    return result if "." in old else new
+
+
+def _repeat(op, left, right, times):
+    """left op right op right ... (times operations) in one step.
+
+    Only used with exact backends, where the result is the same.
+    """
+    if op in ("×", "÷"):
+        return apply_binary(op, left, right ** times)
+    return apply_binary(op, left, right * times)
+
+
+_REPEATABLE = frozenset("+−×÷")
+
+
+class _Compiler:
+    """CalculatorEngine's key handlers, over values that may be _Slots.
+
+    Mirrors engine.py step by step (without the history and the top
+    display line); keep the two in sync.
+    """
+
+    def __init__(self, value=None):
+        """value: the input text if known (""), else the r0 slot."""
+        self.code = []      # (slot, func, args)
+        self.kept = set()   # slots computed even if unused: they may raise
+        self.input = _Slot(0) if value is None else value
+        self.slots = 1
+        self.exact = numeric.get_backend().exact
+        # State after the input was typed into a fresh engine
+        self.current_value = self.input
+        self.stored_value = None
+        self.pending_operator = None
+        self.last_operator = None
+        self.last_operand = None
+        self.just_evaluated = False
+        self.result = self.input
+
+    def emit(self, func, *args):
+        """func(*args) now if every arg is known, else a new _Slot."""
+        raises = func is to_number
+        if not any(type(arg) is _Slot for arg in args):
+            try:
+                return func(*args)
+            except Exception:
+                raises = True   # raise at run time, as the engine would
+        slot = _Slot(self.slots)
+        self.slots += 1
+        self.code.append((slot, func, args))
+        if raises:
+            self.kept.add(slot.index)
+        return slot
+
+    def empty(self, text):
+        """text == "" for a known value or a slot that cannot be empty."""
+        if type(text) is not _Slot:
+            return text == ""
+        if text.maybe_empty:
+            raise MacroError("the key sequence branches on the input")
+        return False
+
+    def compile(self, keys):
+        handlers = _HANDLERS
+        i = 0
+        while i < len(keys):
+            text = keys[i]
+            if text == "=" and self._repeats():
+                run = 1
+                while i + run < len(keys) and keys[i + run] == "=":
+                    run += 1
+                self._repeated_equals(run)
+                i += run
+                continue
+            handlers[text](self, text)
+            i += 1
+        return self.result
+
+    # --- key handlers (see engine.py) ---
+    def _digit(self, text):
+        if self.just_evaluated:
+            self.current_value = text
+            self.result = text
+            self.just_evaluated = False
+            return
+        self.current_value = self.emit(_append, self.current_value, text)
+        self.result = self.current_value
+
+    def _decimal(self, text):
+        if self.just_evaluated:
+            self.current_value = "0."
+            self.result = "0."
+            self.just_evaluated = False
+            return
+        if self.empty(self.current_value):
+            self.current_value = self.result = "0."
+            return
+        old = self.current_value
+        self.current_value = self.emit(_with_point, old)
+        self.result = self.emit(_point_display, old, self.current_value,
+                                self.result)
+
+    def _operator(self, text):
+        if self.stored_value is None:
+            self.stored_value = self.emit(
+                to_number, self.emit(_or_zero, self.current_value))
+            self.pending_operator = text
+            self.current_value = ""
+            self.just_evaluated = False
+            return
+        if not self.empty(self.current_value):
+            right = self.emit(to_number, self.current_value)
+            self.stored_value = self.emit(
+                apply_binary, self.pending_operator, self.stored_value, right)
+            self.result = self.emit(format_number, self.stored_value)
+        self.pending_operator = text
+        self.current_value = ""
+        self.just_evaluated = False
+
+    def _percent(self, text):
+        if self.empty(self.result):
+            raise MacroError("% needs a value on the display")
+        self.result = self.emit(format_number,
+                                self.emit(percentage, self.result))
+
+    def _clear_entry(self, text):
+        self.current_value = ""
+        self.result = "0"
+
+    def _clear_all(self, text):
+        self.current_value = ""
+        self.stored_value = None
+        self.pending_operator = None
+        self.last_operator = None
+        self.last_operand = None
+        self.just_evaluated = False
+        self.result = "0"
+
+    def _backspace(self, text):
+        if not self.just_evaluated:
+            self.current_value = self.emit(_drop_last, self.current_value)
+            if type(self.current_value) is _Slot:
+                self.current_value.maybe_empty = True
+            self.result = self.emit(_or_zero, self.current_value)
+
+    def _unary(self, text):
+        if self.empty(self.current_value):
+            self.current_value = self.result
+        self.current_value = self.emit(
+            str, self.emit(UNARY_KEYS[text], self.current_value))
+        self.result = self.current_value
+        self.just_evaluated = True
+
+    def _sign(self, text):
+        if self.empty(self.current_value):
+            self.current_value = self.result
+        self.current_value = self.emit(
+            str, self.emit(toggle_sign, self.current_value))
+        self.result = self.current_value
+
+    def _equals(self, text):
+        if self.pending_operator and not self.empty(self.current_value):
+            op = self.pending_operator
+            right = self.emit(to_number, self.current_value)
+            value = self.emit(apply_binary, op, self.stored_value, right)
+            self.last_operator = op
+            self.last_operand = right
+            self.result = self.emit(format_number, value)
+            self.stored_value = value
+            self.current_value = ""
+            self.pending_operator = None
+            self.just_evaluated = True
+        # Repeating the last operation is handled by compile(), which
+        # sees the whole run of "=".
+
+    def _repeats(self):
+        """Is "=" about to repeat the last operation?"""
+        return (not (self.pending_operator
+                     and not self.empty(self.current_value))
+                and self.last_operator is not None
+                and self.stored_value is not None)
+
+    def _repeated_equals(self, times):
+        op = self.last_operator
+        if times > 1 and self.exact and op in _REPEATABLE:
+            value = self.emit(_repeat, op, self.stored_value,
+                              self.last_operand, times)
+        else:
+            value = self.stored_value
+            for _ in range(times):
+                value = self.emit(apply_binary, op, value, self.last_operand)
+        self.result = self.emit(format_number, value)
+        self.stored_value = value
+        self.just_evaluated = True
+
+
+_HANDLERS = {digit: _Compiler._digit for digit in "0123456789"}
+_HANDLERS.update({
+    ".": _Compiler._decimal,
+    "+": _Compiler._operator,
+    "−": _Compiler._operator,
+    "×": _Compiler._operator,
+    "÷": _Compiler._operator,
+    "%": _Compiler._percent,
+    "CE": _Compiler._clear_entry,
+    "C": _Compiler._clear_all,
+    "⌫": _Compiler._backspace,
+    "+/-": _Compiler._sign,
+    "=": _Compiler._equals,
+})
+_HANDLERS.update(dict.fromkeys(UNARY_KEYS, _Compiler._unary))
+
+
+def _live(code, output, kept_slots):
+    """Instructions output or kept_slots depend on, in order."""
+    needed = set(kept_slots)
+    if type(output) is _Slot:
+        needed.add(output.index)
+    kept = []
+    for slot, func, args in reversed(code):
+        if slot.index in needed:
+            kept.append((slot, func, args))
+            needed.update(arg.index for arg in args if type(arg) is _Slot)
+    kept.reverse()
+    return kept
+
+
+def _generate(code, output):
+    """Source of run(r0) and the namespace its names refer to."""
+    namespace = {}
+    lines = ["def run(r0):"]
+    for number, (slot, func, args) in enumerate(code):
+        namespace[f"f{number}"] = func
+        names = []
+        for position, arg in enumerate(args):
+            if type(arg) is _Slot:
+                names.append(f"r{arg.index}")
+            else:
+                name = f"c{number}_{position}"
+                namespace[name] = arg
+                names.append(name)
+        lines.append(f"    r{slot.index} = f{number}({', '.join(names)})")
+    if type(output) is _Slot:
+        lines.append(f"    return r{output.index}")
+    else:
+        namespace["output"] = output
+        lines.append("    return output")
+    return "\n".join(lines) + "\n", namespace
+
+
+def _build(keys, value=None):
+    """(run, steps, source) for keys; value="" compiles the empty input.
+
+    Falls back to interpret() (steps and source None) where the keys
+    cannot be compiled to straight-line code.
+    """
+    compiler = _Compiler(value)
+    try:
+        output = compiler.compile(keys)
+    except MacroError:
+        return partial(interpret, keys), None, None
+    code = _live(compiler.code, output, compiler.kept)
+    source, namespace = _generate(code, output)
+    exec(compile(source, "<macro>", "exec"), namespace)
+    return namespace["run"], len(code), source
+
+
+class CompiledMacro:
+    """A macro as a function of its input, for one numeric backend.
+
+    Sequences whose steps depend on the input's text (⌫ on the input,
+    then an operator) cannot be straight-line code; they are replayed on
+    a CalculatorEngine instead, and `source` is None. So is any input
+    the compiled code raises on: the engine shows "Error" for an operand
+    that is not a number and carries on from a cleared state. An empty
+    input (a blank line) has its own program, `run_empty`.
+    """
+
+    __slots__ = ("keys", "backend", "steps", "source", "run", "run_empty")
+
+    def __init__(self, keys):
+        self.keys = tuple(keys)
+        self.backend = numeric.get_backend()
+        unknown = [key for key in self.keys if key not in _HANDLERS]
+        if unknown:
+            raise MacroError(f"unknown keys {unknown!r}")
+        self.run, self.steps, self.source = _build(self.keys)
+        self.run_empty = _build(self.keys, "")[0]
+
+    def __call__(self, value):
+        """Display text after entering value and pressing the keys."""
+        if type(value) is not str:
+            value = str(value)
+        try:
+            return self.run(value) if value else self.run_empty(value)
+        except Exception:
+            return interpret(self.keys, value)
+
+    def __repr__(self):
+        steps = "interpreted" if self.source is None else f"{self.steps} steps"
+        return f"CompiledMacro({len(self.keys)} keys, {steps})"
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(keys, backend):
+    return CompiledMacro(keys)
+
+
+def compile_macro(keys):
+    """CompiledMacro for keys with the active backend, cached."""
+    return _compile_cached(tuple(keys), numeric.get_backend())
+
+
+def interpret(keys, value):
+    """Replay keys on a CalculatorEngine (the reference for compile)."""
+    engine = CalculatorEngine()
+    engine.current_value = engine.result = (
+        value if type(value) is str else str(value))
+    return engine.feed(keys)[1]
+
+
+# ============================
+#   MACRO LIBRARY
+# ============================
+class Macro:
+    """A named key sequence."""
+
+    __slots__ = ("name", "keys")
+
+    def __init__(self, name, keys):
+        self.name = name
+        self.keys = tuple(keys)
+
+    def compiled(self):
+        return compile_macro(self.keys)
+
+    def run(self, value):
+        return self.compiled()(value)
+
+    def run_many(self, values):
+        """Results for each input value, compiled once."""
+        run = self.compiled()
+        return [run(value) for value in values]
+
+    def __repr__(self):
+        return f"Macro({self.name!r}, {list(self.keys)!r})"
+
+
+class MacroLibrary:
+    """Named macros, saved as JSON ({"name": [keys...]}) if path is set."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.macros = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.macros = {name: Macro(name, keys) for name, keys in data.items()}
+
+    def save(self):
+        if not self.path:
+            return
+        data = {name: list(macro.keys) for name, macro in self.macros.items()}
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp, self.path)
+
+    def add(self, name, keys):
+        """Save keys as macro name (replacing any macro of that name)."""
+        name = name.strip()
+        if not name:
+            raise MacroError("a macro needs a name")
+        compile_macro(keys)     # rejects unknown keys
+        macro = self.macros[name] = Macro(name, keys)
+        self.save()
+        return macro
+
+    def remove(self, name):
+        del self.macros[name]
+        self.save()
+
+    def __getitem__(self, name):
+        try:
+            return self.macros[name]
+        except KeyError:
+            raise MacroError(f"no macro named {name!r}") from None
+
+    def __contains__(self, name):
+        return name in self.macros
+
+    def __iter__(self):
+        return iter(sorted(self.macros))
+
+    def __len__(self):
+        return len(self.macros)
+
+
+# ============================
+#   BATCH REPLAY
+# ============================
+def evaluate_chunk(keys, chunk):
+    """Replay keys on each input in chunk; one output block.
+
+    A module-level function (with keys bound by functools.partial) so
+    it can be sent to worker processes; each compiles the macro once.
+    Inputs that are not numbers give "Error".
+    """
+    run = compile_macro(keys)
+    return "".join([_replay(run, value.strip()) + "\n" for value in chunk])
+
+
+def _replay(run, value):
+    # One bad input line gives "Error", like expression mode (the
+    # engine itself would carry on after showing "Error")
+    try:
+        if value:
+            to_number(value)
+        return run(value)
+    except Exception:
+        return "Error"
@@ -0,0 +1,273 @@
+"""Pluggable numeric backends.
+
+Every number the calculator parses, computes or formats goes through the
+active backend:
+
+    float     Python floats (default, fastest)
+    decimal   decimal.Decimal with a configurable context
+    fraction  fractions.Fraction, exact rationals
+    gmpy2     gmpy2 mpz/mpq big numbers (only if gmpy2 is installed)
+
+Pick one at startup with set_backend(); benchmarks/bench_numeric.py
+shows what each costs per operation.
+
+decimal, fractions and gmpy2 are imported when a backend that needs
+them is created or activated, so the default float backend does not pay
+several milliseconds of startup for them.
+"""
+import math
+
+import formatting
+
+# Bound by _import_exact() and _import_gmpy2()
+decimal = None
+Fraction = None
+gmpy2 = None
+
+
+def _import_exact():
+    global decimal, Fraction
+    import decimal
+    from fractions import Fraction
+
+
+def _import_gmpy2():
+    global gmpy2
+    try:
+        import gmpy2
+    except ImportError:
+        raise ValueError("the gmpy2 backend needs the gmpy2 package") from None
+
+
+# ============================
+#   FLOAT
+# ============================
+class FloatBackend:
+    """Python floats, with ints kept for integer literals like eval()."""
+
+    name = "float"
+    zero = 0.0
+    exact = False       # results are rounded
+
+    def literal(self, text):
+        if "." in text or "e" in text or "E" in text:
+            return float(text)
+        return int(text)
+
+    def parse(self, value):
+        return float(value)
+
+    def sqrt(self, num):
+        return math.sqrt(num)
+
+    # Type-dispatched, LRU-backed formatters (see formatting.py)
+    format = staticmethod(formatting.format_number)
+    format_result = staticmethod(formatting.format_fixed)
+
+
+# ============================
+#   DECIMAL
+# ============================
+# Values with more integer digits than this, or this many zeros after
+# the point, are shown in scientific notation: spelling them out costs
+# time and memory for no readable gain (and Python refuses int/str
+# conversions past 4300 digits).
+SCIENTIFIC_DIGITS = 100
+
+
+def _strip_decimal(text):
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def _format_decimal(num, spec):
+    """A Decimal as fixed-point text with spec ("f" or ".10f"), or as
+    scientific text like 1.5e+300 when it is too large (or, with "f",
+    too small) to spell out."""
+    exponent = num.adjusted()
+    if num and (exponent >= SCIENTIFIC_DIGITS
+                or spec == "f" and exponent <= -SCIENTIFIC_DIGITS):
+        mantissa, exponent = format(num, "e").split("e")
+        return f"{_strip_decimal(mantissa)}e{exponent}"
+    return _strip_decimal(format(num, spec))
+
+
+class DecimalBackend:
+    """decimal.Decimal arithmetic in its own context.
+
+    The context is installed with decimal.setcontext() when the backend
+    is activated, so it applies to the thread that called set_backend().
+    """
+
+    name = "decimal"
+    exact = False
+
+    def __init__(self, precision=28, rounding="ROUND_HALF_EVEN"):
+        _import_exact()
+        self.context = decimal.Context(prec=precision, rounding=rounding)
+        self.zero = decimal.Decimal(0)
+
+    def activate(self):
+        _import_exact()     # unpickled in a worker process
+        decimal.setcontext(self.context)
+
+    def literal(self, text):
+        return decimal.Decimal(text)
+
+    def parse(self, value):
+        if isinstance(value, float):
+            value = repr(value)
+        elif isinstance(value, Fraction):
+            return (decimal.Decimal(value.numerator)
+                    / decimal.Decimal(value.denominator))
+        try:
+            return decimal.Decimal(value)
+        except decimal.InvalidOperation:
+            raise ValueError(f"not a number: {value!r}") from None
+
+    def sqrt(self, num):
+        return self.parse(num).sqrt()
+
+    def format(self, value):
+        num = self.parse(value)
+        if not num.is_finite():
+            raise ValueError(f"not finite: {num}")
+        return _format_decimal(num, "f")
+
+    def format_result(self, value):
+        num = self.parse(value)
+        return _format_decimal(num, ".10f")
+
+
+# ============================
+#   RATIONALS (FRACTION / GMPY2)
+# ============================
+# Integers below 2**_SCIENTIFIC_BITS have fewer than SCIENTIFIC_DIGITS
+# digits (log10(2) < 0.302)
+_SCIENTIFIC_BITS = int(SCIENTIFIC_DIGITS / 0.302)
+
+
+class FractionBackend:
+    """Exact rational arithmetic with fractions.Fraction."""
+
+    name = "fraction"
+    exact = True
+
+    def __init__(self):
+        _import_exact()
+        self.zero = Fraction(0)
+
+    def activate(self):
+        _import_exact()     # unpickled in a worker process
+
+    def make(self, value):
+        return Fraction(value)
+
+    def literal(self, text):
+        return self.make(text)
+
+    def parse(self, value):
+        if isinstance(value, float):
+            value = repr(value)
+        return self.make(value)
+
+    def _to_decimal(self, num):
+        num = self.parse(num)
+        return (decimal.Decimal(int(num.numerator))
+                / decimal.Decimal(int(num.denominator)))
+
+    def sqrt(self, num):
+        return self.make(Fraction(self._to_decimal(num).sqrt()))
+
+    def _format(self, value, spec):
+        num = self.parse(value)
+        numerator = int(num.numerator)
+        # bit_length() is cheap; counting digits would not be
+        if (num.denominator == 1
+                and numerator.bit_length() < _SCIENTIFIC_BITS):
+            return str(numerator)
+        return _format_decimal(self._to_decimal(num), spec)
+
+    def format(self, value):
+        return self._format(value, "f")
+
+    def format_result(self, value):
+        return self._format(value, ".10f")
+
+
+class GmpyBackend(FractionBackend):
+    """gmpy2 big integers (mpz) and rationals (mpq)."""
+
+    name = "gmpy2"
+
+    def __init__(self):
+        _import_gmpy2()
+        _import_exact()
+        self.zero = gmpy2.mpz(0)
+
+    def activate(self):
+        _import_gmpy2()
+        _import_exact()
+
+    def make(self, value):
+        if isinstance(value, str):
+            value = Fraction(value)
+        return gmpy2.mpq(value)
+
+    def literal(self, text):
+        if "." in text or "e" in text or "E" in text:
+            return self.make(text)
+        return gmpy2.mpz(text)
+
+
+# ============================
+#   ACTIVE BACKEND
+# ============================
+BACKENDS = {
+    "float": FloatBackend,
+    "decimal": DecimalBackend,
+    "fraction": FractionBackend,
+    "gmpy2": GmpyBackend,
+}
+
+FLOAT = FloatBackend()
+backend = FLOAT
+
+
+def available_backends():
+    """Names of the backends usable in this environment."""
+    # Look for gmpy2 without importing it
+    from importlib.machinery import PathFinder
+    installed = gmpy2 is not None or PathFinder.find_spec("gmpy2")
+    return [name for name in BACKENDS if name != "gmpy2" or installed]
+
+
+def set_backend(name, **options):
+    """Activate a backend by name; options go to its constructor
+    (e.g. set_backend("decimal", precision=50))."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown numeric backend {name!r}; choose from "
+                         f"{', '.join(available_backends())}") from None
+    new = FLOAT if cls is FloatBackend and not options else cls(**options)
+    return use_backend(new)
+
+
+def use_backend(new):
+    """Activate a backend instance (e.g. one sent to a worker process)."""
+    global backend
+    if hasattr(new, "activate"):
+        new.activate()
+    backend = new
+    return new
+
+
+def get_backend():
+    return backend
+
+
+def to_number(value):
+    """Convert text or a number with the active backend (like float())."""
+    return backend.parse(value)
@@ -1,31 +1,384 @@
-import math
+import os
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from functools import wraps
+from itertools import islice, repeat
+
+import numeric
+from expression import (
+    BINARY, CONST, LOAD, STORE, UNARY, BINARY_OPERATORS,
+    compile_expression
+)
+from numeric import to_number
+from registers import MemoryRegisters
 
 # ============================
 #   MEMORY STORAGE
 # ============================
-memory = []
+# The default session's registers; other sessions make their own
+# MemoryRegisters and pass it as `registers` to the memory functions.
+memory = MemoryRegisters()
+
+
+def _registers(registers):
+    return memory if registers is None else registers
+
+
+def subscribe_memory(callback, registers=None):
+    """Call callback(action, value) after every MS/M+/M-/MC."""
+    _registers(registers).subscribe(callback)
+
+
+def unsubscribe_memory(callback, registers=None):
+    _registers(registers).unsubscribe(callback)
 
 
 # ============================
 #   EXPRESSION EVALUATION
 # ============================
 def calculate_expression(expr: str):
+    """Evaluate expr with the cached compiler. Failures → "Error"."""
     try:
-        expr = expr.replace("×", "*").replace("÷", "/").replace("−", "-")
-        return eval(expr)
+        return compile_expression(expr).evaluate()
     except Exception:
         return "Error"
 
 
+def explain_expression(expr: str):
+    """The optimized form calculate_expression(expr) evaluates, as text.
+
+    Constant parts are already folded, so a plain calculation shows as
+    its result; raises ExpressionError for text that does not parse.
+    """
+    return compile_expression(expr).explain()
+
+
+# ============================
+#   RESULT CACHE
+# ============================
+RESULT_CACHE_SIZE = 4096
+ResultCacheInfo = namedtuple("ResultCacheInfo",
+                             "hits misses maxsize currsize enabled")
+_MISSING = object()
+
+
+class ResultCache:
+    """Bounded LRU of operation results, with hit/miss counters.
+
+    Keys are (operation, operand, numeric backend), so switching
+    backends never returns a result computed with another one. Set
+    `enabled` to False (or use disable()) to compute everything afresh.
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.enabled = maxsize > 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+
+    def enable(self, maxsize=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+            while len(self.entries) > maxsize:
+                self.entries.popitem(last=False)
+        self.enabled = self.maxsize > 0
+
+    def disable(self):
+        self.enabled = False
+        self.entries.clear()
+
+    def clear(self):
+        """Drop all results and reset the counters."""
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        return ResultCacheInfo(self.hits, self.misses, self.maxsize,
+                               len(self.entries), self.enabled)
+
+
+result_cache = ResultCache()
+
+
+def memoized(func):
+    """Serve func(x)'s results from result_cache when it is enabled.
+
+    func must be pure given to_number(x) and the numeric backend. The
+    operand is converted before the lookup, so "2", "2.0" and 2 share
+    one entry. Operands that do not convert go straight to func (which
+    reports the error), and so do zero and NaN: 0.0 == -0.0, yet
+    sqrt(-0.0) is -0.0, and NaN never equals a stored key.
+    """
+    @wraps(func)
+    def cached(x):
+        cache = result_cache
+        if not cache.enabled:
+            return func(x)
+        try:
+            number = to_number(x)
+        except Exception:
+            return func(x)
+        if number == 0 or number != number:
+            return func(number)
+        key = (func, numeric.backend, number)
+        value = cache.entries.get(key, _MISSING)
+        if value is _MISSING:
+            cache.misses += 1
+            value = cache.entries[key] = func(number)
+            if len(cache.entries) > cache.maxsize:
+                cache.entries.popitem(last=False)
+            return value
+        cache.hits += 1
+        cache.entries.move_to_end(key)
+        return value
+    return cached
+
+
+# ============================
+#   DIRECT BINARY OPERATIONS
+# ============================
+# The calculator's own symbols map to the same functions as the ASCII
+# operators of the expression language.
+_BINARY = dict(BINARY_OPERATORS)
+_BINARY.update({
+    "−": BINARY_OPERATORS["-"],
+    "×": BINARY_OPERATORS["*"],
+    "÷": BINARY_OPERATORS["/"],
+})
+
+
+def apply_binary(op, left, right):
+    """Compute left op right on two numbers, without an expression string.
+
+    op is + − × ÷ or any binary operator of the expression language.
+    Division by zero, overflow, infinite or NaN results, non-numeric
+    operands and an unknown op all give "Error", as calculate_expression
+    does for the equivalent text.
+    """
+    func = _BINARY.get(op)
+    if func is None:
+        return "Error"
+    try:
+        value = func(left, right)
+    except (ArithmeticError, TypeError, ValueError):
+        return "Error"
+    kind = type(value)
+    if kind is float:
+        if value - value != 0.0:     # inf or nan
+            return "Error"
+    elif kind is not int and hasattr(value, "is_finite"):
+        if not value.is_finite():    # Decimal infinity / NaN
+            return "Error"
+    return value
+
+
+# ============================
+#   BATCH EVALUATION
+# ============================
+_np = None
+
+
+def _numpy():
+    """Import NumPy on first use; None when it is not installed."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _np = numpy
+    return _np or None
+
+
+def _batch_length(arrays):
+    lengths = {len(arr) for arr in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"columns have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else 1
+
+
+def evaluate_batch(expr: str, /, **arrays):
+    """Evaluate expr element-wise over equally sized columns.
+
+    Names in expr (any name, "expr" included) are bound to the keyword
+    arrays (NumPy arrays, array.array buffers or plain sequences).
+    Returns (values, errors): float64 results and a boolean mask marking
+    elements that divided by zero, overflowed or were otherwise invalid.
+    Masked values are NaN.
+    """
+    compiled = compile_expression(expr, numeric.FLOAT)
+    missing = compiled.names - arrays.keys()
+    if missing:
+        raise ValueError(f"no column for: {', '.join(sorted(missing))}")
+    length = _batch_length(arrays)
+
+    np = _numpy()
+    if np is not None:
+        env = {}
+        for name in compiled.names:
+            arr = arrays[name]
+            if isinstance(arr, array) and arr.typecode == "d":
+                arr = np.frombuffer(arr, dtype=np.float64)
+            env[name] = np.asarray(arr, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            try:
+                values = compiled.evaluate(env)
+                values = np.array(np.broadcast_to(values, (length,)),
+                                  dtype=np.float64)
+            except Exception:
+                # A value float64 cannot hold (e.g. a folded 10 ** 400):
+                # go row by row like the pure-Python path, so the
+                # failures come back in the mask there too.
+                values, errors = _evaluate_rows(
+                    compiled, {name: env[name].tolist() for name in env},
+                    length)
+                return (np.frombuffer(values, dtype=np.float64),
+                        np.frombuffer(errors, dtype=np.bool_))
+        errors = ~np.isfinite(values)
+        values[errors] = np.nan
+        return values, errors
+
+    # Pure Python: run each instruction over whole columns with map(),
+    # so the per-row loop is in C; redo rows one by one only if some
+    # row raised (e.g. divided by zero).
+    from math import isfinite
+    try:
+        values = array("d", _evaluate_columns(compiled.code, arrays, length))
+    except Exception:
+        return _evaluate_rows(compiled, arrays, length)
+    errors = array("b", bytes(length))
+    if not all(map(isfinite, values)):
+        nan = float("nan")
+        for i, value in enumerate(values):
+            if not isfinite(value):
+                values[i] = nan
+                errors[i] = 1
+    return values, errors
+
+
+def _evaluate_columns(code, columns, length):
+    """Iterator over code's results for every row (see evaluate_batch)."""
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    temps = {}
+    for opcode, arg in code:
+        if opcode == CONST:
+            push(repeat(arg, length))
+        elif opcode == LOAD:
+            push(columns[arg])
+        elif opcode == BINARY:
+            right = pop()
+            push(map(arg, pop(), right))
+        elif opcode == UNARY:
+            push(map(arg, pop()))
+        elif opcode == STORE:
+            # A shared column is read more than once: materialize it
+            temps[arg] = stack[-1] = list(stack[-1])
+        else:
+            push(temps[arg])
+    return map(float, stack[0])
+
+
+def _evaluate_rows(compiled, columns, length):
+    from math import isfinite
+    values = array("d", bytes(8 * length))
+    errors = array("b", bytes(length))
+    names = tuple(compiled.names)
+    columns = [columns[name] for name in names]
+    evaluate = compiled.evaluate
+    nan = float("nan")
+    for i in range(length):
+        try:
+            value = float(evaluate({n: c[i] for n, c in zip(names, columns)}))
+            if not isfinite(value):
+                raise ArithmeticError(value)
+            values[i] = value
+        except Exception:
+            values[i] = nan
+            errors[i] = 1
+    return values, errors
+
+
+# ============================
+#   PARALLEL EVALUATION
+# ============================
+DEFAULT_CHUNKSIZE = 1024
+
+
+def chunked(items, size):
+    """Group items into lists of at most size items."""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_pool(backend, mode):
+    numeric.use_backend(backend)
+    set_result_mode(mode)
+
+
+def map_chunks(func, chunks, workers=None):
+    """Yield func(chunk) for every chunk, computed in worker processes.
+
+    Results come back in input order and at most 2 * workers chunks are
+    in flight, so an unbounded iterable streams in constant memory.
+    Workers start with this process's numeric backend and result mode;
+    func must be a module-level function so it can be pickled.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_pool,
+        initargs=(numeric.get_backend(), result_mode))
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Also reached when the caller stops iterating early
+        pool.shutdown(cancel_futures=True)
+
+
+def _evaluate_chunk(chunk):
+    return [calculate_expression(expr) for expr in chunk]
+
+
+def evaluate_many(expressions, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield calculate_expression(expr) for each expression, in order.
+
+    Expressions are sent to a process pool in chunks of chunksize;
+    each worker compiles them through its own expression cache.
+    workers defaults to the number of CPUs; workers=1 evaluates in
+    this process.
+    """
+    chunks = chunked(expressions, chunksize)
+    if workers == 1:
+        results = map(_evaluate_chunk, chunks)
+    else:
+        results = map_chunks(_evaluate_chunk, chunks, workers)
+    for chunk_results in results:
+        yield from chunk_results
+
+
 # ============================
 #   SAFE NUMBER CONVERSION
 # ============================
 def _safe_number(value):
-    """Convert to float safely. Empty or invalid → 0."""
+    """Convert with the numeric backend safely. Empty or invalid → 0."""
     try:
-        return float(value)
+        return to_number(value)
     except Exception:
-        return 0.0
+        return numeric.get_backend().zero
 
 
 # ============================
@@ -33,94 +386,95 @@ def _safe_number(value):
 # ============================
 
 def format_number(value):
-    """Return int-like numbers without .0, keep decimals otherwise."""
+    """Return int-like numbers without .0, keep decimals otherwise.
+
+    Text that is not a number is returned as is; a number that cannot
+    be formatted gives "Error".
+    """
     try:
-        num = float(value)
-        if num.is_integer():
-            return str(int(num))
-        return str(num)
+        return numeric.backend.format(value)
     except Exception:
-        return value
+        return value if type(value) is str else "Error"
 
 
-def format_result(value):
-    """Format final results: remove .0, limit long floats."""
-    try:
-        num = float(value)
+RESULT_MODES = ("fixed", "shortest")
+result_mode = "fixed"
 
-        # If integer → return without decimals
-        if num.is_integer():
-            return str(int(num))
 
-        # Limit to 10 decimal places, remove trailing zeros
-        formatted = f"{num:.10f}".rstrip("0").rstrip(".")
+def set_result_mode(mode):
+    """"fixed": at most 10 decimals. "shortest": the shortest text that
+    round-trips to the same value (same as format_number)."""
+    global result_mode
+    if mode not in RESULT_MODES:
+        raise ValueError(f"result mode must be one of {RESULT_MODES}")
+    result_mode = mode
 
-        return formatted
+
+def format_result(value):
+    """Format final results: remove .0, limit to 10 decimal places."""
+    try:
+        if result_mode == "shortest":
+            return numeric.backend.format(value)
+        return numeric.backend.format_result(value)
     except Exception:
-        return value
+        return value if type(value) is str else "Error"
 
 
 # ============================
 #   MEMORY FUNCTIONS
 # ============================
-def memory_store(value):
-    global memory
-    num = _safe_number(value)
-    memory.insert(0, format_number(num))
+def memory_store(value, registers=None):
+    _registers(registers).store(_safe_number(value))
 
 
-def memory_add(value):
-    global memory
-    num = _safe_number(value)
-    if memory:
-        memory[0] = format_number(_safe_number(memory[0]) + num)
-    else:
-        memory.insert(0, format_number(num))
+def memory_add(value, registers=None):
+    _registers(registers).add(_safe_number(value))
 
 
-def memory_subtract(value):
-    global memory
-    num = _safe_number(value)
-    if memory:
-        memory[0] = format_number(_safe_number(memory[0]) - num)
-    else:
-        memory.insert(0, format_number(-num))
+def memory_subtract(value, registers=None):
+    _registers(registers).subtract(_safe_number(value))
 
 
-def memory_recall():
-    return memory[-1] if memory else ""
+def memory_recall(registers=None):
+    registers = _registers(registers)
+    return format_number(registers[-1]) if len(registers) else ""
 
 
-def memory_clear():
-    memory.clear()
+def memory_clear(registers=None):
+    _registers(registers).clear()
 
 
-def memory_list():
-    global memory
+def memory_list(registers=None):
+    """Formatted copy of the memory, newest first.
 
-    return memory.copy()
+    Use memory.view() (or len(memory)) where a copy is not needed.
+    """
+    return [format_number(value) for value in _registers(registers)]
 
 
 # ============================
 #   UNARY OPERATIONS
 # ============================
+@memoized
 def reciprocal(x):
     try:
-        return format_number(1 / float(x))
+        return format_number(1 / to_number(x))
     except Exception:
         return "Error"
 
 
+@memoized
 def square(x):
     try:
-        return format_number(float(x) ** 2)
+        return format_number(to_number(x) ** 2)
     except Exception:
         return "Error"
 
 
+@memoized
 def sqrt(x):
     try:
-        return format_number(math.sqrt(float(x)))
+        return format_number(numeric.get_backend().sqrt(to_number(x)))
     except Exception:
         return "Error"
 
@@ -130,7 +484,7 @@ def sqrt(x):
 # ============================
 def toggle_sign(x):
     try:
-        return format_number(-float(x))
+        return format_number(-to_number(x))
     except Exception:
         return x
 
@@ -153,9 +507,10 @@ def backspace(expr):
 # ============================
 #   PERCENTAGE
 # ============================
+@memoized
 def percentage(expr):
     try:
-        return float(expr) / 100
+        return to_number(expr) / 100
     except Exception:
         return "Error"
 
@@ -0,0 +1,132 @@
+"""Memory registers: the calculator's MS/M+/M-/MC stack.
+
+Values are kept as native numbers of the active numeric backend and are
+only formatted for display. Each MemoryRegisters is independent, so
+several calculator sessions can share one process.
+"""
+from array import array
+
+
+# ============================================================
+#   READ-ONLY VIEW
+# ============================================================
+class RegistersView:
+    """Live, newest-first view of a MemoryRegisters (nothing is copied)."""
+
+    __slots__ = ("_registers",)
+
+    def __init__(self, registers):
+        self._registers = registers
+
+    def __len__(self):
+        return len(self._registers)
+
+    def __getitem__(self, index):
+        return self._registers[index]
+
+    def __iter__(self):
+        return iter(self._registers)
+
+    def __repr__(self):
+        return f"RegistersView({list(self)!r})"
+
+
+# ============================================================
+#   MEMORY REGISTERS
+# ============================================================
+class MemoryRegisters:
+    """Newest-first stack of stored numbers with change notifications.
+
+    The newest value lives at the end of the backing array, so MS is an
+    O(1) append and M+/M- update the last slot in place. Floats are kept
+    unboxed in an array("d"); the first non-float value (Decimal,
+    Fraction, mpq, ...) switches the storage to a plain list.
+
+    subscribe(callback) calls callback(action, value) after every
+    MS/M+/M-/MC, where value is the number that was applied.
+    """
+
+    __slots__ = ("_values", "_listeners")
+
+    def __init__(self, values=()):
+        self._values = array("d")
+        self._listeners = []
+        for value in reversed(values):
+            self._push(value)
+
+    # --- storage ---
+    def _push(self, value):
+        if type(value) is not float and type(self._values) is array:
+            self._values = list(self._values)
+        self._values.append(value)
+
+    def _set_top(self, value):
+        if type(value) is not float and type(self._values) is array:
+            self._values = list(self._values)
+        self._values[-1] = value
+
+    # --- reading ---
+    def __len__(self):
+        return len(self._values)
+
+    def is_empty(self):
+        return not self._values
+
+    def __getitem__(self, index):
+        """registers[0] is the newest value, registers[-1] the oldest."""
+        values = self._values
+        size = len(values)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("memory index out of range")
+        return values[size - 1 - index]
+
+    def __iter__(self):
+        return reversed(self._values)
+
+    def view(self):
+        """A read-only, newest-first view that follows later changes."""
+        return RegistersView(self)
+
+    # --- change events ---
+    def subscribe(self, callback):
+        """Call callback(action, value) after every MS/M+/M-/MC."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+
+    def _notify(self, action, value=None):
+        for callback in self._listeners:
+            callback(action, value)
+
+    # --- operations (values are already backend numbers) ---
+    def store(self, num):
+        """MS: push num as the newest value."""
+        self._push(num)
+        self._notify("MS", num)
+
+    def add(self, num):
+        """M+: add num to the newest value (stores it if empty)."""
+        if self._values:
+            self._set_top(self._values[-1] + num)
+        else:
+            self._push(num)
+        self._notify("M+", num)
+
+    def subtract(self, num):
+        """M-: subtract num from the newest value (stores -num if empty)."""
+        if self._values:
+            self._set_top(self._values[-1] - num)
+        else:
+            self._push(-num)
+        self._notify("M-", num)
+
+    def clear(self):
+        """MC: drop every value."""
+        self._values = array("d")
+        self._notify("MC")
+
+    def __repr__(self):
+        return f"MemoryRegisters({list(self)!r})"
@@ -0,0 +1,210 @@
+"""Asyncio calculation service on a local socket.
+
+One warm process evaluates expressions for any number of local clients:
+
+    python -m server                      # TCP on 127.0.0.1:7525
+    python -m server --unix /tmp/calc.sock
+    python -m server --framing length     # 4-byte length-prefixed frames
+
+Each request is one expression, or a memory command acting on that
+connection's own registers:
+
+    MS <expr>   M+ <expr>   M- <expr>   MR   MC
+
+and gets exactly one response: the formatted result (or "Error"), "OK"
+for MS/M+/M-/MC, and the recalled value for MR. Requests may be
+pipelined; responses come back in order. With line framing both sides
+send UTF-8 lines; with length framing every message is a big-endian
+uint32 byte count followed by UTF-8 text.
+
+Backpressure: a connection is not read further while its responses are
+waiting for the client to read them, and requests longer than
+MAX_REQUEST bytes close the connection.
+"""
+import argparse
+import asyncio
+import struct
+import sys
+
+from numeric import available_backends, set_backend
+from operations import (
+    calculate_expression, format_result, memory_store, memory_add,
+    memory_subtract, memory_recall, memory_clear, set_result_mode
+)
+from registers import MemoryRegisters
+from utils import backend_options, positive_int
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7525
+MAX_REQUEST = 64 * 1024
+FRAMINGS = ("line", "length")
+
+_LENGTH = struct.Struct(">I")
+_MEMORY = {"MS": memory_store, "M+": memory_add, "M-": memory_subtract}
+
+
+# ============================
+#   REQUESTS
+# ============================
+def handle_request(text, registers):
+    """Response text for one request against a connection's registers."""
+    text = text.strip()
+    command, _, arg = text.partition(" ")
+    if command in _MEMORY:
+        value = calculate_expression(arg)
+        if value == "Error":
+            return "Error"
+        _MEMORY[command](value, registers)
+        return "OK"
+    if text == "MR":
+        return memory_recall(registers)
+    if text == "MC":
+        memory_clear(registers)
+        return "OK"
+    return format_result(calculate_expression(text))
+
+
+# ============================
+#   FRAMING
+# ============================
+def encode(text, framing="line"):
+    data = text.encode("utf-8")
+    if framing == "line":
+        return data + b"\n"
+    return _LENGTH.pack(len(data)) + data
+
+
+async def read_message(reader, framing="line"):
+    """Next message from reader as text, or None at end of stream.
+
+    Raises ValueError for a message over MAX_REQUEST bytes.
+    """
+    if framing == "line":
+        try:
+            data = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as exc:
+            data = exc.partial        # last line without a newline
+            if not data:
+                return None
+        except asyncio.LimitOverrunError:
+            raise ValueError("request too long") from None
+        return data.decode("utf-8").rstrip("\r\n")
+
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as exc:
+        if not exc.partial:
+            return None
+        raise
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_REQUEST:
+        raise ValueError("request too long")
+    return (await reader.readexactly(length)).decode("utf-8")
+
+
+# ============================
+#   SERVER
+# ============================
+class CalculatorServer:
+    """Connection handler; every connection gets its own registers."""
+
+    def __init__(self, framing="line"):
+        if framing not in FRAMINGS:
+            raise ValueError(f"framing must be one of {FRAMINGS}")
+        self.framing = framing
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        framing = self.framing
+        registers = MemoryRegisters()
+        self.connections += 1
+        try:
+            while True:
+                request = await read_message(reader, framing)
+                if request is None:
+                    break
+                writer.write(encode(handle_request(request, registers),
+                                    framing))
+                self.requests += 1
+                # Waits only while the client is not reading its
+                # responses; pipelined requests stay unread meanwhile.
+                await writer.drain()
+        except (ConnectionError, ValueError, UnicodeDecodeError,
+                asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None,
+                framing="line", ready=None):
+    """Run the service until cancelled; ready() is called once listening."""
+    handler = CalculatorServer(framing).handle
+    # limit bounds both a single line and the per-connection read buffer
+    if unix:
+        server = await asyncio.start_unix_server(
+            handler, path=unix, limit=MAX_REQUEST)
+    else:
+        server = await asyncio.start_server(
+            handler, host, port, limit=MAX_REQUEST)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+# ============================
+#   COMMAND LINE
+# ============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m server",
+        description="Serve calculations on a local socket.")
+    parser.add_argument(
+        "--host", default=DEFAULT_HOST,
+        help=f"TCP address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT,
+        help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument(
+        "--unix", metavar="PATH",
+        help="listen on this Unix domain socket instead of TCP")
+    parser.add_argument(
+        "--framing", choices=FRAMINGS, default="line",
+        help="newline-delimited or length-prefixed messages "
+             "(default: line)")
+    parser.add_argument(
+        "--numeric", choices=available_backends(), default="float",
+        help="numeric backend (default: float)")
+    parser.add_argument(
+        "--precision", type=positive_int,
+        help="significant digits for --numeric decimal")
+    parser.add_argument(
+        "--shortest", action="store_true",
+        help="return the shortest round-trip form of each result")
+    args = parser.parse_args(argv)
+
+    set_backend(args.numeric, **backend_options(parser, args))
+    set_result_mode("shortest" if args.shortest else "fixed")
+
+    def ready(server):
+        where = args.unix or f"{args.host}:{args.port}"
+        print(f"listening on {where} ({args.framing} framing)",
+              file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.framing,
+                          ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""Optional on-disk persistence for history and memory.
+
+History is an append-only pair of files: history.dat holds encoded
+records back to back and history.idx holds one little-endian uint64
+offset per record. Both are memory-mapped, so reopening a session only
+maps the files; records are decoded when the panel asks for them.
+
+Memory operations (MS, M+, M-, MC) go to a separate append-only journal
+that is replayed at startup and compacted into plain MS entries once it
+grows long.
+"""
+import mmap
+import os
+import struct
+from decimal import Decimal
+from fractions import Fraction
+
+from history import DEFAULT_CAPACITY, HistoryRecord
+import operations
+from operations import memory_store, memory_add, memory_subtract
+
+COMPACT_BYTES = 64 * 1024 * 1024
+COMPACT_OPS = 4096
+COPY_CHUNK = 1 << 20
+
+_FIELD = struct.Struct("<cI")     # type tag, payload length
+_DOUBLE = struct.Struct("<d")
+_OFFSET = struct.Struct("<Q")
+
+
+# ============================
+#   VALUE ENCODING
+# ============================
+def encode_value(value):
+    """Encode None, a number or a string as tag + length + payload."""
+    if value is None:
+        tag, payload = b"n", b""
+    elif type(value) is float:
+        tag, payload = b"f", _DOUBLE.pack(value)
+    elif type(value) is int:
+        tag, payload = b"i", str(value).encode("ascii")
+    elif isinstance(value, Decimal):
+        tag, payload = b"d", str(value).encode("ascii")
+    elif isinstance(value, Fraction) or hasattr(value, "denominator"):
+        # Fractions and gmpy2 mpz/mpq round-trip as exact rationals
+        tag, payload = b"q", str(value).encode("ascii")
+    else:
+        tag, payload = b"s", str(value).encode("utf-8")
+    return _FIELD.pack(tag, len(payload)) + payload
+
+
+def decode_value(buf, offset):
+    """Decode one value at offset; return (value, next offset)."""
+    tag, length = _FIELD.unpack_from(buf, offset)
+    start = offset + _FIELD.size
+    end = start + length
+    if tag == b"n":
+        value = None
+    elif tag == b"f":
+        value = _DOUBLE.unpack_from(buf, start)[0]
+    elif tag == b"i":
+        value = int(bytes(buf[start:end]))
+    elif tag == b"d":
+        value = Decimal(bytes(buf[start:end]).decode("ascii"))
+    elif tag == b"q":
+        value = Fraction(bytes(buf[start:end]).decode("ascii"))
+    else:
+        value = bytes(buf[start:end]).decode("utf-8")
+    return value, end
+
+
+def encode_record(record):
+    return b"".join(encode_value(v) for v in
+                    (record.left, record.op, record.right, record.result))
+
+
+def decode_record(buf, offset):
+    left, offset = decode_value(buf, offset)
+    op, offset = decode_value(buf, offset)
+    right, offset = decode_value(buf, offset)
+    result, offset = decode_value(buf, offset)
+    return HistoryRecord(left, op, right, result)
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+# ============================================================
+#   PERSISTENT HISTORY
+# ============================================================
+class PersistentHistory:
+    """HistoryStore-compatible history kept in an append-only log.
+
+    Newest first like HistoryStore; only the newest `capacity` records
+    are visible. Appends are fsync'ed every `sync_every` records and the
+    log is compacted to the visible records once it passes
+    `compact_bytes`.
+    """
+
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY, sync_every=64,
+                 compact_bytes=COMPACT_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.capacity = capacity
+        self.sync_every = sync_every
+        self.compact_bytes = compact_bytes
+        self._data_path = os.path.join(directory, "history.dat")
+        self._index_path = os.path.join(directory, "history.idx")
+        self._open()
+
+    # --- file handling ---
+    def _open(self):
+        self._data = open(self._data_path, "a+b")
+        self._index = open(self._index_path, "a+b")
+        index_size = os.fstat(self._index.fileno()).st_size
+        if index_size % _OFFSET.size:
+            # Drop a torn offset left by a crash mid-write
+            index_size -= index_size % _OFFSET.size
+            self._index.truncate(index_size)
+        self._count = index_size // _OFFSET.size
+        self._data_size = os.fstat(self._data.fileno()).st_size
+        self._unsynced = 0
+        self._data_map = None
+        self._index_map = None
+        self._mapped_count = 0
+
+    def _unmap(self):
+        for mapped in (self._data_map, self._index_map):
+            if mapped is not None:
+                mapped.close()
+        self._data_map = None
+        self._index_map = None
+        self._mapped_count = 0
+
+    def _remap(self):
+        """Map everything written so far (called only on demand)."""
+        self._unmap()
+        self._data.flush()
+        self._index.flush()
+        if self._count:
+            self._data_map = mmap.mmap(
+                self._data.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index_map = mmap.mmap(
+                self._index.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_count = self._count
+
+    def sync(self):
+        """Flush pending appends and fsync both files."""
+        _fsync(self._data)
+        _fsync(self._index)
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        self._unmap()
+        self._data.close()
+        self._index.close()
+
+    # --- HistoryStore interface ---
+    def add(self, record):
+        """Append record as the newest entry."""
+        payload = encode_record(record)
+        self._data.write(payload)
+        self._index.write(_OFFSET.pack(self._data_size))
+        self._data_size += len(payload)
+        self._count += 1
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+        if (self._data_size >= self.compact_bytes
+                and self._count > self.capacity):
+            self.compact()
+
+    def clear(self):
+        self._unmap()
+        for f in (self._data, self._index):
+            f.truncate(0)
+            _fsync(f)
+        self._count = 0
+        self._data_size = 0
+        self._unsynced = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def _offset(self, position):
+        return _OFFSET.unpack_from(
+            self._index_map, position * _OFFSET.size)[0]
+
+    def __getitem__(self, index):
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("history index out of range")
+        position = self._count - 1 - index
+        if position >= self._mapped_count:
+            self._remap()
+        return decode_record(self._data_map, self._offset(position))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    # --- maintenance ---
+    def compact(self):
+        """Rewrite the log keeping only the newest `capacity` records."""
+        if self._count <= self.capacity:
+            return
+        self._remap()
+        first = self._count - self.capacity
+        start = self._offset(first)
+
+        data_tmp = self._data_path + ".tmp"
+        index_tmp = self._index_path + ".tmp"
+        with open(data_tmp, "wb") as data_out:
+            with memoryview(self._data_map) as view:
+                for pos in range(start, len(view), COPY_CHUNK):
+                    data_out.write(view[pos:pos + COPY_CHUNK])
+            _fsync(data_out)
+        with open(index_tmp, "wb") as index_out:
+            for position in range(first, self._count):
+                index_out.write(
+                    _OFFSET.pack(self._offset(position) - start))
+            _fsync(index_out)
+
+        self._unmap()
+        self._data.close()
+        self._index.close()
+        os.replace(data_tmp, self._data_path)
+        os.replace(index_tmp, self._index_path)
+        self._open()
+
+    def memory_usage(self):
+        """On-disk and mapped sizes in bytes."""
+        entries = len(self)
+        index_bytes = self._count * _OFFSET.size
+        total = self._data_size + index_bytes
+        return {
+            "entries": entries,
+            "capacity": self.capacity,
+            "data_bytes": self._data_size,
+            "index_bytes": index_bytes,
+            "mapped_bytes": (len(self._data_map) + len(self._index_map)
+                             if self._data_map is not None else 0),
+            "total_bytes": total,
+            "bytes_per_entry": total / self._count if self._count else 0.0,
+        }
+
+
+# ============================================================
+#   MEMORY JOURNAL
+# ============================================================
+_ACTIONS = {"MS": b"S", "M+": b"A", "M-": b"U", "MC": b"C"}
+_ACTION_NAMES = {code: name for name, code in _ACTIONS.items()}
+_REPLAY = {
+    "MS": memory_store,
+    "M+": memory_add,
+    "M-": memory_subtract,
+}
+
+
+class MemoryJournal:
+    """Append-only log of the operations on one MemoryRegisters.
+
+    registers defaults to operations.memory; subscribe record() to it
+    after restore().
+    """
+
+    def __init__(self, path, registers=None, sync_every=16,
+                 compact_ops=COMPACT_OPS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.registers = (operations.memory if registers is None
+                          else registers)
+        self.sync_every = sync_every
+        self.compact_ops = compact_ops
+        self._file = open(path, "a+b")
+        self._ops = 0
+        self._compact_at = compact_ops
+        self._unsynced = 0
+
+    def replay(self):
+        """Yield (action, value) for every logged operation."""
+        self._file.flush()
+        if not os.fstat(self._file.fileno()).st_size:
+            return
+        with mmap.mmap(self._file.fileno(), 0,
+                       access=mmap.ACCESS_READ) as mapped:
+            offset = 0
+            end = len(mapped)
+            while offset < end:
+                code = mapped[offset:offset + 1]
+                try:
+                    value, next_offset = decode_value(mapped, offset + 1)
+                except (struct.error, ValueError):
+                    break   # torn tail from a crash
+                if next_offset > end or code not in _ACTION_NAMES:
+                    break
+                offset = next_offset
+                yield _ACTION_NAMES[code], value
+
+    def restore(self):
+        """Rebuild the registers from the journal."""
+        registers = self.registers
+        registers.clear()
+        self._ops = 0
+        for action, value in self.replay():
+            self._ops += 1
+            if action == "MC":
+                registers.clear()
+            else:
+                _REPLAY[action](value, registers)
+        self._compact_at = self._ops + self.compact_ops
+
+    def record(self, action, value=None):
+        """Memory listener: log one operation."""
+        self._file.write(_ACTIONS[action] + encode_value(value))
+        self._ops += 1
+        self._unsynced += 1
+        if action == "MC" or self._unsynced >= self.sync_every:
+            self.sync()
+        if self._ops >= self._compact_at:
+            self.compact()
+
+    def sync(self):
+        _fsync(self._file)
+        self._unsynced = 0
+
+    def compact(self):
+        """Rewrite the journal as one MS per current memory slot."""
+        values = list(reversed(self.registers.view()))
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as out:
+            for value in values:
+                out.write(_ACTIONS["MS"] + encode_value(value))
+            _fsync(out)
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a+b")
+        self._ops = len(values)
+        self._compact_at = self._ops + self.compact_ops
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        self._file.close()
@@ -1,7 +1,19 @@
 from tkinter import ttk
 
+_applied = False
+
 
 def apply_styles():
+    """Set up the ttk theme and styles, once, before the first ttk widget.
+
+    Only the floating panels use ttk, so this is deferred until one of
+    them is opened instead of slowing down startup.
+    """
+    global _applied
+    if _applied:
+        return
+    _applied = True
+
     style = ttk.Style()
     style.theme_use("clam")  # clam respects custom colors
 
@@ -0,0 +1,22 @@
+"""Shared fixtures; the modules under test live in the repo root."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numeric  # noqa: E402
+import operations  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def float_backend():
+    """Every test starts and ends on the float backend, fixed results
+    and an empty result cache."""
+    numeric.set_backend("float")
+    operations.set_result_mode("fixed")
+    operations.result_cache.clear()
+    yield
+    numeric.set_backend("float")
+    operations.set_result_mode("fixed")
@@ -0,0 +1,128 @@
+"""CSV batch runs: chunk parsing and the result column."""
+import io
+import math
+from array import array
+
+import pytest
+
+import operations
+from batch import chunks, main, parse_chunk, run, split_columns
+from operations import evaluate_batch
+
+
+def rows(flat, width):
+    """flat as a list of row tuples, NaN shown as None."""
+    values = [None if math.isnan(value) else value for value in flat]
+    return [tuple(values[i:i + width]) for i in range(0, len(values), width)]
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"1,2\n3,4\n", [(1.0, 2.0), (3.0, 4.0)]),
+    (b"1,2\r\n3,4\r\n", [(1.0, 2.0), (3.0, 4.0)]),
+    (b" 1 , 2\n-3.5,1e3\n", [(1.0, 2.0), (-3.5, 1000.0)]),
+    (b"1,2\nx,4\n", [(1.0, 2.0), (None, 4.0)]),
+    (b"1,2\n3\n5,6\n", [(1.0, 2.0), (None, None), (5.0, 6.0)]),
+    (b"1,2\n3,4,5\n", [(1.0, 2.0), (None, None)]),
+    (b"1,2\n\n3,4\n", [(1.0, 2.0), (3.0, 4.0)]),
+    # Four fields in all, yet neither line is a row
+    (b"1\n2,3,4\n", [(None, None), (None, None)]),
+    (b"", []),
+])
+def test_parse_chunk(data, expected):
+    assert rows(parse_chunk(data, 2), 2) == expected
+
+
+def test_parse_chunk_single_column():
+    assert rows(parse_chunk(b"1\n2\n\nx\n", 1), 1) == [
+        (1.0,), (2.0,), (None,)]
+
+
+def test_chunks_end_at_line_ends():
+    data = b"1,2\n30,40\n5,6\n" + b"7" * 50 + b",8\n"
+    spans = list(chunks(data, 0, 8))
+    assert spans[0][0] == 0 and spans[-1][1] == len(data)
+    for start, end in spans:
+        assert data[end - 1:end] == b"\n"
+    assert b"".join(data[start:end] for start, end in spans) == data
+
+
+@pytest.mark.parametrize("size", [0, -3])
+def test_chunks_rejects_sizes_below_one(size):
+    with pytest.raises(ValueError):
+        chunks(b"1,2\n3,4\n", 0, size)
+
+
+def test_split_columns_without_numpy(monkeypatch):
+    monkeypatch.setattr(operations, "_np", False)
+    flat = array("d", [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    assert split_columns(flat, 3, {"a": 0, "c": 2}) == {
+        "a": array("d", [1.0, 4.0]), "c": array("d", [3.0, 6.0])}
+
+
+def test_split_columns_are_numpy_views(monkeypatch):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(operations, "_np", None)
+    flat = array("d", [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    columns = split_columns(flat, 3, {"a": 0, "c": 2})
+    assert columns["a"].tolist() == [1.0, 4.0]
+    assert columns["c"].tolist() == [3.0, 6.0]
+    flat[5] = 9.0
+    assert columns["c"][1] == 9.0 and not columns["c"].flags.owndata
+    assert np.shares_memory(columns["a"], columns["c"])
+
+
+def csv_file(tmp_path, text):
+    path = tmp_path / "data.csv"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_run(tmp_path):
+    path = csv_file(tmp_path, "price, qty\n2.5,4\n1,0\nx,3\n3\n")
+    out = io.StringIO()
+    stats = run(path, "price × qty ÷ qty", out, name="unit")
+    assert out.getvalue() == "unit\n2.5\nError\nError\nError\n"
+    assert stats.rows == 4 and stats.errors == 3
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 7, 1 << 20])
+def test_run_in_chunks(tmp_path, chunk_bytes):
+    lines = [f"{i},{i % 7}" for i in range(200)]
+    path = csv_file(tmp_path, "a,b\n" + "\n".join(lines) + "\n")
+    out = io.StringIO()
+    run(path, "a − b", out, chunk_bytes=chunk_bytes)
+    assert out.getvalue().split() == ["result"] + [
+        str(i - i % 7) for i in range(200)]
+
+
+def test_run_constant_formula(tmp_path):
+    path = csv_file(tmp_path, "a\n1\n2\n")
+    out = io.StringIO()
+    run(path, "2 × 3", out)
+    assert out.getvalue() == "result\n6\n6\n"
+
+
+def test_run_rejects_unknown_columns(tmp_path):
+    path = csv_file(tmp_path, "a,b\n1,2\n")
+    with pytest.raises(ValueError, match="no column named c"):
+        run(path, "a + c", io.StringIO())
+
+
+@pytest.mark.parametrize("option", ["--chunk-bytes", "--workers"])
+@pytest.mark.parametrize("value", ["0", "-3"])
+def test_main_rejects_counts_below_one(tmp_path, capsys, option, value):
+    path = csv_file(tmp_path, "a,b\n1,2\n")
+    with pytest.raises(SystemExit):
+        main([path, "a ÷ b", option, value])
+    assert "must be at least 1" in capsys.readouterr().err
+    with pytest.raises(ValueError):
+        run(path, "a ÷ b", io.StringIO(), chunk_bytes=int(value))
+
+
+def test_a_column_named_expr(tmp_path):
+    values, errors = evaluate_batch("expr * 2", expr=[1.0, 2.0])
+    assert list(values) == [2.0, 4.0] and not any(errors)
+    path = csv_file(tmp_path, "expr\n1.5\n")
+    out = io.StringIO()
+    run(path, "expr + 1", out)
+    assert out.getvalue() == "result\n2.5\n"
@@ -0,0 +1,57 @@
+"""Streaming command line: one result per input line, in order."""
+import io
+import sys
+
+import pytest
+
+from calculator import main, run
+
+LINES = ["1 + 2", "2 × 3", "1 ÷ 0", "", "10 ÷ 4", "(1 + 2) × 3"]
+RESULTS = ["3", "6", "Error", "Error", "2.5", "9"]
+
+
+@pytest.fixture
+def expressions(tmp_path):
+    path = tmp_path / "expressions.txt"
+    path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_run(expressions):
+    out = io.StringIO()
+    run([expressions], out)
+    assert out.getvalue().splitlines() == RESULTS
+
+
+def test_run_reads_stdin_and_crlf(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("1 + 2\r\n7 × 6"))
+    out = io.StringIO()
+    run(["-"], out)
+    assert out.getvalue() == "3\n42\n"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 4096])
+def test_run_keeps_order_across_chunks_and_workers(tmp_path, chunk_size):
+    path = tmp_path / "many.txt"
+    path.write_text("".join(f"{i} × 2\n" for i in range(500)))
+    out = io.StringIO()
+    run([str(path)] * 2, out, chunk_size=chunk_size, workers=2)
+    assert out.getvalue().splitlines() == [
+        str(i * 2) for i in range(500)] * 2
+
+
+def test_shortest_mode(tmp_path, capsys):
+    path = tmp_path / "sums.txt"
+    path.write_text("0.1 + 0.2\n10 ÷ 3\n", encoding="utf-8")
+    assert main(["--shortest", str(path)]) == 0
+    assert capsys.readouterr().out.split() == [
+        "0.30000000000000004", "3.3333333333333335"]
+    assert main([str(path)]) == 0
+    assert capsys.readouterr().out.split() == ["0.3", "3.3333333333"]
+
+
+def test_main_rejects_bad_options(expressions, capsys):
+    for argv in (["--chunk-size", "0"], ["--workers", "-1"]):
+        with pytest.raises(SystemExit):
+            main(argv + [expressions])
+    assert "must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,102 @@
+"""CalculatorEngine: key sequences and what the display shows."""
+import math
+import random
+
+import pytest
+
+import numeric
+from engine import KEYS, CalculatorEngine
+from history import HistoryRecord
+from operations import apply_binary, calculate_expression, format_number
+
+
+def press(keys):
+    """Display after pressing space-separated keys on a fresh engine."""
+    return CalculatorEngine().feed(keys.split())
+
+
+@pytest.mark.parametrize("keys, display", [
+    ("1 2 + 3 =", ("12 + 3 =", "15")),
+    ("2 × 3 = =", ("6 × 3 =", "18")),
+    ("2 + 3 ×", ("5 ×", "5")),
+    ("1 0 ÷ 4 =", ("10 ÷ 4 =", "2.5")),
+    ("2 ÷ 0 =", ("2 ÷ 0 =", "Error")),
+    ("5 0 + 1 0 %", ("50 +", "0.1")),
+    ("5 +/-", ("", "-5")),
+    (". 5 + .", ("0.5 +", "0.")),
+    ("1 . . 5", ("", "1.5")),
+    ("9 x²", ("", "81")),
+    ("1 6 ²√x", ("", "4")),
+    ("0 1/x", ("", "Error")),
+    ("1 2 ⌫ ⌫", ("", "0")),
+    ("7 + 2 CE 3 =", ("7 + 3 =", "10")),
+    ("7 + 2 = C", ("", "0")),
+    ("4 x² + 1 =", ("16 + 1 =", "17")),
+    ("2 = 3 + 1 =", ("23 + 1 =", "24")),
+    ("0 1/x +", ("", "Error")),
+    ("5 + 0 1/x =", ("", "Error")),
+    ("5 + 0 1/x ×", ("", "Error")),
+    ("0 1/x + 3 =", ("", "3")),
+])
+def test_key_sequences(keys, display):
+    assert press(keys) == display
+
+
+def test_equals_records_history():
+    engine = CalculatorEngine()
+    engine.feed("6 × 7 = =".split())
+    assert [str(record) for record in engine.history] == [
+        "42 × 7 = 294", "6 × 7 = 42"]
+
+
+def test_load_result_continues_from_a_record():
+    engine = CalculatorEngine()
+    engine.load_result(HistoryRecord(6.0, "×", 7.0, 42.0))
+    assert engine.display == ("6 × 7 =", "42")
+    assert engine.feed("+ 8 =".split()) == ("42 + 8 =", "50")
+
+
+def test_bound_handlers_match_press():
+    rng = random.Random(1)
+    keys = list(KEYS)
+    for _ in range(500):
+        sequence = [rng.choice(keys) for _ in range(rng.randint(1, 12))]
+        pressed = CalculatorEngine()
+        bound = CalculatorEngine()
+        for key in sequence:
+            expected = pressed.press(key)
+            bound.handler(key)()
+            assert bound.display == expected, sequence
+
+
+@pytest.mark.parametrize("backend", ["float", "decimal", "fraction"])
+def test_no_key_sequence_raises(backend):
+    numeric.set_backend(backend)
+    rng = random.Random(backend)
+    keys = list(KEYS)
+    for _ in range(2000):
+        engine = CalculatorEngine()
+        sequence = [rng.choice(keys) for _ in range(rng.randint(1, 12))]
+        expression, result = engine.feed(sequence)
+        assert isinstance(expression, str) and isinstance(result, str)
+
+
+def test_unknown_keys_are_ignored():
+    assert press("1 M+ 2") == ("", "12")
+
+
+@pytest.mark.parametrize("backend", ["float", "decimal", "fraction"])
+def test_binary_keys_match_expressions(backend):
+    numeric.set_backend(backend)
+    rng = random.Random(2)
+    for _ in range(2000):
+        left = rng.choice(["0", "1", "2.5", "7", "1e308", "0.1", "12"])
+        right = rng.choice(["0", "3", "0.5", "1e308", "0.2"])
+        op = rng.choice("+−×÷")
+        value = apply_binary(op, numeric.to_number(left),
+                             numeric.to_number(right))
+        expected = calculate_expression(f"{left} {op} {right}")
+        if isinstance(expected, float) and not math.isfinite(expected):
+            expected = "Error"      # the keys never show inf or nan
+        assert format_number(value) == format_number(expected), (
+            left, op, right)
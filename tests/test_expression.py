@@ -0,0 +1,190 @@
+"""Parser and optimizer: compiled expressions against eval()."""
+import math
+import random
+
+import pytest
+
+import numeric
+from expression import (
+    BINARY, CONST, FETCH, STORE, CompiledExpression, ExpressionError,
+    compile_expression, normalize, optimize_tree, parse
+)
+from operations import calculate_expression
+
+LITERALS = ["0", "1", "2", "7", "0.5", "3.25", "1e3", "0.1", "10"]
+OPERATORS = ["+", "-", "*", "/", "//", "%", "**"]
+SPECIAL = [0.0, -0.0, 1.0, -2.5, 3, 0, -1, 1e308,
+           float("inf"), float("-inf"), float("nan")]
+
+
+def random_formula(rng, depth, names=()):
+    """A random expression; ** only gets small exponents."""
+    if depth == 0 or rng.random() < 0.3:
+        if names and rng.random() < 0.4:
+            return rng.choice(names)
+        return rng.choice(LITERALS)
+    if rng.random() < 0.15:
+        return rng.choice("-+") + random_formula(rng, depth - 1, names)
+    op = rng.choice(OPERATORS)
+    left = random_formula(rng, depth - 1, names)
+    if op == "**":
+        right = rng.choice(["2", "0.5", "1", "(-1)", "3"])
+    elif rng.random() < 0.2:
+        right = left    # repeated subexpressions for the optimizer
+    else:
+        right = random_formula(rng, depth - 1, names)
+    return f"({left} {op} {right})"
+
+
+def outcome(func):
+    """(type name, repr) of func()'s value, or ("raise", exception)."""
+    try:
+        value = func()
+    except Exception as exc:
+        return ("raise", type(exc).__name__)
+    if isinstance(value, float) and math.isnan(value):
+        return ("float", "nan")
+    return (type(value).__name__, repr(value))
+
+
+def unoptimized(expr):
+    source = normalize(expr)
+    return CompiledExpression(source, parse(source), optimize=False)
+
+
+# ============================
+#   PARSER
+# ============================
+def test_random_formulas_match_eval():
+    rng = random.Random(1)
+    for _ in range(3000):
+        expr = random_formula(rng, 4)
+        expected = outcome(lambda: eval(expr))
+        assert outcome(lambda: compile_expression(expr).evaluate()) == (
+            expected), expr
+        assert outcome(lambda: unoptimized(expr).evaluate()) == expected, expr
+
+
+def test_names_match_eval():
+    rng = random.Random(2)
+    for _ in range(1000):
+        expr = random_formula(rng, 4, ("a", "b"))
+        env = {"a": rng.choice(SPECIAL), "b": rng.choice(SPECIAL)}
+        expected = outcome(lambda: eval(expr, {}, dict(env)))
+        assert outcome(lambda: compile_expression(expr).evaluate(env)) == (
+            expected), (expr, env)
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("2 × 3 − 4 ÷ 8", 5.5),
+    ("-2 ** 2", -4),
+    ("2 ** 3 ** 2", 512),
+    ("(1 + 2) * 3", 9),
+    ("+-+1", -1),
+    ("7 // 2 % 3", 0),
+    (".5 + 5.", 5.5),
+])
+def test_precedence_and_unicode_operators(expr, expected):
+    assert compile_expression(expr).evaluate() == expected
+
+
+@pytest.mark.parametrize("expr", [
+    "", "1 +", "(1 + 2", "1 2", "05", "1 $ 2", "* 3", "()",
+])
+def test_syntax_errors(expr):
+    with pytest.raises(ExpressionError):
+        compile_expression(expr)
+
+
+def test_calculate_expression_reports_errors():
+    assert calculate_expression("1 ÷ 0") == "Error"
+    assert calculate_expression("1 +") == "Error"
+    assert calculate_expression("12 × 3") == 36
+
+
+def test_compilations_are_cached_per_backend():
+    assert compile_expression("1 + 2") is compile_expression(" 1 + 2 ")
+    numeric.set_backend("fraction")
+    compiled = compile_expression("1 + 2")
+    assert compiled is not compile_expression("1 + 2", numeric.FLOAT)
+    assert compiled.evaluate() == 3 and type(compiled.evaluate()) is not int
+
+
+# ============================
+#   OPTIMIZER
+# ============================
+def test_constants_are_folded():
+    compiled = compile_expression("x * (60 * 60 * 24) / (1000 * 1000)")
+    assert [arg for opcode, arg in compiled.code if opcode == CONST] == [
+        86400, 1000000]
+    assert compiled.evaluate({"x": 2}) == 0.1728
+
+
+def test_failing_constants_raise_at_evaluation():
+    compiled = compile_expression("x + 1 / 0")
+    assert optimize_tree(compiled.tree) == compiled.tree
+    with pytest.raises(ZeroDivisionError):
+        compiled.evaluate({"x": 1})
+
+
+@pytest.mark.parametrize("expr, optimized", [
+    ("x * 1", ("name", "x")),
+    ("1 * x", ("name", "x")),
+    ("x * -1", ("neg", ("name", "x"))),
+    ("x - 0", ("name", "x")),
+    ("x ** 1", ("name", "x")),
+    ("--x", ("name", "x")),
+    ("+x", ("name", "x")),
+])
+def test_float_identities(expr, optimized):
+    assert compile_expression(expr, numeric.FLOAT).optimized == optimized
+
+
+@pytest.mark.parametrize("expr", ["x + 0", "x * 0", "x - x", "x * 1.0"])
+def test_unsafe_identities_are_kept(expr):
+    compiled = compile_expression(expr, numeric.FLOAT)
+    assert compiled.optimized == compiled.tree
+
+
+def test_other_backends_only_fold():
+    numeric.set_backend("decimal")
+    compiled = compile_expression("x * 1 + 2 * 3")
+    assert compiled.optimized[2] == ("bin", "*", ("name", "x"),
+                                     ("num", numeric.to_number("1")))
+
+
+def test_common_subexpressions_are_computed_once():
+    compiled = compile_expression("(a × b) + (a × b) × 0.0825")
+    opcodes = [opcode for opcode, arg in compiled.code]
+    assert opcodes.count(STORE) == 1 and opcodes.count(FETCH) == 1
+    assert opcodes.count(BINARY) == 3
+    assert compiled.temps == 1
+    assert compiled.explain() == "t0 = (a * b)\nt0 + (t0 * 0.0825)"
+    assert compiled.evaluate({"a": 2.0, "b": 50.0}) == 108.25
+
+
+def test_nested_shared_subexpressions():
+    expr = ("((a − b) × (a − b) + (a − b))"
+            " ÷ ((a − b) × (a − b) + 1)")
+    compiled = compile_expression(expr)
+    assert compiled.temps == 2
+    env = {"a": 7.5, "b": 2.0}
+    assert compiled.evaluate(env) == unoptimized(expr).evaluate(env)
+
+
+def test_optimized_matches_unoptimized():
+    rng = random.Random(3)
+    for backend in ("float", "decimal", "fraction"):
+        numeric.set_backend(backend)
+        names = ("a", "b") if backend == "float" else ()
+        for _ in range(1500):
+            expr = random_formula(rng, 4, names)
+            env = {"a": rng.choice(SPECIAL), "b": rng.choice(SPECIAL)}
+            expected = outcome(lambda: unoptimized(expr).evaluate(env))
+            assert outcome(
+                lambda: compile_expression(expr).evaluate(env)) == (
+                expected), (backend, expr, env)
+
+
+def test_explain_constant():
+    assert compile_expression("2 × 3 + 1").explain() == "7"
@@ -0,0 +1,51 @@
+"""Float formatting fast paths and the result modes."""
+import random
+
+import pytest
+
+import formatting
+from operations import format_result, set_result_mode
+
+
+@pytest.mark.parametrize("value, number, fixed", [
+    (3.0, "3", "3"),
+    (-0.0, "0", "0"),
+    (2.5, "2.5", "2.5"),
+    (0.1 + 0.2, "0.30000000000000004", "0.3"),
+    (1 / 3, "0.3333333333333333", "0.3333333333"),
+    (-1e-11, "-1e-11", "0"),
+    (1e20, "100000000000000000000", "100000000000000000000"),
+    (1.5e-7, "1.5e-07", "0.00000015"),
+])
+def test_float_formatters(value, number, fixed):
+    assert formatting.number(value) == number
+    assert formatting.fixed(value) == fixed
+
+
+def test_dispatch_matches_the_float_formatters():
+    rng = random.Random(6)
+    for _ in range(2000):
+        value = rng.choice([rng.uniform(-1e6, 1e6),
+                            float(rng.randint(-99, 99)),
+                            rng.random() * 10 ** rng.randint(-12, 12)])
+        for given in (value, repr(value)):
+            assert formatting.format_number(given) == formatting.number(value)
+            assert formatting.format_fixed(given) == formatting.fixed(value)
+    assert formatting.format_number(12) == formatting.format_fixed(12) == "12"
+
+
+def test_text_is_cached():
+    formatting.cache_clear()
+    for _ in range(3):
+        formatting.format_number("2.50")
+    info = formatting.cache_info()["number"]
+    assert info.misses == 1 and info.hits == 2
+
+
+def test_result_modes():
+    assert format_result(0.1 + 0.2) == "0.3"
+    set_result_mode("shortest")
+    assert format_result(0.1 + 0.2) == "0.30000000000000004"
+    assert format_result("Error") == "Error"
+    with pytest.raises(ValueError):
+        set_result_mode("rounded")
@@ -0,0 +1,125 @@
+"""History: the ring-buffer store and search against a full scan."""
+import random
+from operator import add, mul, sub, truediv
+
+import pytest
+
+from expression import normalize
+from history import (
+    LOOKAHEAD, HistoryRecord, HistoryStore, IndexedHistory, _sort_key,
+    record_tokens
+)
+
+
+# ============================
+#   STORE
+# ============================
+def test_store_keeps_the_newest_capacity_records():
+    store = HistoryStore(capacity=3)
+    for i in range(7):
+        store.add(HistoryRecord(float(i), "+", 1.0, i + 1.0))
+    assert len(store) == 3
+    assert [record.left for record in store] == [6.0, 5.0, 4.0]
+    assert store[-1].left == 4.0
+    with pytest.raises(IndexError):
+        store[3]
+    store.clear()
+    assert len(store) == 0 and list(store) == []
+    with pytest.raises(ValueError):
+        HistoryStore(capacity=0)
+
+
+def test_records_format_like_the_display():
+    assert str(HistoryRecord(12.0, "×", 3.0, 36.0)) == "12 × 3 = 36"
+    assert str(HistoryRecord(1.0, "÷", 0.0, "Error")) == "1 ÷ 0 = Error"
+    assert HistoryRecord("2 × (3 + 4)", None, None, 14).expression == (
+        "2 × (3 + 4) =")
+
+
+# ============================
+#   SEARCH
+# ============================
+QUERIES = ["1.0825", "×", "*", "+ 3", "1 ×", ">10000", "<=5", "=12",
+           "5..10", "..2", "100..", "× >100", "7 + <50", "2 1.0825 >0",
+           "Error", "nothing", "-"]
+
+
+def random_record(rng):
+    left = rng.choice([1, 2, 3, 5, 7, 12, 100, 1.0825, 250.5, 12000])
+    op = rng.choice("+−×÷")
+    right = rng.choice([0, 1, 2, 3, 1.0825, 50, 7])
+    if op == "÷" and right == 0:
+        return HistoryRecord(left, op, right, "Error")
+    result = {"+": add, "−": sub, "×": mul, "÷": truediv}[op](left, right)
+    return HistoryRecord(left, op, right, result)
+
+
+def term_matches(term, record):
+    for op in (">=", "<=", ">", "<", "="):
+        if term.startswith(op):
+            value, key = float(term[len(op):]), _sort_key(record.result)
+            return {">=": key >= value, "<=": key <= value, "=": key == value,
+                    ">": key > value, "<": key < value}[op]
+    if ".." in term:
+        low, high = term.split("..")
+        key = _sort_key(record.result)
+        return ((not low or key >= float(low))
+                and (not high or key <= float(high)))
+    text = normalize(term)
+    return any(token.startswith(text) for token in record_tokens(record))
+
+
+def scan(history, query):
+    return [record for record in history
+            if all(term_matches(term, record) for term in query.split())]
+
+
+@pytest.fixture
+def history():
+    rng = random.Random(4)
+    history = IndexedHistory(HistoryStore(capacity=400))
+    for _ in range(300):
+        history.add(random_record(rng))
+    history.add(HistoryRecord("2 × (3 + 4)", None, None, 14))
+    return history
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_matches_a_scan(history, query):
+    assert list(history.search(query)) == scan(history, query)
+
+
+def test_search_follows_adds_and_evictions(history):
+    rng = random.Random(5)
+    history.search("×")     # build the index
+    for _ in range(700):
+        history.add(random_record(rng))
+        if rng.random() < 0.05:
+            query = rng.choice(QUERIES)
+            assert list(history.search(query)) == scan(history, query)
+    for query in QUERIES:
+        assert list(history.search(query)) == scan(history, query)
+
+
+def test_several_terms_are_counted_lazily():
+    history = IndexedHistory(HistoryStore())
+    for i in range(2000):
+        history.add(HistoryRecord(float(i), "×", 1.0825, i * 1.0825))
+    results = history.search("1.0825 >100")
+    assert not results.complete
+    assert len(results) == LOOKAHEAD
+    assert results[0].left == 1999.0
+    results[LOOKAHEAD - 1]
+    assert len(results) == 2 * LOOKAHEAD
+    assert results[-1].left == 93.0
+    assert results.complete and len(results) == 1907
+
+
+def test_a_single_term_is_counted_at_once():
+    history = IndexedHistory(HistoryStore())
+    for i in range(500):
+        history.add(HistoryRecord(float(i), "+", 1.0, i + 1.0))
+    results = history.search(">100")
+    assert results.complete and len(results) == 400
+    with pytest.raises(IndexError):
+        results[400]
@@ -0,0 +1,67 @@
+"""Latency histograms and the key-press tracer."""
+import math
+import random
+
+from instrumentation import LatencyHistogram, Tracer
+
+
+def exact_percentile(values, p):
+    values = sorted(values)
+    return values[max(1, math.ceil(len(values) * p / 100)) - 1]
+
+
+def test_empty_histogram():
+    hist = LatencyHistogram()
+    assert hist.percentile(50) == 0 and hist.mean == 0.0
+
+
+def test_small_values_are_exact():
+    hist = LatencyHistogram()
+    for value in range(1, 64):
+        hist.record(value)
+    assert [hist.percentile(p) for p in (0, 50, 99, 100)] == [1, 32, 63, 63]
+
+
+def test_percentiles_are_within_bucket_precision():
+    rng = random.Random(7)
+    values = [int(rng.lognormvariate(12, 2)) for _ in range(20000)]
+    hist = LatencyHistogram()
+    for value in values:
+        hist.record(value)
+    assert hist.count == len(values) and hist.max == max(values)
+    assert hist.min == min(values) and hist.total == sum(values)
+    for p in (1, 10, 50, 90, 99, 99.9, 100):
+        exact = exact_percentile(values, p)
+        assert exact <= hist.percentile(p) <= exact * 1.04, p
+
+
+def test_merge_matches_recording_everything():
+    rng = random.Random(8)
+    values = [rng.randrange(10 ** 9) for _ in range(2000)]
+    whole = LatencyHistogram()
+    left = LatencyHistogram()
+    right = LatencyHistogram()
+    for i, value in enumerate(values):
+        whole.record(value)
+        (left if i % 3 else right).record(value)
+    left.merge(right)
+    for name in ("buckets", "count", "total", "min", "max"):
+        assert getattr(left, name) == getattr(whole, name)
+
+
+def test_tracer_stages():
+    ticks = iter([0, 100, 400, 1000, 1000, 1500, 2000])
+    tracer = Tracer(clock=lambda: next(ticks))
+    fmt = tracer.timed_format(str)
+    tracer.begin("7")
+    tracer.mark("dispatch")             # 100
+    assert fmt(7) == "7"                # 400..1000 formatting
+    tracer.mark("compute")              # 1000 - 100 - 600
+    tracer.mark("widget")               # 500
+    tracer.end()                        # 2000 in all
+    stages = {stage: hist.max
+              for (kind, stage), hist in tracer.histograms.items()
+              if kind == "digit"}
+    assert stages == {"dispatch": 100, "format": 600, "compute": 300,
+                      "widget": 500, "total": 2000}
+    assert not tracer.active
@@ -0,0 +1,105 @@
+"""Keystroke macros: the compiled form against replaying the keys."""
+import io
+import random
+import sys
+
+import pytest
+
+import numeric
+from calculator import run
+from engine import KEYS
+from macros import (
+    MacroError, MacroLibrary, MacroRecorder, compile_macro, evaluate_chunk,
+    interpret
+)
+
+INPUTS = ["", "0", "7", "2.5", "12.", "-3", "1000", "abc"]
+
+
+def outcome(func, *args):
+    try:
+        return func(*args)
+    except Exception as exc:
+        return type(exc)
+
+
+@pytest.mark.parametrize("backend", ["float", "decimal", "fraction"])
+def test_compiled_matches_interpreted(backend):
+    numeric.set_backend(backend)
+    rng = random.Random(backend)
+    keys = list(KEYS)
+    for _ in range(1500):
+        sequence = [rng.choice(keys) for _ in range(rng.randint(1, 10))]
+        compiled = compile_macro(sequence)
+        for value in INPUTS:
+            assert outcome(compiled, value) == outcome(
+                interpret, sequence, value), (sequence, value)
+
+
+def test_tax_macro():
+    keys = list("×1.0825=") + ["−", "1", "0", "%", "="]
+    compiled = compile_macro(keys)
+    assert compiled.source is not None
+    assert compiled("100") == interpret(keys, "100")
+    assert compiled(200) == interpret(keys, "200")
+
+
+def test_repeated_equals_on_exact_backends():
+    numeric.set_backend("fraction")
+    keys = ["×", "3"] + ["="] * 40
+    compiled = compile_macro(keys)
+    assert compiled.steps < 10
+    assert compiled("2") == interpret(keys, "2")
+
+
+def test_blank_input_has_its_own_program():
+    keys = [".", "0", "6", "="]
+    assert compile_macro(keys)("") == interpret(keys, "") == "0.06"
+
+
+def test_unknown_keys():
+    with pytest.raises(MacroError):
+        compile_macro(["×", "M+"])
+
+
+def test_recorder_drops_the_sample_input():
+    recorder = MacroRecorder()
+    recorder.start()
+    for key in ["1", "2", ".", "5", "×", "2", "="]:
+        recorder.record(key)
+    assert recorder.stop() == ["×", "2", "="]
+    assert not recorder.recording
+
+
+def test_library_round_trip(tmp_path):
+    path = str(tmp_path / "macros.json")
+    library = MacroLibrary(path)
+    library.add(" double ", ["×", "2", "="])
+    with pytest.raises(MacroError):
+        library.add("", ["="])
+    reloaded = MacroLibrary(path)
+    assert list(reloaded) == ["double"]
+    assert reloaded["double"].run_many(["4", "1.5"]) == ["8", "3"]
+    reloaded.remove("double")
+    assert len(MacroLibrary(path)) == 0
+    with pytest.raises(MacroError):
+        reloaded["double"]
+
+
+def test_operands_that_are_not_numbers_replay_like_the_engine():
+    # The engine shows "Error" at "×", then starts over from "2"
+    keys = ["×", "2", "="]
+    assert compile_macro(keys)("abc") == interpret(keys, "abc") == "2"
+    assert interpret(["0", "1/x", "+", "3", "="], "") == "3"
+
+
+def test_bad_inputs_give_error_lines():
+    assert evaluate_chunk(("×", "2", "="), ["5", "abc", " 7 ", ""]) == (
+        "10\nError\n14\n0\n")
+
+
+def test_calculator_macro_mode(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("5\nabc\n7\n"))
+    out = io.StringIO()
+    run(["-"], out, macro=["×", "2", "="])
+    assert out.getvalue() == "10\nError\n14\n"
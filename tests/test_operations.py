@@ -0,0 +1,160 @@
+"""Operations: batch and parallel evaluation, formatting, caching."""
+import math
+from array import array
+from fractions import Fraction
+
+import pytest
+
+import numeric
+import operations
+from operations import (
+    chunked, evaluate_batch, evaluate_many, format_number, format_result,
+    map_chunks, sqrt, square
+)
+
+
+# ============================
+#   BATCH EVALUATION
+# ============================
+@pytest.fixture(params=["python", "numpy"])
+def batch_path(request, monkeypatch):
+    """Run a test on both evaluate_batch() paths."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(operations, "_np", None)
+    else:
+        monkeypatch.setattr(operations, "_np", False)
+    return request.param
+
+
+def batch(expr, **columns):
+    """evaluate_batch() as lists, NaN shown as None."""
+    values, errors = evaluate_batch(expr, **columns)
+    return ([None if math.isnan(value) else value for value in values],
+            [bool(error) for error in errors])
+
+
+def test_batch_columns(batch_path):
+    assert batch("a ÷ b − 1", a=array("d", [1.0, 2.0, 3.0]),
+                 b=[1.0, 0.0, 4.0]) == (
+        [0.0, None, -0.25], [False, True, False])
+
+
+def test_batch_overflow_and_invalid_rows(batch_path):
+    assert batch("a ** 2", a=[1e300, 2.0]) == ([None, 4.0], [True, False])
+    assert batch("a − a", a=[math.inf, 1.0]) == ([None, 0.0], [True, False])
+
+
+def test_batch_constant_formula(batch_path):
+    assert batch("2 × 3", a=[1.0, 2.0]) == ([6.0, 6.0], [False, False])
+
+
+def test_batch_constants_too_large_for_a_float(batch_path):
+    assert batch("a × 10 ** 400", a=[1.0, 0.0]) == (
+        [None, None], [True, True])
+    assert batch("10 ** 400", a=[1.0]) == ([None], [True])
+    assert batch("a + 10 ** 400 // 10 ** 399", a=[1.0]) == (
+        [11.0], [False])
+
+
+def test_batch_shared_subexpressions(batch_path):
+    assert batch("(a + b) × (a + b)", a=[1.0, 2.0], b=[2.0, 0.5]) == (
+        [9.0, 6.25], [False, False])
+
+
+def test_batch_column_errors():
+    with pytest.raises(ValueError, match="no column for: b"):
+        evaluate_batch("a + b", a=[1.0])
+    with pytest.raises(ValueError, match="different lengths"):
+        evaluate_batch("a + b", a=[1.0], b=[1.0, 2.0])
+
+
+# ============================
+#   FORMATTING
+# ============================
+@pytest.mark.parametrize("backend", ["decimal", "fraction"])
+def test_huge_exact_values_use_scientific_notation(backend):
+    numeric.set_backend(backend)
+    value = numeric.to_number("3")
+    for _ in range(10):
+        value = value * value       # 3 ** 1024, 489 digits
+    assert format_number(value).startswith("3.7339184874102004353")
+    assert format_number(value).endswith("e+488")
+    assert format_result(value) == format_number(value)
+    assert square("1e200") == "1e+400"
+    assert format_number(numeric.to_number("1e-150")) == "1e-150"
+    assert format_result(numeric.to_number("1e-150")) == "0"
+    assert format_number(numeric.to_number("123.5")) == "123.5"
+
+
+def test_values_that_cannot_be_formatted_give_error():
+    numeric.set_backend("decimal")
+    assert format_number(numeric.to_number("Infinity")) == "Error"
+    assert format_number("abc") == "abc"
+    assert format_result("Error") == "Error"
+
+
+@pytest.mark.parametrize("backend", ["float", "decimal", "fraction"])
+def test_backends_agree_on_fixed_results(backend):
+    numeric.set_backend(backend)
+    value = numeric.to_number("1") / numeric.to_number("3")
+    assert format_result(value) == "0.3333333333"
+    assert format_result(value * 3) == "1"
+
+
+# ============================
+#   PARALLEL EVALUATION
+# ============================
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_evaluate_many_keeps_order(workers):
+    expressions = [f"{i} ÷ 4" for i in range(300)] + ["1 ÷ 0", "1 +"]
+    assert list(evaluate_many(expressions, workers, chunksize=7)) == [
+        i / 4 for i in range(300)] + ["Error", "Error"]
+
+
+def test_workers_use_this_backend():
+    numeric.set_backend("fraction")
+    results = list(evaluate_many(["1 ÷ 3", "0.1 + 0.2"], 2, chunksize=1))
+    assert results == [Fraction(1, 3), Fraction(3, 10)]
+
+
+def test_map_chunks_stops_reading_when_the_caller_stops():
+    taken = []
+
+    def chunks():
+        for i in range(1000):
+            taken.append(i)
+            yield [i, i]
+
+    results = map_chunks(sum, chunks(), workers=2)
+    assert [next(results) for _ in range(3)] == [0, 2, 4]
+    results.close()
+    # At most 2 * workers chunks are in flight past the last result
+    assert len(taken) <= 3 + 4
+
+
+# ============================
+#   RESULT CACHE
+# ============================
+def test_equal_operands_share_a_cache_entry():
+    cache = operations.result_cache
+    assert square("2") == square("2.0") == square(2.0) == "4"
+    assert cache.info().misses == 1 and cache.info().hits == 2
+
+
+def test_cache_is_per_backend():
+    assert sqrt("2") == "1.4142135623730951"
+    numeric.set_backend("decimal", precision=5)
+    assert sqrt("2") == "1.4142"
+    assert operations.result_cache.info().currsize == 2
+
+
+def test_zero_and_bad_operands_bypass_the_cache():
+    assert sqrt("-0") == sqrt("0") == "0"
+    assert square("abc") == "Error"
+    assert operations.result_cache.info().currsize == 0
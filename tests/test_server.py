@@ -0,0 +1,98 @@
+"""Calculation service: requests, framing and pipelined connections."""
+import asyncio
+
+import pytest
+
+from registers import MemoryRegisters
+from server import MAX_REQUEST, encode, handle_request, main, serve
+
+
+def test_handle_request():
+    registers = MemoryRegisters()
+    assert handle_request("12 × 3", registers) == "36"
+    assert handle_request(" 1 ÷ 0 ", registers) == "Error"
+    assert handle_request("MS 2 + 3", registers) == "OK"
+    assert handle_request("M+ 10 ÷ 4", registers) == "OK"
+    assert handle_request("MR", registers) == "7.5"
+    assert handle_request("M- 1 ÷ 0", registers) == "Error"
+    assert handle_request("MC", registers) == "OK"
+    assert handle_request("MR", registers) == ""
+
+
+def test_encode():
+    assert encode("3 × 4") == "3 × 4\n".encode("utf-8")
+    assert encode("12", "length") == b"\x00\x00\x00\x0212"
+
+
+async def session(framing, conversations):
+    """Run a server and send each list of requests on its own
+    connection, all pipelined at once; returns the responses."""
+    started = asyncio.get_running_loop().create_future()
+    task = asyncio.create_task(
+        serve("127.0.0.1", 0, framing=framing, ready=started.set_result))
+    server = await started
+    port = server.sockets[0].getsockname()[1]
+
+    async def converse(requests):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"".join(encode(text, framing) for text in requests))
+        await writer.drain()
+        responses = []
+        for _ in requests:
+            if framing == "line":
+                responses.append((await reader.readline()).decode())
+            else:
+                size = int.from_bytes(await reader.readexactly(4), "big")
+                responses.append((await reader.readexactly(size)).decode())
+        writer.close()
+        return responses
+
+    try:
+        return await asyncio.gather(*map(converse, conversations))
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+@pytest.mark.parametrize("framing", ["line", "length"])
+def test_pipelined_requests_answer_in_order(framing):
+    requests = [f"{i} × 2" for i in range(200)] + ["MS 5", "MR", "1 ÷ 0"]
+    first, second = asyncio.run(session(framing, [requests, ["MR"]]))
+    expected = [str(i * 2) for i in range(200)] + ["OK", "5", "Error"]
+    if framing == "line":
+        expected = [text + "\n" for text in expected]
+    assert first == expected
+    # Every connection has its own memory
+    assert second == (["\n"] if framing == "line" else [""])
+
+
+def test_a_request_that_is_too_long_closes_the_connection():
+    async def run():
+        started = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(
+            serve("127.0.0.1", 0, ready=started.set_result))
+        port = (await started).sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"1" * (MAX_REQUEST + 10) + b"\n")
+        try:
+            await writer.drain()
+            return await reader.read()
+        except ConnectionError:
+            return b""
+        finally:
+            writer.close()
+            task.cancel()
+
+    assert asyncio.run(run()) == b""
+
+
+def test_main_rejects_bad_options(capsys):
+    for argv in (["--precision", "0"], ["--precision", "5"]):
+        with pytest.raises(SystemExit):
+            main(argv)
+    err = capsys.readouterr().err
+    assert "must be at least 1" in err
+    assert "--precision only applies to --numeric decimal" in err
@@ -0,0 +1,156 @@
+"""On-disk history and memory journal: round-trips and compaction."""
+import os
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from history import HistoryRecord
+from registers import MemoryRegisters
+from storage import (
+    MemoryJournal, PersistentHistory, decode_value, encode_value
+)
+
+
+@pytest.mark.parametrize("value", [
+    None, 0.0, -0.0, 2.5, float("inf"), 10 ** 40, -7,
+    Decimal("1.10"), Fraction(1, 3), "×", "Error",
+])
+def test_values_round_trip(value):
+    encoded = encode_value(value)
+    decoded, end = decode_value(encoded, 0)
+    assert end == len(encoded)
+    assert type(decoded) is type(value) and repr(decoded) == repr(value)
+
+
+def records(count, start=0):
+    return [HistoryRecord(float(i), "+", 1.0, float(i + 1))
+            for i in range(start, start + count)]
+
+
+def test_history_round_trip(tmp_path):
+    history = PersistentHistory(tmp_path, capacity=100)
+    for record in records(10):
+        history.add(record)
+    history.add(HistoryRecord("2 × (3 + 4)", None, None, 14))
+    history.close()
+
+    reopened = PersistentHistory(tmp_path, capacity=100)
+    assert len(reopened) == 11
+    assert str(reopened[0]) == "2 × (3 + 4) = 14"
+    assert [str(record) for record in reopened][1:3] == [
+        "9 + 1 = 10", "8 + 1 = 9"]
+    assert str(reopened[-1]) == "0 + 1 = 1"
+    with pytest.raises(IndexError):
+        reopened[11]
+    reopened.close()
+
+
+def test_history_keeps_the_newest_capacity_records(tmp_path):
+    history = PersistentHistory(tmp_path, capacity=5)
+    for record in records(12):
+        history.add(record)
+    assert len(history) == 5
+    assert history[0].result == 12.0 and history[-1].result == 8.0
+    history.close()
+
+
+def test_history_compaction(tmp_path):
+    history = PersistentHistory(tmp_path, capacity=5, compact_bytes=200)
+    for record in records(50):
+        history.add(record)
+        # Reads between appends see the newest record, compacted or not
+        assert history[0].left == record.left
+    usage = history.memory_usage()
+    assert usage["data_bytes"] <= 200 + 50
+    assert [record.left for record in history] == [
+        49.0, 48.0, 47.0, 46.0, 45.0]
+    history.close()
+
+    reopened = PersistentHistory(tmp_path, capacity=5)
+    assert [record.left for record in reopened] == [
+        49.0, 48.0, 47.0, 46.0, 45.0]
+    reopened.close()
+
+
+def test_history_drops_a_torn_offset(tmp_path):
+    history = PersistentHistory(tmp_path)
+    for record in records(3):
+        history.add(record)
+    history.close()
+    with open(os.path.join(tmp_path, "history.idx"), "ab") as f:
+        f.write(b"\x01\x02\x03")
+    reopened = PersistentHistory(tmp_path)
+    assert len(reopened) == 3 and reopened[0].left == 2.0
+    reopened.close()
+
+
+def test_history_clear(tmp_path):
+    history = PersistentHistory(tmp_path)
+    for record in records(3):
+        history.add(record)
+    history.clear()
+    assert len(history) == 0
+    history.add(HistoryRecord(1.0, "×", 2.0, 2.0))
+    assert str(history[0]) == "1 × 2 = 2"
+    history.close()
+
+
+def journaled(path, **options):
+    registers = MemoryRegisters()
+    journal = MemoryJournal(path, registers, **options)
+    journal.restore()
+    registers.subscribe(journal.record)
+    return registers, journal
+
+
+def test_memory_journal_round_trip(tmp_path):
+    path = os.path.join(tmp_path, "memory.log")
+    registers, journal = journaled(path)
+    registers.store(5.0)
+    registers.add(2.5)
+    registers.store(Fraction(1, 3))
+    registers.subtract(Fraction(1, 3))
+    registers.store(-1.0)
+    expected = list(registers)
+    journal.close()
+
+    restored, journal = journaled(path)
+    assert list(restored) == expected
+    restored.clear()
+    restored.store(9.0)
+    journal.close()
+
+    restored, journal = journaled(path)
+    assert list(restored) == [9.0]
+    journal.close()
+
+
+def test_memory_journal_compaction(tmp_path):
+    path = os.path.join(tmp_path, "memory.log")
+    registers, journal = journaled(path, compact_ops=10)
+    registers.store(0.0)
+    for i in range(100):
+        registers.add(1.0)
+        if i % 10 == 0:
+            registers.store(float(i))
+    expected = list(registers)
+    journal.close()
+
+    assert len(list(MemoryJournal(path, MemoryRegisters()).replay())) < 20
+    restored, journal = journaled(path)
+    assert list(restored) == expected
+    journal.close()
+
+
+def test_memory_journal_ignores_a_torn_tail(tmp_path):
+    path = os.path.join(tmp_path, "memory.log")
+    registers, journal = journaled(path)
+    registers.store(4.0)
+    registers.store(8.0)
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b"S" + encode_value(16.0)[:5])
+    restored, journal = journaled(path)
+    assert list(restored) == [8.0, 4.0]
+    journal.close()
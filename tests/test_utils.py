@@ -0,0 +1,32 @@
+"""Command-line helpers shared by the entry points."""
+import argparse
+
+import pytest
+
+from utils import backend_options, positive_int
+
+
+def test_positive_int():
+    assert positive_int("3") == 3
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int("0")
+    with pytest.raises(ValueError):
+        positive_int("x")
+
+
+def options(*argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--numeric", default="float")
+    parser.add_argument("--precision", type=positive_int)
+    return backend_options(parser, parser.parse_args(argv))
+
+
+def test_backend_options():
+    assert options() == {}
+    assert options("--numeric", "decimal") == {}
+    assert options("--numeric", "decimal", "--precision", "50") == {
+        "precision": 50}
+    with pytest.raises(SystemExit):
+        options("--numeric", "fraction", "--precision", "50")
+    with pytest.raises(SystemExit):
+        options("--precision", "50")
@@ -0,0 +1,26 @@
+import argparse
+
+
+# ============================
+#   COMMAND-LINE HELPERS
+# ============================
+def positive_int(text):
+    """argparse type for options that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
+
+
+def backend_options(parser, args):
+    """set_backend() options from --numeric/--precision.
+
+    --precision is only meaningful for the decimal backend; anything
+    else is a usage error (parser.error() exits).
+    """
+    options = {}
+    if args.precision is not None:
+        if args.numeric != "decimal":
+            parser.error("--precision only applies to --numeric decimal")
+        options["precision"] = args.precision
+    return options
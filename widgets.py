@@ -0,0 +1,358 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+# ============================================================
+#   VIRTUALIZED LIST
+# ============================================================
+class VirtualList(tk.Frame):
+    """Scrollable list that recycles a fixed pool of row widgets.
+
+    Only the rows that fit on screen exist as widgets. Scrolling or
+    inserting items re-fills those rows from `items`, which can be any
+    sequence supporting len() and indexing (newest first for history).
+
+    make_row(parent) builds one empty row; fill_row(row, index, item)
+    puts an item into it.
+    """
+
+    def __init__(self, parent, items, make_row, fill_row, empty_text="",
+                 bg="#f0f0f0", row_gap=4, **kwargs):
+        super().__init__(parent, bg=bg, **kwargs)
+        self.items = items
+        self.make_row = make_row
+        self.fill_row = fill_row
+        self.row_gap = row_gap
+        self.row_height = None
+        self.rows = []
+        self.visible = 0
+        self.offset = 0
+        self.count = 0      # len(items) at the last refresh
+
+        self.scroll_tag = f"VirtualList{id(self)}"
+        self.bind_class(self.scroll_tag, "<MouseWheel>", self._on_wheel)
+        self.bind_class(self.scroll_tag, "<Button-4>", self._on_wheel)
+        self.bind_class(self.scroll_tag, "<Button-5>", self._on_wheel)
+
+        self.scrollbar = ttk.Scrollbar(
+            self, orient="vertical", command=self.yview)
+        self.body = tk.Frame(self, bg=bg)
+        self.body.pack(side="left", expand=True, fill="both")
+        self.body.bind("<Configure>", self._on_resize)
+        self.add_scroll_target(self.body)
+
+        self.empty_label = tk.Label(
+            self.body,
+            text=empty_text,
+            anchor="nw",
+            justify="left",
+            bg=bg,
+            fg="gray"
+        )
+
+    # --- pool management ---
+    def add_scroll_target(self, widget):
+        """Let the mouse wheel scroll the list while over widget."""
+        widget.bindtags((self.scroll_tag,) + widget.bindtags())
+
+    def _new_row(self):
+        row = self.make_row(self.body)
+        self.add_scroll_target(row)
+        for child in row.winfo_children():
+            self.add_scroll_target(child)
+            for grandchild in child.winfo_children():
+                self.add_scroll_target(grandchild)
+        if self.row_height is None:
+            row.update_idletasks()
+            self.row_height = row.winfo_reqheight() + self.row_gap
+        self.rows.append(row)
+        return row
+
+    def _on_resize(self, event):
+        if not self.rows:
+            self._new_row()
+        visible = max(1, -(-event.height // self.row_height))
+        while len(self.rows) < visible:
+            self._new_row()
+        self.visible = visible
+        self.refresh()
+
+    # --- rendering ---
+    def refresh(self):
+        """Re-fill the visible rows from the current scroll offset."""
+        count = self.count = len(self.items)
+        self.offset = max(0, min(self.offset, count - self.visible + 1))
+        height = self.row_height or 0
+        gap = self.row_gap
+
+        for slot, row in enumerate(self.rows):
+            index = self.offset + slot
+            if slot < self.visible and index < count:
+                self.fill_row(row, index, self.items[index])
+                row.place(x=0, y=slot * height + gap // 2, relwidth=1,
+                          height=height - gap)
+            else:
+                row.index = None
+                row.place_forget()
+
+        if count:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(x=0, y=0, relwidth=1, relheight=1)
+        self._update_scrollbar(count)
+
+    def _update_scrollbar(self, count):
+        if count <= self.visible - 1 or not count:
+            self.scrollbar.pack_forget()
+            return
+        self.scrollbar.set(self.offset / count,
+                           min(1.0, (self.offset + self.visible - 1) / count))
+        if not self.scrollbar.winfo_ismapped():
+            self.scrollbar.pack(side="right", fill="y", before=self.body)
+
+    def prepend(self, count=1):
+        """Show count items newly inserted at the front of items."""
+        if self.offset:
+            # Keep the rows the user is looking at in place.
+            self.offset += count
+        self.refresh()
+
+    def set_items(self, items):
+        """Show a different sequence, from the top."""
+        self.items = items
+        self.offset = 0
+        self.refresh()
+
+    def update_item(self, index):
+        """Re-fill the row showing items[index], if it is on screen."""
+        slot = index - self.offset
+        if 0 <= slot < min(self.visible, len(self.rows)):
+            self.fill_row(self.rows[slot], index, self.items[index])
+
+    def sync(self):
+        """Catch up after items changed at the front.
+
+        Growth is shown as a prepend; anything else (an in-place update
+        of the first item) re-fills just that row; a shrink refreshes.
+        """
+        count = len(self.items)
+        if count > self.count:
+            self.prepend(count - self.count)
+        elif count < self.count or not count:
+            self.refresh()
+        else:
+            self.update_item(0)
+
+    # --- scrolling ---
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", f) or ("scroll", n, what)."""
+        count = len(self.items)
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * count)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, self.visible - 1)
+            self.offset += step
+        self.refresh()
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            step = -1
+        elif event.num == 5:
+            step = 1
+        else:
+            step = -1 if event.delta > 0 else 1
+        self.yview("scroll", step, "units")
+        return "break"
+
+
+# ============================================================
+#   LAYOUT SCHEDULING
+# ============================================================
+class LayoutScheduler:
+    """Coalesce a window's <Configure> events into one relayout.
+
+    Configure events bound on a toplevel also arrive for every child
+    widget; only the window's own are counted. The first one schedules
+    layout() with after_idle and later ones are absorbed until it runs,
+    so a window drag relayouts at most once per redraw.
+    """
+
+    def __init__(self, window, layout):
+        self.window = window
+        self.layout = layout
+        self.pending = None
+        self.received = 0    # Configure events for the window itself
+        self.ignored = 0     # Configure events from child widgets
+        self.relayouts = 0
+        window.bind("<Configure>", self._on_configure, add="+")
+
+    def _on_configure(self, event):
+        if event.widget is not self.window:
+            self.ignored += 1
+            return
+        self.received += 1
+        self.schedule()
+
+    def schedule(self):
+        """Run layout() once Tk is idle, unless already scheduled."""
+        if self.pending is None:
+            self.pending = self.window.after_idle(self._run)
+
+    def _run(self):
+        self.pending = None
+        self.relayouts += 1
+        self.layout()
+
+    def stats(self):
+        return {"received": self.received, "ignored": self.ignored,
+                "relayouts": self.relayouts}
+
+
+def set_geometry(window, spec):
+    """window.geometry(spec), skipped if spec is already applied."""
+    if getattr(window, "_geometry", None) == spec:
+        return False
+    window.geometry(spec)
+    window._geometry = spec
+    return True
+
+
+def place_at(widget, x, y):
+    """widget.place(x=x, y=y), skipped if it is already there."""
+    if getattr(widget, "_placed_at", None) == (x, y):
+        return False
+    widget.place(x=x, y=y)
+    widget._placed_at = (x, y)
+    return True
+
+
+def unplace(widget):
+    """place_forget() that remembers the widget is no longer placed."""
+    if getattr(widget, "_placed_at", None) is not None:
+        widget.place_forget()
+        widget._placed_at = None
+
+
+# ============================================================
+#   POPUP MANAGER
+# ============================================================
+def _toplevel_name(path):
+    """First component of a Tk path: ".!toplevel2.!frame" → "!toplevel2"."""
+    return path.split(".", 2)[1]
+
+
+class PopupManager:
+    """Closes the open popups when the user clicks anywhere else.
+
+    The click handler is bound (to the "all" tag) only while a popup is
+    open, so ordinary clicks cost nothing otherwise. A click belongs to
+    a popup if its widget's path starts with the popup's toplevel name:
+    one dict lookup instead of walking the parent chain. The manager
+    owns the "all" <ButtonRelease-1> binding while popups are open.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.popups = {}     # toplevel name → on_close()
+        self.exempt = set()  # paths of widgets that toggle the popups
+        self.bound = False
+
+    def exempt_widget(self, widget):
+        """Clicks on widget (e.g. a toggle button) never close popups."""
+        self.exempt.add(str(widget))
+
+    def opened(self, popup, on_close):
+        """Track popup; on_close() is called for a click outside it."""
+        self.popups[_toplevel_name(str(popup))] = on_close
+        if not self.bound:
+            self.root.bind_all("<ButtonRelease-1>", self._on_click, add="+")
+            self.bound = True
+
+    def closed(self, popup):
+        self.popups.pop(_toplevel_name(str(popup)), None)
+        if not self.popups and self.bound:
+            self.root.unbind_all("<ButtonRelease-1>")
+            self.bound = False
+
+    def _on_click(self, event):
+        # The release goes to the widget the press started on.
+        path = str(event.widget)
+        if path in self.exempt or _toplevel_name(path) in self.popups:
+            return
+        for on_close in list(self.popups.values()):
+            on_close()
+
+
+# ============================================================
+#   TOOLTIPS
+# ============================================================
+TOOLTIP_DELAY_MS = 500
+
+
+class TooltipService:
+    """Tooltips for any number of widgets through one shared window.
+
+    The tooltip Toplevel is created once, withdrawn, and only moved,
+    re-texted and shown when the pointer has rested on a widget for
+    `delay` ms. Leaving earlier cancels the timer, so sweeping the
+    pointer across widgets causes no window-manager traffic.
+    """
+
+    def __init__(self, root, delay=TOOLTIP_DELAY_MS):
+        self.root = root
+        self.delay = delay
+        self.texts = {}      # widget path → tooltip text
+        self.pending = None
+        self.visible = False
+
+        self.window = tk.Toplevel(root)
+        self.window.withdraw()
+        self.window.wm_overrideredirect(True)
+        self.label = tk.Label(
+            self.window, justify="left",
+            background="#ffffe0", relief="solid", borderwidth=1,
+            font=("Segoe UI", 9)
+        )
+        self.label.pack(ipadx=4, ipady=2)
+        self.text = None
+
+    def attach(self, widget, text):
+        self.texts[str(widget)] = text
+        widget.bind("<Enter>", self._on_enter, add="+")
+        widget.bind("<Leave>", self._on_leave, add="+")
+
+    def _on_enter(self, event):
+        self.cancel()
+        self.pending = self.root.after(self.delay, self.show, event.widget)
+
+    def _on_leave(self, event):
+        self.cancel()
+        self.hide()
+
+    def cancel(self):
+        """Drop a tooltip that is waiting for its delay."""
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+            self.pending = None
+
+    def show(self, widget):
+        self.pending = None
+        text = self.texts.get(str(widget))
+        if not text or not widget.winfo_exists():
+            return
+        if text != self.text:
+            self.label.config(text=text)
+            self.text = text
+        x = widget.winfo_rootx() + 20
+        y = widget.winfo_rooty() + widget.winfo_height() + 5
+        self.window.wm_geometry(f"+{x}+{y}")
+        self.window.deiconify()
+        self.window.lift()
+        self.visible = True
+
+    def hide(self):
+        if self.visible:
+            self.window.withdraw()
+            self.visible = False